@@ -1,9 +1,14 @@
 # flake8: noqa
-from . import conditions, properties, properties as props
+from . import blobs, compression, conditions, properties, properties as props
 from .adapter import Adapter, get_adapter, set_adapter
+from .contention import ContentionReport, ContentionStats, ContentionTracker, get_contention_tracker
+from .counters import CounterConfig, CounterShard, ShardedCounter
+from .deadlines import DeadlineExceeded, deadline, get_deadline, remaining_time
+from .hedging import HedgePolicy, HedgeStats
 from .model import Key, Model, Property, delete_multi, get_multi, put_multi, lookup_model_by_kind
 from .namespaces import get_namespace, namespace, set_default_namespace, set_namespace
 from .query import Query, Resultset, Page, Pages
+from .retries import RetryPolicy, RetryStats
 from .transaction import Transaction, TransactionError, RetriesExceeded, transactional
 
 __version__ = "0.9.1"
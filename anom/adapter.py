@@ -68,12 +68,21 @@ class Adapter:  # pragma: no cover
         """
         raise NotImplementedError
 
-    def get_multi(self, keys):
+    def get_multi(self, keys, *, read_consistency=None, read_time=None):
         """Get multiple entities from the Datastore by their
         respective keys.
 
         Parameters:
           keys(list[anom.Key]): A list of datastore Keys to get.
+          read_consistency(str, optional): Either ``"strong"`` or
+            ``"eventual"``.  Defaults to strong consistency.
+          read_time(datetime, optional): The time at which to read a
+            snapshot of the entities.
+
+        Note:
+          The read options are only passed in when they are set so
+          adapters that don't support them may leave them out of
+          their signature.
 
         Returns:
           list[dict]: A list of dictionaries of data that can be loaded
@@ -108,13 +117,18 @@ class Adapter:  # pragma: no cover
         """
         raise NotImplementedError
 
-    def transaction(self, propagation):
+    def transaction(self, propagation, *, read_only=False):
         """Create a new Transaction object.
 
         Parameters:
           propagation(Transaction.Propagation): How the new
             transaction should be propagated with regards to any
             previously-created transactions.
+          read_only(bool, optional): Whether or not the transaction
+            only reads data.  Writes inside read-only transactions
+            must fail.  This is only passed in when it's set so
+            adapters that don't support read-only transactions may
+            leave it out of their signature.
 
         Returns:
           Transaction: The transaction.
@@ -130,3 +144,16 @@ class Adapter:  # pragma: no cover
     def current_transaction(self):
         "Transaction: The current Transaction or None."
         raise NotImplementedError
+
+
+def _read_options(read_consistency=None, read_time=None):
+    """Build the keyword arguments to pass to
+    :meth:`Adapter.get_multi`.  Options that aren't set are left out
+    so that adapters written before they existed keep working.
+    """
+    options = {}
+    if read_consistency is not None:
+        options["read_consistency"] = read_consistency
+    if read_time is not None:
+        options["read_time"] = read_time
+    return options
@@ -1,12 +1,6 @@
-import warnings
-
+from .cache_clients import (  # noqa
+    CacheClient, LocalCacheClient, PylibmcCacheClient, RedisCacheClient, TieredCacheClient,
+)
 from .datastore_adapter import DatastoreAdapter  # noqa
-
-try:
-    from .memcache_adapter import MemcacheAdapter  # noqa
-except ImportError:  # pragma: no cover
-    warnings.warn(
-        "MemcacheAdapter could not be imported.  Install anom with `pip "
-        "install anom[memcache]` to add memcache support.",
-        ImportWarning, stacklevel=2
-    )
+from .datastore_proxy import PoolStats  # noqa
+from .memcache_adapter import CachePolicy, MemcacheAdapter  # noqa
@@ -0,0 +1,378 @@
+import time
+
+from collections import OrderedDict
+from threading import RLock
+
+
+class CacheClient:  # pragma: no cover
+    """Abstract base class for the cache clients that back
+    :class:`MemcacheAdapter<anom.adapters.MemcacheAdapter>`.  Keys
+    are strings, values are bytestrings and timeouts are expressed in
+    seconds, where ``0`` means that values never expire.
+    """
+
+    def get_multi(self, keys):
+        """Get multiple values by their keys.
+
+        Parameters:
+          keys(list[str]): The keys to get.
+
+        Returns:
+          dict: A mapping from keys to values.  Keys that cannot be
+          found are omitted.
+        """
+        raise NotImplementedError
+
+    def set_multi(self, mapping, timeout=0):
+        """Set multiple values.
+
+        Parameters:
+          mapping(dict): A mapping from keys to values.
+          timeout(int, optional): The number of seconds after which
+            the values expire.
+        """
+        raise NotImplementedError
+
+    def add_multi(self, mapping, timeout=0):
+        """Set multiple values, but only for keys that don't already
+        have a value.
+
+        Parameters:
+          mapping(dict): A mapping from keys to values.
+          timeout(int, optional): The number of seconds after which
+            the values expire.
+
+        Returns:
+          list[str]: The keys that already had a value.
+        """
+        raise NotImplementedError
+
+    def delete_multi(self, keys):
+        """Delete multiple values by their keys.  Missing keys are
+        ignored.
+
+        Parameters:
+          keys(list[str]): The keys to delete.
+        """
+        raise NotImplementedError
+
+    def cas_multi(self, mapping, timeout=0):
+        """Replace multiple values, but only for keys whose current
+        value is the expected one.
+
+        Parameters:
+          mapping(dict): A mapping from keys to ``(expected, value)``
+            tuples.  Keys whose new value is ``None`` are deleted.
+          timeout(int, optional): The number of seconds after which
+            the values expire.
+
+        Returns:
+          list[str]: The keys whose current value wasn't the expected
+          one.
+        """
+        raise NotImplementedError
+
+
+class PylibmcCacheClient(CacheClient):
+    """A cache client for memcached, based on pylibmc_.  The client
+    is automatically wrapped inside a ThreadMappedPool.
+
+    Note:
+      Memcached can only compare and swap values by their CAS tokens
+      and pylibmc can't read many tokens at once, so :meth:`cas_multi`
+      reads each value it replaces along with its token and then
+      swaps it using that token.  That takes two round trips per
+      key, but the swap fails if the value was changed in the mean
+      time.  Values are deleted in batches instead, after a single
+      batched check, so a value changed between that check and the
+      delete may get deleted as well.  The client must have the
+      ``cas`` behavior enabled.
+
+    Parameters:
+      client(pylibmc.Client): The memcached client instance to use.
+
+    .. _pylibmc: https://sendapatch.se/projects/pylibmc
+    """
+
+    def __init__(self, client):
+        import pylibmc
+
+        self.client_pool = pylibmc.ThreadMappedPool(client)
+
+    def get_multi(self, keys):
+        with self.client_pool.reserve() as client:
+            return client.get_multi(keys)
+
+    def set_multi(self, mapping, timeout=0):
+        if mapping:
+            with self.client_pool.reserve() as client:
+                client.set_multi(mapping, timeout)
+
+    def add_multi(self, mapping, timeout=0):
+        if not mapping:
+            return []
+
+        with self.client_pool.reserve() as client:
+            return client.add_multi(mapping, timeout)
+
+    def delete_multi(self, keys):
+        if keys:
+            with self.client_pool.reserve() as client:
+                client.delete_multi(keys)
+
+    def cas_multi(self, mapping, timeout=0):
+        if not mapping:
+            return []
+
+        import pylibmc
+
+        with self.client_pool.reserve() as client:
+            # Deleted values are checked in one batch and then deleted
+            # in another since memcached can't delete values by their
+            # CAS token.
+            failed, held = [], []
+            deletes = [key for key, (_, value) in mapping.items() if value is None]
+            current = client.get_multi(deletes) if deletes else {}
+            for key in deletes:
+                if current.get(key) == mapping[key][0]:
+                    held.append(key)
+                else:
+                    failed.append(key)
+
+            if held:
+                client.delete_multi(held)
+
+            for key, (expected, value) in mapping.items():
+                if value is None:
+                    continue
+
+                current, cid = client.gets(key)
+                if cid is None or current != expected:
+                    failed.append(key)
+                    continue
+
+                try:
+                    swapped = client.cas(key, value, cid, timeout)
+                except pylibmc.NotFound:
+                    swapped = False
+
+                if not swapped:
+                    failed.append(key)
+
+        return failed
+
+
+class RedisCacheClient(CacheClient):
+    """A cache client for Redis, based on redis-py_.  Install anom
+    with ``pip install anom[redis]`` in order to use it.
+
+    Note:
+      :meth:`cas_multi` runs as a Lua script so it touches multiple
+      keys atomically.  This means that this client can't be used with
+      Redis Cluster.
+
+    Parameters:
+      client(redis.Redis): The Redis client instance to use.
+
+    .. _redis-py: https://github.com/andymccurdy/redis-py
+    """
+
+    _cas_script = """
+    local timeout = tonumber(ARGV[1])
+    local failed = {}
+    for i, key in ipairs(KEYS) do
+      local offset = (i - 1) * 3 + 1
+      if redis.call("GET", key) ~= ARGV[offset + 1] then
+        table.insert(failed, key)
+      elseif ARGV[offset + 2] == "del" then
+        redis.call("DEL", key)
+      elseif timeout > 0 then
+        redis.call("SET", key, ARGV[offset + 3], "EX", timeout)
+      else
+        redis.call("SET", key, ARGV[offset + 3])
+      end
+    end
+    return failed
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._cas = client.register_script(self._cas_script)
+
+    def get_multi(self, keys):
+        if not keys:
+            return {}
+
+        return {key: value for key, value in zip(keys, self.client.mget(keys)) if value is not None}
+
+    def set_multi(self, mapping, timeout=0):
+        if mapping:
+            with self.client.pipeline(transaction=False) as pipeline:
+                for key, value in mapping.items():
+                    pipeline.set(key, value, ex=timeout or None)
+
+                pipeline.execute()
+
+    def add_multi(self, mapping, timeout=0):
+        if not mapping:
+            return []
+
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key, value in mapping.items():
+                pipeline.set(key, value, ex=timeout or None, nx=True)
+
+            results = pipeline.execute()
+
+        return [key for key, added in zip(mapping, results) if not added]
+
+    def delete_multi(self, keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def cas_multi(self, mapping, timeout=0):
+        if not mapping:
+            return []
+
+        keys, args = [], [timeout]
+        for key, (expected, value) in mapping.items():
+            keys.append(key)
+            if value is None:
+                args.extend((expected, "del", b""))
+            else:
+                args.extend((expected, "set", value))
+
+        failed = self._cas(keys=keys, args=args)
+        return [key.decode("utf-8") if isinstance(key, bytes) else key for key in failed]
+
+
+class LocalCacheClient(CacheClient):
+    """An in-process cache client.  Useful on its own for testing and
+    as the first tier of a :class:`TieredCacheClient`.
+
+    Parameters:
+      max_items(int, optional): The maximum number of values to hold.
+        The least recently used values are evicted first.
+    """
+
+    def __init__(self, *, max_items=10000):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = RLock()
+
+    def get_multi(self, keys):
+        now, mapping = time.monotonic(), {}
+        with self._lock:
+            for key in keys:
+                item = self._items.get(key)
+                if item is None:
+                    continue
+
+                value, expires_at = item
+                if expires_at is not None and expires_at <= now:
+                    del self._items[key]
+                    continue
+
+                self._items.move_to_end(key)
+                mapping[key] = value
+
+        return mapping
+
+    def set_multi(self, mapping, timeout=0):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            for key, value in mapping.items():
+                self._items[key] = (value, expires_at)
+                self._items.move_to_end(key)
+
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def add_multi(self, mapping, timeout=0):
+        with self._lock:
+            current = self.get_multi(list(mapping))
+            self.set_multi({key: value for key, value in mapping.items() if key not in current}, timeout)
+            return [key for key in mapping if key in current]
+
+    def delete_multi(self, keys):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    def cas_multi(self, mapping, timeout=0):
+        with self._lock:
+            current = self.get_multi(list(mapping))
+            failed, updates, deletes = [], {}, []
+            for key, (expected, value) in mapping.items():
+                if current.get(key) != expected:
+                    failed.append(key)
+                elif value is None:
+                    deletes.append(key)
+                else:
+                    updates[key] = value
+
+            self.set_multi(updates, timeout)
+            self.delete_multi(deletes)
+            return failed
+
+
+class TieredCacheClient(CacheClient):
+    """A cache client that keeps a short-lived copy of the values it
+    reads from a remote cache (L2) in a local one (L1).  All writes go
+    to L2 first.
+
+    Warning:
+      Writes made by other processes only become visible in this
+      process once the L1 copies of the values they touch expire, so
+      reads may be up to ``l1_timeout`` seconds stale.
+
+    Parameters:
+      l1(CacheClient): The local cache.  Usually a LocalCacheClient.
+      l2(CacheClient): The remote cache.
+      l1_timeout(int, optional): The maximum number of seconds values
+        are kept in L1 for.
+    """
+
+    def __init__(self, l1, l2, *, l1_timeout=1):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_timeout = l1_timeout
+
+    def get_multi(self, keys):
+        mapping = self.l1.get_multi(keys)
+        missing = [key for key in keys if key not in mapping]
+        if missing:
+            found = self.l2.get_multi(missing)
+            self.l1.set_multi(found, self.l1_timeout)
+            mapping.update(found)
+
+        return mapping
+
+    def set_multi(self, mapping, timeout=0):
+        self.l2.set_multi(mapping, timeout)
+        self.l1.set_multi(mapping, self._l1_timeout(timeout))
+
+    def add_multi(self, mapping, timeout=0):
+        failed = self.l2.add_multi(mapping, timeout)
+        # The values of the keys that weren't added are unknown so
+        # they're dropped from L1 altogether.
+        self.l1.delete_multi(list(mapping))
+        return failed
+
+    def delete_multi(self, keys):
+        self.l2.delete_multi(keys)
+        self.l1.delete_multi(keys)
+
+    def cas_multi(self, mapping, timeout=0):
+        failed = self.l2.cas_multi(mapping, timeout)
+        failed_keys = set(failed)
+        self.l1.delete_multi(list(mapping))
+        self.l1.set_multi({
+            key: value for key, (_, value) in mapping.items()
+            if key not in failed_keys and value is not None
+        }, self._l1_timeout(timeout))
+        return failed
+
+    def _l1_timeout(self, timeout):
+        if timeout:
+            return min(timeout, self.l1_timeout)
+        return self.l1_timeout
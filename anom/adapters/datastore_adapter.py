@@ -1,28 +1,70 @@
 import logging
+import requests
 
-from functools import partial
-from gcloud_requests import DatastoreRequestsProxy, enter_transaction, exit_transaction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from gcloud_requests import DatastoreRequestsProxy
+from google.api_core import exceptions, retry
 from google.cloud import datastore
+from google.cloud.datastore import _http as datastore_http
+from google.cloud.datastore_v1.proto import datastore_pb2, entity_pb2, query_pb2
 from threading import local
 
-from .. import Adapter, Key
+from .. import Adapter, Key, props
 from ..adapter import QueryResponse
-from ..model import KeyLike
-from ..transaction import Transaction, TransactionFailed
+from ..deadlines import DeadlineExceeded, check_deadline, deadline_exceeded, remaining_time
+from ..model import KeyLike, lookup_model_by_kind
+from ..properties import _max_entity_size
+from ..transaction import Transaction, TransactionError, TransactionFailed
+from .datastore_protobuf import (
+    entity_from_protobuf, entity_to_protobuf, key_from_protobuf, key_to_protobuf, keys_from_protobuf,
+    read_options_to_protobuf,
+)
+from .datastore_proxy import ConfigurableDatastoreRequestsProxy, enter_transaction, exit_transaction
 
 _logger = logging.getLogger(__name__)
 
+#: The transports that DatastoreAdapter can talk to Datastore over.
+_transports = ("grpc", "http")
+
+#: The gRPC retry config used while a deadline is active.  Retries
+#: are left up to the adapter's retry policy then, which knows not to
+#: outlast the deadline.
+_deadline_grpc_retry = retry.Retry(predicate=lambda error: False)
+
+#: The gRPC status code of errors caused by contention.
+_aborted_code = 10
+
+#: The maximum number of times lookups are repeated for keys that
+#: Datastore defers.  This matches google.cloud.datastore.
+_max_lookups = 100
+
+#: Entities whose string and bytes values add up to more than this
+#: many bytes get their exact size checked before they are stored.
+_entity_size_check_threshold = _max_entity_size // 2
+
 
 class _DeferredKey(KeyLike):
-    def __init__(self, ds_entity):
-        self.ds_entity = ds_entity
-        self._value = None
+    """A partial key that gets completed once the batch it was put in
+    is committed.  Batches complete the keys of the entities they
+    insert by calling ``entity.key = entity.key.completed_key(id)``
+    so instances of this class stand in for both the entity and its
+    key.
+    """
+
+    def __init__(self, anom_key):
+        self._anom_key = anom_key
 
     @property
-    def _anom_key(self):
-        if self._value is None or self._value.is_partial:
-            self._value = DatastoreAdapter._convert_key_from_datastore(self.ds_entity.key)
-        return self._value
+    def key(self):
+        return self
+
+    @key.setter
+    def key(self, anom_key):
+        self._anom_key = anom_key
+
+    def completed_key(self, id_or_name):
+        return self._anom_key._replace(id_or_name=id_or_name)
 
     def __getattr__(self, name):
         return getattr(self._anom_key, name)
@@ -32,33 +74,66 @@ class _DeferredKey(KeyLike):
 
 
 class _DatastoreOuterTransaction(Transaction):
-    def __init__(self, adapter):
+    def __init__(self, adapter, read_only=False):
         self.adapter = adapter
-        self.ds_transaction = adapter.client.transaction()
+        self.read_only = read_only
+        self.ds_transaction = adapter.client.transaction(read_only=read_only)
+
+        #: The entities that have been written to inside this
+        #: transaction, mapped to their latest entity protobuf or to
+        #: None if they've been deleted.  They are sent to Datastore
+        #: when the transaction commits.
+        self.mutations = {}
+
+        #: The keys of the entities that have been looked up inside
+        #: this transaction.
+        self.read_keys = set()
+
+    @property
+    def keys(self):
+        return frozenset(self.read_keys.union(self.mutations))
 
     def begin(self):
         _logger.debug("Beginning transaction...")
-        self.ds_transaction.begin()
-        self.adapter.client._push_batch(self.ds_transaction)
+        with _translate_deadline_errors():
+            if self.read_only:
+                _begin_read_only_transaction(self.adapter, self.ds_transaction)
+            else:
+                self.ds_transaction.begin(**self.adapter._rpc_options())
+
         enter_transaction()
 
     def commit(self):
+        project = self.adapter.client.project
+        for key, entity_pb in self.mutations.items():
+            if entity_pb is None:
+                key_to_protobuf(self.ds_transaction._add_delete_key_pb(), project, key)
+            else:
+                self.ds_transaction._add_complete_key_entity_pb().CopyFrom(entity_pb)
+
         try:
-            _logger.debug("Committing transaction...")
-            self.ds_transaction.commit()
+            _logger.debug("Committing transaction with %d mutations...", len(self.ds_transaction.mutations))
+            self.ds_transaction.commit(**self.adapter._rpc_options())
         except Exception as e:
             _logger.debug("Transaction failed: %s", e)
-            raise TransactionFailed("Failed to commit transaction.", cause=e)
+            if deadline_exceeded():
+                raise DeadlineExceeded("Deadline exceeded while committing transaction.") from e
+            raise TransactionFailed("Failed to commit transaction.", cause=e, conflict=_is_contention_error(e))
 
     def rollback(self):
+        # Transactions that aren't rolled back expire on their own so
+        # there's no point in waiting on a rollback past the deadline.
+        if deadline_exceeded():
+            _logger.debug("Skipping rollback since the deadline has passed.")
+            return
+
         _logger.debug("Rolling transaction back...")
-        self.ds_transaction.rollback()
+        self.ds_transaction.rollback(**self.adapter._rpc_options())
 
     def end(self):
         _logger.debug("Ending transaction...")
         exit_transaction()
-        self.adapter.client._pop_batch()
-        self.adapter._transactions.remove(self)
+        self.adapter._pop_transaction(self)
 
 
 class _DatastoreInnerTransaction(Transaction):
@@ -76,7 +151,7 @@ class _DatastoreInnerTransaction(Transaction):
 
     def end(self):
         _logger.debug("Ending inner transaction...")
-        self.adapter._transactions.remove(self)
+        self.adapter._pop_transaction(self)
 
     def __getattr__(self, name):
         return getattr(self.parent, name)
@@ -92,67 +167,231 @@ class DatastoreAdapter(Adapter):
       credentials(datastore.Credentials): The OAuth2 Credentials to
         use for this client.  If not passed, falls back to the default
         inferred from the environment.
+      pool_size(int, optional): The maximum number of HTTP connections
+        to keep open per session.  Defaults to ``32``.
+      pool_block(bool, optional): Whether or not requests should wait
+        for a pooled connection to become available rather than open a
+        one-off connection when all of them are in use.
+      share_session(bool, optional): Whether or not all threads should
+        share a single HTTP session and connection pool.  By default,
+        each thread gets its own session.  When sharing a session,
+        make ``pool_size`` at least as large as the number of threads.
+      timeout(tuple[float, float], optional): The connect and read
+        timeouts of HTTP requests, in seconds.  Use :func:`anom.deadline`
+        to bound the duration of individual operations.
+      tcp_keepalive(bool, optional): Whether or not TCP keep-alive
+        probes should be enabled on connections.
+      client_per_thread(bool, optional): Whether or not each thread
+        should get its own Datastore client.
+      transport(str, optional): Either ``"http"``, to send JSON
+        requests over HTTP (the default), or ``"grpc"``, to send
+        protobuf messages over gRPC.  The gRPC transport requires
+        anom to be installed with ``pip install anom[grpc]``.  The
+        pool options above only apply to the HTTP transport.
+      retry_policy(RetryPolicy, optional): Determines how operations
+        that fail with transient errors outside of transactions are
+        retried.  When set, it replaces the fixed retry schedule of
+        the HTTP transport.  Unless the policy specifies its own
+        ``retry_on``, it retries ``transient_errors`` and conflicts
+        caused by contention.  Puts of entities with partial keys are
+        never retried since they could create duplicate entities.
+      hedge_policy(HedgePolicy, optional): When set, lookups and
+        queries that take longer than usual send a duplicate request
+        and use whichever response arrives first.  Latencies are
+        tracked separately per operation and batch size, rounded up
+        to a power of 4.  Operations inside transactions are never
+        hedged.
     """
 
-    _state = local()
+    #: The errors that the adapter's retry policy retries unless it
+    #: specifies its own.
+    transient_errors = (
+        exceptions.Aborted,
+        exceptions.BadGateway,
+        exceptions.DeadlineExceeded,
+        exceptions.GatewayTimeout,
+        exceptions.InternalServerError,
+        exceptions.ServiceUnavailable,
+        exceptions.Unknown,
+        requests.ConnectionError,
+    )
+
+    #: The stack of transactions the current context is inside of.
+    #: Every thread, asyncio task and greenlet has its own context.
+    _transaction_stack = ContextVar("anom.DatastoreAdapter.transactions", default=())
+
+    def __init__(
+            self, *, project=None, credentials=None, pool_size=32, pool_block=False, share_session=False,
+            timeout=DatastoreRequestsProxy.TIMEOUT_CONFIG, tcp_keepalive=False, client_per_thread=False,
+            transport="http", retry_policy=None, hedge_policy=None,
+    ):
+        if transport not in _transports:
+            raise ValueError(f"Invalid transport {transport!r}.  Expected one of {_transports!r}.")
+
+        if transport == "grpc":
+            try:
+                import grpc  # noqa
+            except ImportError:  # pragma: no cover
+                raise RuntimeError("The grpc transport requires grpcio.  Run `pip install anom[grpc]` to install it.")
 
-    def __init__(self, *, project=None, credentials=None):
         self.project = project
+        self.transport = transport
         self.credentials = credentials
-        self.proxy = DatastoreRequestsProxy(credentials=credentials)
-        self.client = datastore.Client(
+        self.proxy = ConfigurableDatastoreRequestsProxy(
+            credentials=credentials,
+            pool_size=pool_size,
+            pool_block=pool_block,
+            share_session=share_session,
+            timeout=timeout,
+            tcp_keepalive=tcp_keepalive,
+            retry_errors=retry_policy is None,
+        )
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.client_per_thread = client_per_thread
+        self._clients = local()
+        self._key_properties = {}
+        self._client = self._make_client()
+
+    @property
+    def client(self):
+        "datastore.Client: The Datastore client for the current thread."
+        if not self.client_per_thread:
+            return self._client
+
+        client = getattr(self._clients, "client", None)
+        if client is None:
+            client = self._clients.client = self._make_client()
+        return client
+
+    def pool_stats(self):
+        """Get a snapshot of the state of this adapter's HTTP
+        connection pools.
+
+        Returns:
+          PoolStats: The pool stats.
+        """
+        return self.proxy.pool_stats()
+
+    def _make_client(self):
+        return datastore.Client(
             credentials=self.credentials,
             project=self.project,
             _http=self.proxy,
-            _use_grpc=False,
+            _use_grpc=self.transport == "grpc",
         )
 
     @property
     def _transactions(self):
-        "list[Transaction]: The current stack of Transactions."
-        transactions = getattr(self._state, "transactions", None)
-        if transactions is None:
-            transactions = self._state.transactions = []
-        return transactions
+        "tuple[Transaction]: The current stack of Transactions."
+        return self._transaction_stack.get()
+
+    def _push_transaction(self, transaction):
+        # The stack is never mutated in place since contexts that are
+        # copied from this one would share it otherwise.
+        self._transaction_stack.set(self._transactions + (transaction,))
+
+    def _pop_transaction(self, transaction):
+        self._transaction_stack.set(tuple(t for t in self._transactions if t is not transaction))
 
     def delete_multi(self, keys):
-        self.client.delete_multi(self._convert_key_to_datastore(key) for key in keys)
+        self._check_writable()
+        return self._call(self._delete_multi, keys)
+
+    def _delete_multi(self, keys):
+        if not keys:
+            return
 
-    def get_multi(self, keys):
-        get_multi = self.client.get_multi
         if self.in_transaction:
-            transaction = self.current_transaction
-            get_multi = partial(get_multi, transaction=transaction.ds_transaction)
-
-        datastore_keys = [self._convert_key_to_datastore(key) for key in keys]
-        request_keys = set(datastore_keys)
-        found, missing, deferred = [], [], []
-        while True:
-            found.extend(get_multi(request_keys, missing=missing, deferred=deferred))
-            if not deferred:
-                break
+            mutations = self.current_transaction.mutations
+            for key in keys:
+                mutations[key] = None
+            return
 
-            for entity in found:  # pragma: no cover
-                request_keys.remove(entity.key)
+        with self._batch() as batch:
+            for key in keys:
+                key_to_protobuf(batch._add_delete_key_pb(), self.client.project, key)
 
-            for key in missing:  # pragma: no cover
-                request_keys.remove(key)
+    def get_multi(self, keys, *, read_consistency=None, read_time=None):
+        operation = f"get_multi:{_size_bucket(len(keys))}"
+        return self._call(self._read, operation, self._get_multi, keys, read_consistency, read_time)
 
+    def _get_multi(self, keys, read_consistency, read_time):
+        transaction_id, mutations = None, {}
+        if self.in_transaction:
+            transaction_id = self.current_transaction.ds_transaction.id
+            mutations = self.current_transaction.mutations
+            self.current_transaction.read_keys.update(keys)
+
+        read_options = read_options_to_protobuf(read_consistency, read_time, transaction_id)
         results = [None] * len(keys)
-        for entity in found:
-            index = datastore_keys.index(entity.key)
-            results[index] = self._prepare_to_load(entity)
+        indexes_by_key = {}
+        for index, key in enumerate(keys):
+            # Entities that were written inside the current transaction
+            # are read back from the transaction's mutations.
+            if key in mutations:
+                entity_pb = mutations[key]
+                if entity_pb is not None:
+                    results[index] = entity_from_protobuf(entity_pb, self._get_key_properties(key.kind))
+            else:
+                indexes_by_key.setdefault(key, []).append(index)
+
+        if not indexes_by_key:
+            return results
+
+        key_pbs = [key_to_protobuf(entity_pb2.Key(), self.client.project, key) for key in indexes_by_key]
+        entity_pbs = self._lookup(key_pbs, read_options)
+        for key, data in self._load_entities(entity_pbs):
+            for index in indexes_by_key[key]:
+                results[index] = data
 
         return results
 
     def put_multi(self, requests):
-        entities = [self._prepare_to_store(*request) for request in requests]
-        self.client.put_multi(entities)
+        self._check_writable()
+        # Property values may be generators so they have to be read
+        # up front in order for the request to be retried.
+        requests = [(key, unindexed, list(data)) for key, unindexed, data in requests]
+        idempotent = not any(key.is_partial for key, _, _ in requests)
+        return self._call(self._put_multi, requests, idempotent=idempotent)
+
+    def _put_multi(self, requests):
+        if not requests:
+            return []
+
+        keys = []
+        with self._batch() as batch:
+            for key, unindexed, data in requests:
+                if key.is_partial:
+                    entity_pb = batch._add_partial_key_entity_pb()
+                    deferred_key = _DeferredKey(key)
+                    batch._partial_key_entities.append(deferred_key)
+                    keys.append(deferred_key)
+                    self._prepare_to_store(entity_pb, key, unindexed, data)
+
+                # Inside of transactions, only the last write to each
+                # entity is sent to Datastore.
+                elif self.in_transaction:
+                    entity_pb = entity_pb2.Entity()
+                    self._prepare_to_store(entity_pb, key, unindexed, data)
+                    self.current_transaction.mutations[key] = entity_pb
+                    keys.append(key)
+
+                else:
+                    entity_pb = batch._add_complete_key_entity_pb()
+                    keys.append(key)
+                    self._prepare_to_store(entity_pb, key, unindexed, data)
+
         if self.in_transaction:
-            return [_DeferredKey(entity) for entity in entities]
-        return [self._convert_key_from_datastore(entity.key) for entity in entities]
+            return keys
+        return [key._anom_key if isinstance(key, _DeferredKey) else key for key in keys]
 
     def query(self, query, options):
+        operation = "keys_only_query" if options.keys_only else "query"
+        operation = f"{operation}:{_size_bucket(options.batch_size)}"
+        return self._call(self._read, operation, self._query, query, options)
+
+    def _query(self, query, options):
         ancestor = None
         if query.ancestor:
             ancestor = self._convert_key_to_datastore(query.ancestor)
@@ -169,35 +408,40 @@ class DatastoreAdapter(Adapter):
         if options.keys_only:
             query.keys_only()
 
+        transaction_id = None
+        if self.in_transaction:
+            transaction_id = self.current_transaction.ds_transaction.id
+
+        read_options = read_options_to_protobuf(options.read_consistency, options.read_time, transaction_id)
         result_iterator = query.fetch(
             limit=options.batch_size,
             offset=options.offset,
             start_cursor=options.cursor,
         )
-
-        entities = []
-        for entity in result_iterator:
-            key, data = self._convert_key_from_datastore(entity.key), None
-            if not options.keys_only:
-                data = self._prepare_to_load(entity)
-
-            entities.append((key, data))
+        entity_pbs = self._run_query(result_iterator, read_options)
+        if options.keys_only:
+            entities = [(key, None) for key in keys_from_protobuf(entity_pb.key for entity_pb in entity_pbs)]
+        else:
+            entities = list(self._load_entities(entity_pbs))
 
         return QueryResponse(entities=entities, cursor=result_iterator.next_page_token)
 
-    def transaction(self, propagation):
+    def transaction(self, propagation, *, read_only=False):
         if propagation == Transaction.Propagation.Independent:
-            transaction = _DatastoreOuterTransaction(self)
-            self._transactions.append(transaction)
+            transaction = _DatastoreOuterTransaction(self, read_only)
+            self._push_transaction(transaction)
             return transaction
 
         elif propagation == Transaction.Propagation.Nested:
             if self._transactions:
+                if self.current_transaction.read_only and not read_only:
+                    raise TransactionError("Read-write transactions can't be nested inside read-only transactions.")
+
                 transaction = _DatastoreInnerTransaction(self.current_transaction)
             else:
-                transaction = _DatastoreOuterTransaction(self)
+                transaction = _DatastoreOuterTransaction(self, read_only)
 
-            self._transactions.append(transaction)
+            self._push_transaction(transaction)
             return transaction
 
         else:  # pragma: no cover
@@ -219,38 +463,206 @@ class DatastoreAdapter(Adapter):
 
             yield prop, op, value
 
-    def _convert_key_to_datastore(self, anom_key):
-        return self.client.key(*anom_key.path, namespace=anom_key.namespace or None)
+    def _check_writable(self):
+        if self.in_transaction and self.current_transaction.read_only:
+            raise TransactionError("Entities can't be written inside read-only transactions.")
+
+    def _call(self, fn, *args, idempotent=True):
+        with _translate_deadline_errors():
+            if self.retry_policy is None or self.in_transaction or not idempotent:
+                return fn(*args)
+            return self.retry_policy.call(fn, *args, default_retry_on=self._is_transient_error)
+
+    def _is_transient_error(self, error):
+        return isinstance(error, self.transient_errors) or _is_contention_error(error)
+
+    def _lookup(self, key_pbs, read_options):
+        entity_pbs, rpc_options = [], self._rpc_options()
+        for _ in range(_max_lookups):
+            response_pb = self.client._datastore_api.lookup(
+                self.client.project, key_pbs, read_options=read_options, **rpc_options
+            )
+            entity_pbs.extend(result.entity for result in response_pb.found)
+            if not response_pb.deferred:
+                break
 
-    @staticmethod
-    def _convert_key_from_datastore(datastore_key):
-        return Key.from_path(*datastore_key.flat_path, namespace=datastore_key.namespace)
+            key_pbs = response_pb.deferred
+
+        return entity_pbs
+
+    def _run_query(self, result_iterator, read_options):
+        # This mirrors google.cloud.datastore's query iterator, which
+        # can't be given read options, and skips building
+        # datastore.Entity instances so the protobufs can be loaded
+        # directly instead.
+        query = result_iterator._query
+        partition_id = entity_pb2.PartitionId(project_id=query.project, namespace_id=query.namespace)
+        entity_pbs, rpc_options = [], self._rpc_options()
+        while result_iterator._more_results and (
+                result_iterator.max_results is None or
+                result_iterator.num_results < result_iterator.max_results
+        ):
+            query_pb = result_iterator._build_protobuf()
+            response_pb = self.client._datastore_api.run_query(
+                query.project, partition_id, read_options, query=query_pb, **rpc_options
+            )
+            # Datastore skips at most 1000 results per request so
+            # queries with large offsets have to be repeated.
+            while response_pb.batch.more_results == query_pb2.QueryResultBatch.NOT_FINISHED and \
+                    response_pb.batch.skipped_results < query_pb.offset:
+                query_pb.start_cursor = response_pb.batch.skipped_cursor
+                query_pb.offset -= response_pb.batch.skipped_results
+                response_pb = self.client._datastore_api.run_query(
+                    query.project, partition_id, read_options, query=query_pb, **rpc_options
+                )
+
+            page = result_iterator._process_query_results(response_pb)
+            result_iterator.num_results += len(page)
+            entity_pbs.extend(page)
+
+        return entity_pbs
+
+    def _read(self, operation, fn, *args):
+        if self.hedge_policy is None or self.in_transaction:
+            return fn(*args)
+        return self.hedge_policy.call(fn, *args, operation=operation)
+
+    def _rpc_options(self):
+        # The HTTP transport applies deadlines itself, in the proxy,
+        # and doesn't accept per-call options.
+        if self.transport != "grpc":
+            return {}
+
+        timeout = remaining_time()
+        if timeout is None:
+            return {}
+
+        check_deadline()
+        return {"retry": _deadline_grpc_retry, "timeout": timeout}
+
+    @contextmanager
+    def _batch(self):
+        if self.in_transaction:
+            yield self.current_transaction.ds_transaction
+            return
 
-    def _prepare_to_store(self, key, unindexed, data):
-        datastore_key = self._convert_key_to_datastore(key)
-        entity = datastore.Entity(datastore_key, unindexed)
-        entity.update({name: self._prepare_to_store_value(value) for name, value in data})
-        return entity
+        batch = self.client.batch()
+        batch.begin()
+        yield batch
+        batch.commit(**self._rpc_options())
 
-    def _prepare_to_store_value(self, value):
-        if isinstance(value, Key):
-            return self._convert_key_to_datastore(value)
+    def _convert_key_to_datastore(self, anom_key):
+        return self.client.key(*anom_key.path, namespace=anom_key.namespace or None)
 
-        elif isinstance(value, (tuple, list)):
-            return [self._prepare_to_store_value(v) for v in value]
+    def _get_key_properties(self, kind):
+        key_properties = self._key_properties.get(kind)
+        if key_properties is None:
+            try:
+                model = lookup_model_by_kind(kind)
+                key_properties = frozenset(
+                    prop.name_on_entity for prop in model._properties.values()
+                    if isinstance(prop, props.Key)
+                )
+            except RuntimeError:
+                key_properties = frozenset()
+
+            self._key_properties[kind] = key_properties
+        return key_properties
+
+    def _load_entities(self, entity_pbs):
+        # Keys are converted in bulk, sharing a cache, so that entities
+        # that reference the same keys or ancestors share their anom
+        # keys.  Properties that the model declares as Key properties
+        # are converted straight into keys.
+        key_cache = {}
+        for entity_pb in entity_pbs:
+            key = key_from_protobuf(entity_pb.key, key_cache)
+            key_properties = self._get_key_properties(key.kind)
+            yield key, entity_from_protobuf(entity_pb, key_properties, key_cache)
+
+    def _prepare_to_store(self, entity_pb, key, unindexed, data):
+        data = list(data)
+        entity_to_protobuf(entity_pb, self.client.project, key, unindexed, data)
+        self._check_entity_size(key, entity_pb, data)
+
+    def _check_entity_size(self, key, entity_pb, data):
+        # Computing the exact size of an entity is expensive so it's
+        # only done for entities that look like they might be too
+        # large to store.
+        estimated_size = 0
+        for _, value in data:
+            if isinstance(value, (bytes, str)):
+                estimated_size += len(value)
+
+            elif isinstance(value, list):
+                estimated_size += sum(len(v) for v in value if isinstance(v, (bytes, str)))
+
+        if estimated_size < _entity_size_check_threshold:
+            return
+
+        size = entity_pb.ByteSize()
+        if size > _max_entity_size:
+            raise ValueError(
+                f"Entity {key!r} is {size} bytes long, which is larger than "
+                f"the maximum entity size ({_max_entity_size} bytes)."
+            )
+
+
+def _size_bucket(size):
+    # Latencies of lookups and queries grow with the number of
+    # entities they return so they are tracked separately for each
+    # power of 4.
+    bucket = 1
+    while bucket < size:
+        bucket *= 4
+    return bucket
+
+
+def _begin_read_only_transaction(adapter, ds_transaction):
+    # google.cloud.datastore 1.x's HTTP API drops the options of
+    # transactions when it begins them, so read-only transactions
+    # would be opened as read-write ones.  The request is built and
+    # sent here instead so Datastore gets the options on both
+    # transports.
+    datastore.Batch.begin(ds_transaction)
+    try:
+        client = ds_transaction._client
+        if adapter.transport == "grpc":
+            response_pb = client._datastore_api.begin_transaction(
+                ds_transaction.project, transaction_options=ds_transaction._options, **adapter._rpc_options()
+            )
 
         else:
-            return value
-
-    def _prepare_to_load(self, entity):
-        data = {}
-        for name, value in entity.items():
-            if isinstance(value, datastore.Key):
-                value = self._convert_key_from_datastore(value)
-
-            elif isinstance(value, list) and all(isinstance(v, datastore.Key) for v in value):
-                value = [self._convert_key_from_datastore(v) for v in value]
-
-            data[name] = value
-
-        return data
+            request_pb = datastore_pb2.BeginTransactionRequest(
+                project_id=ds_transaction.project,
+                transaction_options=ds_transaction._options,
+            )
+            response_pb = datastore_http._rpc(
+                client._http, ds_transaction.project, "beginTransaction", client._base_url,
+                client._client_info, request_pb, datastore_pb2.BeginTransactionResponse,
+            )
+
+        ds_transaction._id = response_pb.transaction
+    except Exception:
+        ds_transaction._status = ds_transaction._ABORTED
+        raise
+
+
+def _is_contention_error(error):
+    # The HTTP transport raises every 409 as a Conflict so aborts have
+    # to be told apart from other conflicts by their status.
+    if isinstance(error, exceptions.Aborted):
+        return True
+
+    return isinstance(error, exceptions.Conflict) and \
+        any(getattr(status, "code", None) == _aborted_code for status in error.errors)
+
+
+@contextmanager
+def _translate_deadline_errors():
+    try:
+        yield
+    except exceptions.DeadlineExceeded as e:
+        if deadline_exceeded():
+            raise DeadlineExceeded("Deadline exceeded.") from e
+        raise
@@ -0,0 +1,279 @@
+from datetime import datetime
+from google.cloud._helpers import _datetime_to_pb_timestamp, _pb_timestamp_to_datetime
+from google.cloud.datastore import helpers
+from google.cloud.datastore_v1.proto import datastore_pb2
+
+from .. import Key
+
+#: The read consistencies that reads outside of transactions can use.
+_read_consistencies = ("eventual", "strong")
+
+#: The field tag of ReadOptions.read_time.  The Datastore protos that
+#: ship with google.cloud.datastore 1.x predate that field so it is
+#: encoded by hand.  Protobuf keeps fields it doesn't know about when
+#: messages are copied and serialized.
+_read_time_tag = b"\x22"
+
+
+def key_to_protobuf(key_pb, project, anom_key):
+    """Fill in a key protobuf from an anom key.
+
+    Parameters:
+      key_pb(entity_pb2.Key): The protobuf to fill in.
+      project(str): The project the key belongs to.
+      anom_key(anom.Key): The key to convert.
+
+    Returns:
+      entity_pb2.Key: The key protobuf.
+    """
+    key_pb.partition_id.project_id = project
+    if anom_key.namespace:
+        key_pb.partition_id.namespace_id = anom_key.namespace
+
+    # The paths of partial keys end with a kind that has no id or name.
+    path = anom_key.path
+    for i in range(0, len(path), 2):
+        element = key_pb.path.add()
+        element.kind = path[i]
+        id_or_name = path[i + 1] if i + 1 < len(path) else None
+        if isinstance(id_or_name, int):
+            element.id = id_or_name
+        elif id_or_name is not None:
+            element.name = id_or_name
+
+    return key_pb
+
+
+def key_from_protobuf(key_pb, key_cache=None):
+    """Convert a key protobuf into an anom key.
+
+    Parameters:
+      key_pb(entity_pb2.Key): The protobuf to convert.
+      key_cache(dict, optional): A dict that keys converted so far are
+        memoized in.  Sharing one between conversions lets keys that
+        have ancestors in common share their parent keys.
+
+    Returns:
+      anom.Key: The key.
+    """
+    if key_cache is None:
+        key_cache = {}
+
+    namespace = key_pb.partition_id.namespace_id or None
+    key, path = None, (namespace,)
+    for element in key_pb.path:
+        id_or_name = element.id or element.name or None
+        path += (element.kind, id_or_name)
+        parent, key = key, key_cache.get(path)
+        if key is None:
+            if parent is None:
+                key = Key(element.kind, id_or_name, namespace=namespace)
+            else:
+                key = Key(element.kind, id_or_name, parent=parent)
+
+            key_cache[path] = key
+
+    return key
+
+
+def keys_from_protobuf(key_pbs):
+    """Convert many key protobufs into anom keys at once.
+
+    Parameters:
+      key_pbs(iter[entity_pb2.Key]): The protobufs to convert.
+
+    Returns:
+      list[anom.Key]: The keys.
+    """
+    key_cache = {}
+    return [key_from_protobuf(key_pb, key_cache) for key_pb in key_pbs]
+
+
+def read_options_to_protobuf(read_consistency=None, read_time=None, transaction_id=None):
+    """Build the read options protobuf for a lookup or a query.
+
+    Parameters:
+      read_consistency(str, optional): Either ``"strong"`` or
+        ``"eventual"``.  Defaults to strong consistency.
+      read_time(datetime, optional): The time at which to read a
+        snapshot of the data.
+      transaction_id(bytes, optional): The transaction to read in.
+
+    Raises:
+      ValueError: If the read consistency is invalid or if the options
+        can't be combined.
+
+    Returns:
+      datastore_pb2.ReadOptions: The read options protobuf.
+    """
+    if read_consistency is not None and read_consistency not in _read_consistencies:
+        raise ValueError(f"Invalid read consistency {read_consistency!r}.  Expected one of {_read_consistencies!r}.")
+
+    if transaction_id is not None:
+        if read_consistency == "eventual" or read_time is not None:
+            raise ValueError("Eventually-consistent and snapshot reads can't be made inside transactions.")
+        return datastore_pb2.ReadOptions(transaction=transaction_id)
+
+    if read_time is not None:
+        if read_consistency == "eventual":
+            raise ValueError("Snapshot reads can't be eventually consistent.")
+
+        # Timestamps are at most 17 bytes long so their length fits in
+        # a single byte.
+        timestamp = _datetime_to_pb_timestamp(read_time).SerializeToString()
+        return datastore_pb2.ReadOptions.FromString(_read_time_tag + bytes([len(timestamp)]) + timestamp)
+
+    if read_consistency == "eventual":
+        return datastore_pb2.ReadOptions(read_consistency=datastore_pb2.ReadOptions.EVENTUAL)
+    return datastore_pb2.ReadOptions()
+
+
+def entity_to_protobuf(entity_pb, project, key, unindexed, data):
+    """Fill in an entity protobuf from a key and a set of properties.
+
+    Parameters:
+      entity_pb(entity_pb2.Entity): The protobuf to fill in.
+      project(str): The project the entity belongs to.
+      key(anom.Key): The entity's key.
+      unindexed(list[str]): The names of the properties that should
+        not be indexed.
+      data(list[tuple[str, object]]): The entity's properties.
+
+    Returns:
+      entity_pb2.Entity: The entity protobuf.
+    """
+    key_to_protobuf(entity_pb.key, project, key)
+
+    properties = entity_pb.properties
+    for name, value in data:
+        value_pb = properties[name]
+        value_to_protobuf(value_pb, project, value)
+        if name in unindexed:
+            if isinstance(value, (list, tuple)):
+                for item_pb in value_pb.array_value.values:
+                    item_pb.exclude_from_indexes = True
+            else:
+                value_pb.exclude_from_indexes = True
+
+    return entity_pb
+
+
+def entity_from_protobuf(entity_pb, key_properties=frozenset(), key_cache=None):
+    """Convert an entity protobuf into a dictionary of properties.
+
+    Parameters:
+      entity_pb(entity_pb2.Entity): The protobuf to convert.
+      key_properties(set[str], optional): The names of the properties
+        that hold keys, according to the entity's model.
+      key_cache(dict, optional): See :func:`key_from_protobuf`.
+
+    Returns:
+      dict: The entity's properties.
+    """
+    data = {}
+    for name, value_pb in entity_pb.properties.items():
+        if name in key_properties:
+            data[name] = key_value_from_protobuf(value_pb, key_cache)
+        else:
+            data[name] = value_from_protobuf(value_pb)
+
+    return data
+
+
+def value_to_protobuf(value_pb, project, value):
+    """Fill in a value protobuf from a property value.
+
+    Parameters:
+      value_pb(entity_pb2.Value): The protobuf to fill in.
+      project(str): The project that keys inside the value belong to.
+      value(object): The value to convert.
+    """
+    if value is None:
+        value_pb.null_value = 0
+
+    # bool must come before int since it's a subclass of it.
+    elif isinstance(value, bool):
+        value_pb.boolean_value = value
+
+    elif isinstance(value, int):
+        value_pb.integer_value = value
+
+    elif isinstance(value, float):
+        value_pb.double_value = value
+
+    elif isinstance(value, str):
+        value_pb.string_value = value
+
+    elif isinstance(value, bytes):
+        value_pb.blob_value = value
+
+    elif isinstance(value, datetime):
+        value_pb.timestamp_value.CopyFrom(_datetime_to_pb_timestamp(value))
+
+    elif isinstance(value, Key):
+        key_to_protobuf(value_pb.key_value, project, value)
+
+    elif isinstance(value, (list, tuple)):
+        array_pb = value_pb.array_value
+        array_pb.SetInParent()
+        for item in value:
+            value_to_protobuf(array_pb.values.add(), project, item)
+
+    else:
+        helpers._set_protobuf_value(value_pb, value)
+
+
+def value_from_protobuf(value_pb):
+    """Convert a value protobuf into a property value.
+
+    Parameters:
+      value_pb(entity_pb2.Value): The protobuf to convert.
+
+    Returns:
+      object: The value.
+    """
+    value_type = value_pb.WhichOneof("value_type")
+    getter = _value_getters.get(value_type)
+    if getter is None:
+        return helpers._get_value_from_value_pb(value_pb)
+    return getter(value_pb)
+
+
+def key_value_from_protobuf(value_pb, key_cache=None):
+    """Convert the value protobuf of a key property into a key or a
+    list of keys.
+
+    Parameters:
+      value_pb(entity_pb2.Value): The protobuf to convert.
+      key_cache(dict, optional): See :func:`key_from_protobuf`.
+
+    Returns:
+      object: The value.
+    """
+    if key_cache is None:
+        key_cache = {}
+
+    value_type = value_pb.WhichOneof("value_type")
+    if value_type == "key_value":
+        return key_from_protobuf(value_pb.key_value, key_cache)
+
+    elif value_type == "array_value":
+        return [key_value_from_protobuf(item_pb, key_cache) for item_pb in value_pb.array_value.values]
+
+    return value_from_protobuf(value_pb)
+
+
+#: A mapping from value protobuf fields to functions that extract
+#: property values out of them.  Values of any other type are
+#: converted by google.cloud.datastore.
+_value_getters = {
+    "null_value": lambda value_pb: None,
+    "boolean_value": lambda value_pb: value_pb.boolean_value,
+    "integer_value": lambda value_pb: value_pb.integer_value,
+    "double_value": lambda value_pb: value_pb.double_value,
+    "string_value": lambda value_pb: value_pb.string_value,
+    "blob_value": lambda value_pb: value_pb.blob_value,
+    "timestamp_value": lambda value_pb: _pb_timestamp_to_datetime(value_pb.timestamp_value),
+    "key_value": lambda value_pb: key_from_protobuf(value_pb.key_value),
+    "array_value": lambda value_pb: [value_from_protobuf(item_pb) for item_pb in value_pb.array_value.values],
+}
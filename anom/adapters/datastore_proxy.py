@@ -0,0 +1,241 @@
+import requests
+import socket
+import time
+
+from collections import namedtuple
+from contextvars import ContextVar
+from gcloud_requests import DatastoreRequestsProxy
+from threading import Lock, local
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from weakref import WeakSet
+
+from ..deadlines import DeadlineExceeded, check_deadline, deadline_exceeded, get_deadline, remaining_time
+
+#: The urllib3 retry config used while a deadline is active.  Requests
+#: aren't retried at the connection level then because a retry could
+#: easily outlast the deadline.
+_deadline_retry_config = Retry(0, read=False)
+
+#: The number of transactions the current context is inside of.  This
+#: replaces gcloud_requests' own counter, which is thread-local.
+_transaction_depth = ContextVar("anom.datastore_proxy.transaction_depth", default=0)
+
+
+def enter_transaction():
+    """Called by DatastoreAdapter when a transaction begins so that
+    conflicts aren't retried until it ends.
+    """
+    _transaction_depth.set(_transaction_depth.get() + 1)
+
+
+def exit_transaction():
+    """Called by DatastoreAdapter when a transaction ends.
+    """
+    _transaction_depth.set(max(_transaction_depth.get() - 1, 0))
+
+
+class PoolStats(namedtuple("PoolStats", (
+    "connections", "in_use", "idle", "requests", "wait_time", "max_wait_time",
+))):
+    """A snapshot of the state of a DatastoreAdapter's HTTP connection
+    pools, aggregated across all of its sessions.
+
+    Parameters:
+      connections(int): The number of connections that have been
+        opened so far.
+      in_use(int): The number of connections that are currently
+        checked out of the pools.
+      idle(int): The number of open connections that are waiting to
+        be reused.
+      requests(int): The number of times a connection was checked out
+        of the pools.
+      wait_time(float): The total number of seconds spent waiting for
+        connections to become available.
+      max_wait_time(float): The longest number of seconds spent
+        waiting for a connection to become available.
+    """
+
+
+class _PoolCounters:
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.wait_time = 0
+        self.max_wait_time = 0
+
+    def record(self, wait_time):
+        with self.lock:
+            self.requests += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+def _timed_pool_class(base, counters):
+    def _get_conn(self, timeout=None):
+        start = time.monotonic()
+        try:
+            return base._get_conn(self, timeout)
+        finally:
+            counters.record(time.monotonic() - start)
+
+    return type(base.__name__, (base,), {"_get_conn": _get_conn})
+
+
+class _HTTPAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, counters, tcp_keepalive, **options):
+        self.counters = counters
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**options)
+
+    @property
+    def max_retries(self):
+        if get_deadline() is not None:
+            return _deadline_retry_config
+        return self._max_retries
+
+    @max_retries.setter
+    def max_retries(self, max_retries):
+        self._max_retries = max_retries
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool_class(HTTPConnectionPool, self.counters),
+            "https": _timed_pool_class(HTTPSConnectionPool, self.counters),
+        }
+
+
+class ConfigurableDatastoreRequestsProxy(DatastoreRequestsProxy):
+    """A DatastoreRequestsProxy whose connection pools can be
+    configured and inspected.
+
+    Parameters:
+      credentials(google.auth.credentials.Credentials, optional)
+      pool_size(int, optional): The maximum number of connections to
+        keep open per session.
+      pool_block(bool, optional): Whether or not requests should wait
+        for a connection to be returned to the pool when all of its
+        connections are in use, rather than opening a connection that
+        gets discarded after the request.
+      share_session(bool, optional): Whether or not all threads should
+        share a single session, and thus a single connection pool.
+        By default, each thread gets its own session.
+      timeout(tuple[float, float], optional): The connect and read
+        timeouts for requests, in seconds.  Both are clamped to the
+        time left until the current deadline, if any.
+      tcp_keepalive(bool, optional): Whether or not TCP keep-alive
+        probes should be enabled on connections so that idle
+        connections aren't silently dropped by intermediaries.
+      retry_errors(bool, optional): Whether or not requests that fail
+        with retriable Datastore errors should be retried by the
+        proxy.
+    """
+
+    def __init__(
+            self, credentials=None, *, pool_size=32, pool_block=False, share_session=False,
+            timeout=DatastoreRequestsProxy.TIMEOUT_CONFIG, tcp_keepalive=False, retry_errors=True,
+    ):
+        super().__init__(credentials=credentials)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.share_session = share_session
+        self.tcp_keepalive = tcp_keepalive
+        self.retry_errors = retry_errors
+
+        self._counters = _PoolCounters()
+        self._adapters = WeakSet()
+        self._local = local()
+        self._shared_session = None
+        self._shared_session_lock = Lock()
+
+    @property
+    def TIMEOUT_CONFIG(self):
+        remaining = remaining_time()
+        if remaining is None:
+            return self.timeout
+
+        connect_timeout, read_timeout = self.timeout
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+    def request(self, method, url, *args, **kwargs):
+        check_deadline()
+        try:
+            return super().request(method, url, *args, **kwargs)
+        except requests.RequestException as e:
+            if deadline_exceeded():
+                raise DeadlineExceeded(f"Deadline exceeded while waiting on {method} {url}.") from e
+            raise
+
+    def pool_stats(self):
+        """Get a snapshot of the state of this proxy's connection pools.
+
+        Returns:
+          PoolStats: The pool stats.
+        """
+        connections = in_use = idle = 0
+        for adapter in list(self._adapters):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                queue = pool and pool.pool
+                if queue is None:  # The pool was closed.
+                    continue
+
+                connections += pool.num_connections
+                in_use += queue.maxsize - queue.qsize()
+                idle += sum(1 for conn in list(queue.queue) if conn is not None)
+
+        with self._counters.lock:
+            return PoolStats(
+                connections=connections,
+                in_use=in_use,
+                idle=idle,
+                requests=self._counters.requests,
+                wait_time=self._counters.wait_time,
+                max_wait_time=self._counters.max_wait_time,
+            )
+
+    def _max_retries_for_error(self, error):
+        if not self.retry_errors or get_deadline() is not None:
+            return None
+
+        # Conflicts inside of transactions are left up to transactional.
+        if error.get("status") == "ABORTED" and _transaction_depth.get() > 0:
+            return None
+        return super()._max_retries_for_error(error)
+
+    def _get_session(self):
+        if self.share_session:
+            if self._shared_session is None:
+                with self._shared_session_lock:
+                    if self._shared_session is None:
+                        self._shared_session = self._make_session()
+
+            return self._shared_session
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._make_session()
+        return session
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = _HTTPAdapter(
+            self._counters, self.tcp_keepalive,
+            max_retries=self.RETRY_CONFIG,
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=self.pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self._adapters.add(adapter)
+        return session
@@ -1,23 +1,81 @@
-import pylibmc
+import math
+import random
+import time
 import uuid
 
+from collections import namedtuple
 from contextlib import contextmanager
+from contextvars import ContextVar
 from hashlib import md5
-from threading import local
+from threading import Event, Lock
 
-from .. import Adapter, Transaction
+from .. import Adapter, Key, Transaction, compression
+from ..adapter import QueryResponse, _read_options
+from ..deadlines import remaining_time
+from ..model import lookup_model_by_kind
 from ..properties import Msgpack
+from ..query import QueryOptions
+from ..transaction import _new_transaction
+from .cache_clients import CacheClient, PylibmcCacheClient
+
+
+class CachePolicy(namedtuple("CachePolicy", ("enabled", "timeout", "compress_threshold", "codec", "max_size"))):
+    """Determines how a model's entities are cached by the
+    :class:`MemcacheAdapter`.  Models declare their policy by setting
+    a ``_cache_policy`` class attribute::
+
+      class AuditLog(Model):
+        _cache_policy = CachePolicy(timeout=300, compress_threshold=1024)
+
+    Parameters:
+      enabled(bool, optional): Whether or not entities should be
+        cached at all.
+      timeout(int, optional): The number of seconds entities are
+        cached for.  Defaults to the adapter's timeout.
+      compress_threshold(int, optional): Cached entities whose
+        serialized size is at least this many bytes are compressed.
+        Defaults to ``None``, meaning that entities aren't compressed.
+      codec(str or Codec, optional): The codec to compress entities
+        with.  Defaults to zlib.
+      max_size(int, optional): Entities whose cached size, after
+        compression, is larger than this many bytes aren't cached.
+    """
+
+    def __new__(cls, *, enabled=True, timeout=None, compress_threshold=None, codec="zlib", max_size=None):
+        if isinstance(codec, str):
+            codec = compression.get_codec(codec)
+
+        return super().__new__(
+            cls, enabled=enabled, timeout=timeout, compress_threshold=compress_threshold,
+            codec=codec, max_size=max_size,
+        )
+
+
+#: The policy of models that don't declare their own.
+_default_cache_policy = CachePolicy()
+
+#: The version of the format entities are cached in.  Cached entities
+#: whose version is different are treated as misses.
+_payload_version = 1
 
 
 class _MemcacheOuterTransaction(Transaction):
-    def __init__(self, adapter, ds_transaction):
+    def __init__(self, adapter, ds_transaction, read_only=False):
         self.adapter = adapter
         self.ds_transaction = ds_transaction
+        self.read_only = read_only
 
         self.batch = []
+        self.leases = {}
+        self.reads = {}
+        self.read_keys = {}
         self.begin = self.ds_transaction.begin
         self.rollback = self.ds_transaction.rollback
 
+    @property
+    def keys(self):
+        return self.ds_transaction.keys
+
     def _push_keys(self, keys):
         self.batch.extend(keys)
 
@@ -25,9 +83,18 @@ class _MemcacheOuterTransaction(Transaction):
         with self.adapter._bust(self.batch):
             self.ds_transaction.commit()
 
+        # Entities that were read inside the transaction were current
+        # as of the commit so they can be cached if nobody has written
+        # to them in the mean time.
+        leases, self.leases = self.leases, {}
+        self.adapter._cache_multi(leases, self.reads, self.read_keys)
+
     def end(self):
+        # Leases for transactions that didn't commit are released.
+        leases, self.leases = self.leases, {}
+        self.adapter._cache_multi(leases, {}, {})
         self.ds_transaction.end()
-        self.adapter._transactions.remove(self)
+        self.adapter._pop_transaction(self)
 
 
 class _MemcacheInnerTransaction(Transaction):
@@ -41,44 +108,118 @@ class _MemcacheInnerTransaction(Transaction):
 
     def end(self):
         self.ds_transaction.end()
-        self.adapter._transactions.remove(self)
+        self.adapter._pop_transaction(self)
 
     def __getattr__(self, name):
         return getattr(self.parent, name)
 
 
+class _Payload(namedtuple("_Payload", ("entity", "expires_at", "delta"))):
+    pass
+
+
+class _Flight:
+    def __init__(self):
+        self.done = Event()
+        self.ok = False
+        self.entity = None
+
+    def resolve(self, entities, memcache_key):
+        if memcache_key in entities:
+            self.ok = True
+            self.entity = entities[memcache_key]
+
+        self.done.set()
+
+
 class MemcacheAdapter(Adapter):
     """Transparently adds memcached-based strongly-consistent caching
     on top of another adapter for delete, get and put operations.
 
     Parameters:
-      client(pylibmc.Client): The memcached client instance to use.
-        This is automatically wrapped inside a ThreadMappedPool.
+      client(CacheClient or pylibmc.Client): The cache client to use.
+        pylibmc clients are automatically wrapped inside a
+        :class:`PylibmcCacheClient<anom.adapters.PylibmcCacheClient>`.
       adapter(Adapter): The adapter to wrap.
       prefix(str, optional): The string keys should be prefixed
         with.  Defaults to ``anom``.
+      cache_in_transactions(bool, optional): Whether or not entities
+        that are read inside transactions should be cached once those
+        transactions commit.  Reads inside read-only transactions are
+        never cached.  Defaults to ``False``.
+      cache_queries(bool, optional): Whether or not the results of
+        queries that are run with ``cache=True`` should be cached.
+        Cached results are invalidated whenever an entity of the
+        queried kind is written, at the cost of an additional memcache
+        round trip per write.  Defaults to ``False``.
+      coalesce_misses(bool, optional): Whether or not concurrent
+        lookups of the same missing keys within this process should be
+        coalesced into a single Datastore lookup.  A lookup that joins
+        one that is already in flight may observe writes made by other
+        processes a few milliseconds late.  Defaults to ``False``.
+      lease_wait(float, optional): The number of seconds to wait for
+        another process that's filling the cache for a key before
+        looking that key up in Datastore.  Defaults to ``0``.
+      early_refresh_beta(float, optional): Cached entities are
+        refreshed before they expire with a probability that grows as
+        they approach their expiration time, so that they don't miss
+        for every reader at once.  Larger values refresh entities
+        earlier and ``0`` disables early refreshes.  Defaults to
+        ``1``.
+      missing_timeout(int, optional): The number of seconds for which
+        lookups of entities that don't exist should be cached.
+        Defaults to ``0``, meaning that they aren't cached.
+
+    Models can customize how their entities are cached by declaring a
+    :class:`CachePolicy`.
     """
 
-    _state = local()
+    #: The stack of transactions the current context is inside of.
+    #: Every thread, asyncio task and greenlet has its own context.
+    _transaction_stack = ContextVar("anom.MemcacheAdapter.transactions", default=())
 
     _lock_prefix = b"LOCK@"
+    _fill_prefix = b"LOCK@FILL@"
+    _tombstone = b"NONE@"
     _lock_timeout = 60  # seconds
+    _flight_timeout = 5  # seconds
+    _fill_poll_interval = 0.01  # seconds
     _item_timeout = 86400  # one day in seconds
+    _query_timeout = 3600  # one hour in seconds
+
+    def __init__(
+            self, client, adapter, *, prefix="anom", cache_in_transactions=False, cache_queries=False,
+            coalesce_misses=False, lease_wait=0, early_refresh_beta=1, missing_timeout=0,
+    ):
+        if not isinstance(client, CacheClient):
+            client = PylibmcCacheClient(client)
 
-    def __init__(self, client, adapter, *, prefix="anom"):
-        self.client_pool = pylibmc.ThreadMappedPool(client)
+        self.client = client
         self.adapter = adapter
         self.prefix = prefix
+        self.cache_in_transactions = cache_in_transactions
+        self.cache_queries = cache_queries
+        self.coalesce_misses = coalesce_misses
+        self.lease_wait = lease_wait
+        self.early_refresh_beta = early_refresh_beta
+        self.missing_timeout = missing_timeout
 
-        self.query = self.adapter.query
+        self._flights = {}
+        self._flights_lock = Lock()
+        self._fingerprints = {}
 
     @property
     def _transactions(self):
-        "list[Transaction]: The current stack of Transactions."
-        transactions = getattr(self._state, "transactions", None)
-        if transactions is None:
-            transactions = self._state.transactions = []
-        return transactions
+        "tuple[Transaction]: The current stack of Transactions."
+        return self._transaction_stack.get()
+
+    def _push_transaction(self, transaction):
+        # The stack is never mutated in place since contexts that are
+        # copied from this one would share it otherwise.
+        self._transaction_stack.set(self._transactions + (transaction,))
+
+    def _pop_transaction(self, transaction):
+        self._transaction_stack.set(tuple(t for t in self._transactions if t is not transaction))
 
     def delete_multi(self, keys):
         if self.in_transaction:
@@ -88,70 +229,262 @@ class MemcacheAdapter(Adapter):
         with self._bust(keys):
             return self.adapter.delete_multi(keys)
 
-    def get_multi(self, keys):
+    def get_multi(self, keys, *, read_consistency=None, read_time=None):
         if self.in_transaction:
-            return self.adapter.get_multi(keys)
+            # Read-only transactions read a snapshot from when they
+            # began and they never conflict when they commit so what
+            # they read may already be stale by then.
+            if self.cache_in_transactions and not self.current_transaction.read_only and \
+               read_consistency is None and read_time is None:
+                return self._get_multi_in_transaction(keys)
+            return self.adapter.get_multi(keys, **_read_options(read_consistency, read_time))
+
+        # Snapshots may be older than what's in the cache so snapshot
+        # reads skip it.  Eventually-consistent reads are served like
+        # any other read since cached entities are never stale.
+        if read_time is not None:
+            return self.adapter.get_multi(keys, **_read_options(read_consistency, read_time))
+
+        # Entities of models that opted out of caching are looked up
+        # directly.
+        uncached = [index for index, key in enumerate(keys) if not self._get_policy(key.kind).enabled]
+        if not uncached:
+            return self._get_multi_cached(keys)
+
+        uncached_set = set(uncached)
+        cached = [index for index in range(len(keys)) if index not in uncached_set]
+        found = [None] * len(keys)
+        for indexes, entities in (
+                (cached, self._get_multi_cached([keys[index] for index in cached])),
+                (uncached, self.adapter.get_multi(
+                    [keys[index] for index in uncached], **_read_options(read_consistency),
+                )),
+        ):
+            for index, entity in zip(indexes, entities):
+                found[index] = entity
+
+        return found
+
+    def _get_multi_cached(self, keys):
+        if not keys:
+            return []
 
         # Get all the cached keys.
-        pairs = {self._convert_key_to_memcache(key): key for key in keys}
-        with self.client_pool.reserve() as client:
-            mapping = client.get_multi(pairs.keys())
+        memcache_keys = [self._convert_key_to_memcache(key) for key in keys]
+        mapping = self.client.get_multi(memcache_keys)
+        if self.lease_wait:
+            self._wait_for_fills(mapping)
 
         # Sort out which ones were found in Memcache and which ones we
         # need to get from Datastore.
-        found, missing = [None] * len(keys), []
-        for memcache_key, anom_key in pairs.items():
+        found, missing, stale, now = [None] * len(keys), {}, {}, time.time()
+        for index, memcache_key in enumerate(memcache_keys):
             data = mapping.get(memcache_key)
             # If there is no data or the data appears to be locked, we
             # have to grab the entity from datastore.
             if data is None or data.startswith(self._lock_prefix):
-                missing.append(anom_key)
+                missing.setdefault(memcache_key, []).append(index)
                 continue
 
-            index = keys.index(anom_key)
-            found[index] = Msgpack._loads(data)
+            # Entities that are known not to exist are left as None.
+            if data == self._tombstone:
+                continue
 
-        # Get and cache missing keys from Datastore.
-        ds_results = self.adapter.get_multi(missing)
-        for anom_key, entity in zip(missing, ds_results):
-            index = keys.index(anom_key)
-            found[index] = entity
-            if entity is None:
+            # Entities that were cached in a different format, or
+            # before their model changed, are replaced the same way
+            # entities that are about to expire are.
+            payload = self._loads(data, keys[index].kind)
+            if payload is None or self._should_refresh(now, payload.expires_at, payload.delta):
+                stale[memcache_key] = data
+                missing.setdefault(memcache_key, []).append(index)
                 continue
 
-            key = self._convert_key_to_memcache(anom_key)
-            data = Msgpack._dumps(entity)
-            self._cache(key, data)
+            found[index] = payload.entity
+
+        if not missing:
+            return found
+
+        missing_keys = {memcache_key: keys[indexes[0]] for memcache_key, indexes in missing.items()}
+        entities = self._fetch(missing_keys, mapping, stale)
+        for memcache_key, indexes in missing.items():
+            for index in indexes:
+                found[index] = entities[memcache_key]
+
+        return found
+
+    def _fetch(self, keys, mapping, stale):
+        if not self.coalesce_misses:
+            return self._fill(keys, mapping, stale)
+
+        # Only one thread per process looks up any given key at a
+        # time.  The others wait for it to finish and reuse its result.
+        owned, joined = {}, {}
+        with self._flights_lock:
+            for memcache_key in keys:
+                flight = self._flights.get(memcache_key)
+                if flight is None:
+                    owned[memcache_key] = self._flights[memcache_key] = _Flight()
+                else:
+                    joined[memcache_key] = flight
+
+        entities = {}
+        try:
+            if owned:
+                entities.update(self._fill({key: keys[key] for key in owned}, mapping, stale))
+
+        finally:
+            with self._flights_lock:
+                for memcache_key, flight in owned.items():
+                    if self._flights.get(memcache_key) is flight:
+                        del self._flights[memcache_key]
+
+            for memcache_key, flight in owned.items():
+                flight.resolve(entities, memcache_key)
+
+        # Lookups that failed or took too long are retried without
+        # coalescing.
+        retries = {}
+        for memcache_key, flight in joined.items():
+            if flight.done.wait(self._flight_timeout) and flight.ok:
+                entities[memcache_key] = None if flight.entity is None else dict(flight.entity)
+            else:
+                retries[memcache_key] = keys[memcache_key]
+
+        if retries:
+            entities.update(self._fill(retries, mapping, stale))
+
+        return entities
+
+    def _fill(self, keys, mapping, stale):
+        # Lease the keys that weren't in Memcache at all *before*
+        # reading them from Datastore so that a concurrent write that
+        # locks a key while we're reading it invalidates our lease.
+        # Keys that are locked by someone else are read but not cached
+        # and stale keys are only replaced if they haven't changed.
+        expected = {key: stale[key] for key in keys if key in stale}
+        expected.update(self._lease([key for key in keys if key not in mapping]))
+
+        # Get and cache missing keys from Datastore.
+        start = time.monotonic()
+        ds_results = self.adapter.get_multi(list(keys.values()))
+        entities = dict(zip(keys, ds_results))
+        self._cache_multi(expected, entities, keys, time.monotonic() - start)
+        return entities
+
+    def _wait_for_fills(self, mapping):
+        filling = [key for key, data in mapping.items() if data.startswith(self._fill_prefix)]
+        lease_wait, remaining = self.lease_wait, remaining_time()
+        if remaining is not None:
+            lease_wait = min(lease_wait, remaining)
+
+        deadline = time.monotonic() + lease_wait
+        while filling and time.monotonic() < deadline:
+            time.sleep(self._fill_poll_interval)
+            polled = self.client.get_multi(filling)
+            for key in filling:
+                data = polled.get(key)
+                if data is None:
+                    del mapping[key]
+                else:
+                    mapping[key] = data
+
+            filling = [key for key in filling if key in mapping and mapping[key].startswith(self._fill_prefix)]
+
+    def _should_refresh(self, now, expires_at, delta):
+        # See "Optimal Probabilistic Cache Stampede Prevention" by
+        # Vattani, Chierichetti and Lowenstein.
+        if not self.early_refresh_beta or expires_at is None:
+            return False
+
+        return now - delta * self.early_refresh_beta * math.log(1 - random.random()) >= expires_at
+
+    def _get_multi_in_transaction(self, keys):
+        # Entities are leased before they're read, the same way they
+        # are outside of transactions, but they're only cached after
+        # the transaction commits.  Entities that were written inside
+        # the transaction are busted when it commits so they aren't
+        # leased.
+        transaction = self.current_transaction
+        written = set(transaction.batch)
+        memcache_keys = [self._convert_key_to_memcache(key) for key in keys]
+        transaction.leases.update(self._lease([
+            memcache_key for key, memcache_key in zip(keys, memcache_keys)
+            if key not in written and memcache_key not in transaction.leases and self._get_policy(key.kind).enabled
+        ]))
+
+        found = self.adapter.get_multi(keys)
+        for key, memcache_key, entity in zip(keys, memcache_keys, found):
+            if key not in written and memcache_key in transaction.leases:
+                transaction.reads[memcache_key] = entity
+                transaction.read_keys[memcache_key] = key
 
         return found
 
     def put_multi(self, requests):
-        # Partial keys' cache doesn't need to be cleared since they
-        # can't have been already set so we have to collect the full
-        # keys and pass them to the transaction.
-        full_keys = [request.key for request in requests if not request.key.is_partial]
+        keys = [request.key for request in requests]
         if self.in_transaction:
-            self.current_transaction._push_keys(full_keys)
+            self.current_transaction._push_keys(keys)
             return self.adapter.put_multi(requests)
 
-        with self._bust(full_keys):
+        with self._bust(keys):
             return self.adapter.put_multi(requests)
 
-    def transaction(self, propagation):
-        ds_transaction = self.adapter.transaction(propagation)
+    def query(self, query, options):
+        # Projections can't be served from the entity cache, kindless
+        # queries can't be invalidated and queries inside transactions
+        # or against snapshots must see their snapshot.
+        if not self.cache_queries or not options.cache or \
+           not query.kind or query.projection or self.in_transaction or \
+           options.read_time is not None or not self._get_policy(query.kind).enabled:
+            return self.adapter.query(query, options)
+
+        generation_key = self._convert_kind_to_memcache(query.namespace, query.kind)
+        result_key = self._convert_query_to_memcache(query, options)
+        mapping = self.client.get_multi([generation_key, result_key])
+
+        # Results are tagged with the generation of their kind at the
+        # time the query was run.  Writes change the generation so
+        # results that are tagged with an old one are stale.
+        generation = mapping.get(generation_key)
+        result = mapping.get(result_key)
+        if generation is not None and result is not None:
+            result_generation, paths, cursor = Msgpack._loads(result)
+            if result_generation == generation:
+                keys = [Key.from_path(*path, namespace=query.namespace) for path in paths]
+                return self._load_query_response(keys, cursor, options)
+
+        if generation is None:
+            generation = self._lock_value()
+            # If someone else initialized the generation first, then
+            # we can't know if the results we're about to get are
+            # current so we don't cache them.
+            if self.client.add_multi({generation_key: generation}):
+                generation = None
+
+        keys_only_options = QueryOptions(query, **options).replace(keys_only=True)
+        entities, cursor = self.adapter.query(query, keys_only_options)
+        keys = [key for key, _ in entities]
+        if generation is not None:
+            result = Msgpack._dumps([generation, [key.path for key in keys], cursor])
+            self.client.set_multi({result_key: result}, self._query_timeout)
+
+        return self._load_query_response(keys, cursor, options)
+
+    def transaction(self, propagation, *, read_only=False):
+        ds_transaction = _new_transaction(self.adapter, propagation, read_only)
 
         if propagation == Transaction.Propagation.Independent:
-            transaction = _MemcacheOuterTransaction(self, ds_transaction)
-            self._transactions.append(transaction)
+            transaction = _MemcacheOuterTransaction(self, ds_transaction, read_only)
+            self._push_transaction(transaction)
             return transaction
 
         elif propagation == Transaction.Propagation.Nested:
             if self._transactions:
                 transaction = _MemcacheInnerTransaction(self.current_transaction, ds_transaction)
             else:
-                transaction = _MemcacheOuterTransaction(self, ds_transaction)
+                transaction = _MemcacheOuterTransaction(self, ds_transaction, read_only)
 
-            self._transactions.append(transaction)
+            self._push_transaction(transaction)
             return transaction
 
         else:  # pragma: no cover
@@ -169,52 +502,158 @@ class MemcacheAdapter(Adapter):
         digest = md5(str(anom_key).encode("utf-8")).hexdigest()
         return f"{self.prefix}:{digest}"
 
+    def _convert_kind_to_memcache(self, namespace, kind):
+        digest = md5(repr((namespace or "", kind)).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:kind:{digest}"
+
+    def _convert_query_to_memcache(self, query, options):
+        fingerprint = (
+            query.kind, query.ancestor, query.namespace or "", query.filters, query.orders,
+            options.batch_size, options.offset, options.cursor,
+        )
+        digest = md5(repr(fingerprint).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:query:{digest}"
+
+    def _load_query_response(self, keys, cursor, options):
+        if options.keys_only:
+            return QueryResponse(entities=[(key, None) for key in keys], cursor=cursor)
+
+        # Entities that were deleted after the results were cached
+        # are skipped.
+        entities = self.get_multi(keys)
+        return QueryResponse(entities=[
+            (key, entity) for key, entity in zip(keys, entities) if entity is not None
+        ], cursor=cursor)
+
     @contextmanager
     def _bust(self, keys):
+        # Partial keys' cache doesn't need to be cleared since they
+        # can't have been already set, and neither does the cache of
+        # models that aren't cached, but both affect the results of
+        # queries for their kinds.
         current_lock = self._lock_value()
-        memcache_keys = [self._convert_key_to_memcache(key) for key in keys]
+        memcache_keys = [
+            self._convert_key_to_memcache(key) for key in keys
+            if not key.is_partial and self._get_policy(key.kind).enabled
+        ]
         memcache_pairs = {key: current_lock for key in memcache_keys}
 
         # Lock the keys so that they can't be set for the duration of
         # the delete (or until timeout).
-        with self.client_pool.reserve() as client:
-            client.set_multi(memcache_pairs, self._lock_timeout)
+        self.client.set_multi(memcache_pairs, self._lock_timeout)
 
         try:
             # Delete the keys from Datastore.
             yield
 
         finally:
-            # Finally, delete the keys from Memcache.
-            with self.client_pool.reserve() as client:
-                client.delete_multi(memcache_keys)
-
-    def _cache(self, key, data):
-        current_lock = self._lock_value()
-        with self.client_pool.reserve() as client:
-            while True:
-                value, cid = client.gets(key)
-                # If there is a lock value in Memcache that is
-                # different from our own we have to bail.
-                if value and value.startswith(self._lock_prefix) and value != current_lock:
-                    return
-
-                # If there isn't a value at all, we have to add one
-                # and try again.
-                if cid is None:
-                    client.add(key, current_lock, self._lock_timeout)
-                    continue
-
-                try:
-                    return client.cas(key, data, cid, self._item_timeout)
-
-                # There is a small chance that between the `gets` and
-                # "now" the key will have been deleted by a concurrent
-                # process, so we account for that possibility here.
-                except pylibmc.NotFound:  # pragma: no cover
-                    return
-
-    def _lock_value(self):
+            # Finally, delete the keys from Memcache and invalidate
+            # any cached query results for their kinds.  Lookups that
+            # are in flight may have started before the write so new
+            # lookups mustn't join them.
+            self.client.delete_multi(memcache_keys)
+            if self.coalesce_misses:
+                self._land_flights(memcache_keys)
+            if self.cache_queries:
+                self.client.set_multi({
+                    self._convert_kind_to_memcache(key.namespace, key.kind): current_lock
+                    for key in keys
+                })
+
+    def _land_flights(self, memcache_keys):
+        with self._flights_lock:
+            for key in memcache_keys:
+                self._flights.pop(key, None)
+
+    def _lease(self, memcache_keys):
+        current_lock = self._lock_value(self._fill_prefix)
+        memcache_pairs = {key: current_lock for key in memcache_keys}
+        if not memcache_pairs:
+            return {}
+
+        # add_multi only sets the keys that don't already exist and it
+        # returns the ones that it failed to set, meaning that someone
+        # else got to them first.
+        failed = set(self.client.add_multi(memcache_pairs, self._lock_timeout))
+        return {key: lock for key, lock in memcache_pairs.items() if key not in failed}
+
+    def _cache_multi(self, leases, entities, keys, delta=0):
+        # Values are only replaced if we still hold their lease.  If a
+        # key was locked by a concurrent write or our lease expired
+        # while we were reading from Datastore then we have to bail.
+        # Entities that don't exist are cached as tombstones if
+        # missing_timeout is set.  Otherwise, and for entities that
+        # were never read or that are too large, we release their
+        # leases in order not to force every other reader to go to
+        # Datastore until they expire.
+        batches = {}
+        for key, lock in leases.items():
+            entity, value, timeout = entities.get(key), None, self._item_timeout
+            if entity is not None:
+                policy = self._get_policy(keys[key].kind)
+                timeout = policy.timeout or self._item_timeout
+                value = self._dumps(entity, keys[key].kind, delta, policy, timeout)
+                if policy.max_size is not None and len(value) > policy.max_size:
+                    value = None
+
+            elif key in entities and self.missing_timeout:
+                value, timeout = self._tombstone, self.missing_timeout
+
+            batches.setdefault(timeout, {})[key] = (lock, value)
+
+        for timeout, batch in batches.items():
+            self.client.cas_multi(batch, timeout)
+
+    def _get_policy(self, kind):
+        try:
+            model = lookup_model_by_kind(kind)
+        except RuntimeError:
+            return _default_cache_policy
+
+        return getattr(model, "_cache_policy", _default_cache_policy)
+
+    def _get_fingerprint(self, kind):
+        fingerprint = self._fingerprints.get(kind)
+        if fingerprint is None:
+            try:
+                model = lookup_model_by_kind(kind)
+                schema = sorted(
+                    (prop.name_on_entity, type(prop).__name__, prop.repeated)
+                    for prop in model._properties.values()
+                )
+            except RuntimeError:
+                schema = []
+
+            fingerprint = self._fingerprints[kind] = md5(repr(schema).encode("utf-8")).hexdigest()[:8]
+        return fingerprint
+
+    def _dumps(self, entity, kind, delta, policy, timeout):
+        # Entities are stored along with their expiration time and the
+        # time it took to look them up so that they can be refreshed
+        # early.  The header of the body determines the codec it was
+        # compressed with.  Entities that are smaller than the
+        # compression threshold are stored behind the raw codec's
+        # header.
+        data = Msgpack._dumps(entity)
+        if policy.compress_threshold is None:
+            data = compression.RawCodec.header + data
+        else:
+            data = compression.compress(data, policy.codec, min_size=policy.compress_threshold)
+
+        return Msgpack._dumps([_payload_version, self._get_fingerprint(kind), time.time() + timeout, delta, data])
+
+    def _loads(self, data, kind):
+        value = Msgpack._loads(data)
+        if not isinstance(value, list) or len(value) != 5 or value[0] != _payload_version:
+            return None
+
+        _, fingerprint, expires_at, delta, data = value
+        if fingerprint != self._get_fingerprint(kind):
+            return None
+
+        return _Payload(Msgpack._loads(compression.decompress(data)), expires_at, delta)
+
+    def _lock_value(self, prefix=None):
         random_value = str(uuid.uuid4()).encode("ascii")
-        lock_value = self._lock_prefix + random_value
+        lock_value = (prefix or self._lock_prefix) + random_value
         return lock_value
@@ -0,0 +1,182 @@
+import io
+import os
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+
+#: The global blob store instance.
+_blob_store = None
+
+
+def get_blob_store():
+    """Get the current global BlobStore instance.
+
+    Raises:
+      RuntimeError: If no global blob store was set.
+
+    Returns:
+      BlobStore: The global blob store.
+    """
+    if _blob_store is None:
+        raise RuntimeError("No blob store has been set.  Call set_blob_store first.")
+    return _blob_store
+
+
+def set_blob_store(blob_store):
+    """Set the global BlobStore instance.
+
+    Parameters:
+      blob_store(BlobStore): The instance to set as the global blob
+        store.  Property-specific blob stores will not be replaced.
+
+    Returns:
+      BlobStore: The input blob store.
+    """
+    global _blob_store
+    _blob_store = blob_store
+    return _blob_store
+
+
+class BlobStore:  # pragma: no cover
+    """Abstract base class for blob stores.  Blob stores hold the
+    payloads of :class:`BlobRef<anom.properties.BlobRef>` properties
+    that are too large to be stored inside their entities.
+
+    Blobs are content-addressed: their ids are derived from their
+    contents, so storing the same payload twice is idempotent.
+    """
+
+    def get_multi(self, blob_ids):
+        """Get multiple blobs by their ids.
+
+        Parameters:
+          blob_ids(list[str]): The ids of the blobs to get.
+
+        Returns:
+          list[bytes]: The blobs.  Entries for blobs that cannot be
+          found are going to be ``None``.
+        """
+        raise NotImplementedError
+
+    def put(self, blob_id, data):
+        """Store a blob.  Stores may skip the write if a blob with
+        the same id already exists.
+
+        Parameters:
+          blob_id(str): The id of the blob.
+          data(bytes): The blob's contents.
+        """
+        raise NotImplementedError
+
+    def delete_multi(self, blob_ids):
+        """Delete multiple blobs by their ids.  Missing blobs are
+        ignored.
+
+        Parameters:
+          blob_ids(list[str]): The ids of the blobs to delete.
+        """
+        raise NotImplementedError
+
+    def open(self, blob_id):
+        """Open a blob for streaming.
+
+        Parameters:
+          blob_id(str): The id of the blob to open.
+
+        Raises:
+          KeyError: If the blob does not exist.
+
+        Returns:
+          io.BufferedIOBase: A binary file-like object.
+        """
+        raise NotImplementedError
+
+
+class MemoryBlobStore(BlobStore):
+    """A blob store that keeps blobs in memory.  Useful for testing.
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self._lock = RLock()
+
+    def get_multi(self, blob_ids):
+        with self._lock:
+            return [self.blobs.get(blob_id) for blob_id in blob_ids]
+
+    def put(self, blob_id, data):
+        with self._lock:
+            self.blobs[blob_id] = bytes(data)
+
+    def delete_multi(self, blob_ids):
+        with self._lock:
+            for blob_id in blob_ids:
+                self.blobs.pop(blob_id, None)
+
+    def open(self, blob_id):
+        with self._lock:
+            return io.BytesIO(self.blobs[blob_id])
+
+
+class FilesystemBlobStore(BlobStore):
+    """A blob store that keeps blobs in a directory on the local
+    filesystem.  Multiple blobs are read concurrently.
+
+    Parameters:
+      root(str): The directory to store blobs in.  It's created if it
+        does not exist.
+      max_workers(int, optional): The maximum number of blobs to read
+        concurrently.
+    """
+
+    def __init__(self, root, *, max_workers=8):
+        self.root = root
+        self.max_workers = max_workers
+        os.makedirs(root, exist_ok=True)
+
+    def get_multi(self, blob_ids):
+        if len(blob_ids) < 2:
+            return [self._read(blob_id) for blob_id in blob_ids]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(blob_ids))) as executor:
+            return list(executor.map(self._read, blob_ids))
+
+    def put(self, blob_id, data):
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            return
+
+        # Blobs are written to a temporary file first and then moved
+        # into place so that readers never see partial blobs.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+        os.replace(temp_path, path)
+
+    def delete_multi(self, blob_ids):
+        for blob_id in blob_ids:
+            try:
+                os.remove(self._path(blob_id))
+            except FileNotFoundError:
+                pass
+
+    def open(self, blob_id):
+        try:
+            return open(self._path(blob_id), "rb")
+        except FileNotFoundError:
+            raise KeyError(blob_id)
+
+    def _path(self, blob_id):
+        if not blob_id.isalnum():
+            raise ValueError(f"Invalid blob id {blob_id!r}.")
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def _read(self, blob_id):
+        try:
+            with open(self._path(blob_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,381 @@
+import zlib
+
+from threading import local
+
+#: The registry of known codec classes, keyed by their names.
+_codecs_by_name = {}
+
+#: The registry of known codec classes, keyed by their header bytes.
+_codecs_by_header = {}
+
+#: The size of the chunks that are fed to compressors.  Feeding large
+#: values in chunks bounds the size of the intermediate buffers that
+#: compressors allocate.
+_chunk_size = 262144
+
+#: Default instances of registered codecs.  These are used to
+#: decompress values whose header doesn't match the header of the
+#: codec belonging to the property that's loading them.
+_default_codecs = {}
+
+
+class Codec:
+    """Base class for compression codecs.  Codecs are used by
+    :class:`Compressable<anom.properties.Compressable>` properties to
+    compress their values before they are persisted.
+
+    Every codec except for zlib prefixes the values it compresses with
+    a header byte so that values can be decompressed regardless of the
+    codec that the property loading them is configured with.  zlib
+    values are stored without a header in order to remain compatible
+    with data that was persisted before codecs were introduced.  Header
+    bytes must never have ``8`` in their lower nibble since that would
+    make them indistinguishable from the first byte of a zlib stream.
+
+    Parameters:
+      level(int, optional): The amount of compression to apply.
+        ``-1`` represents the codec's default level.
+
+    Attributes:
+      name(str): The name of this codec.
+      header(bytes or None): The header byte of this codec.
+    """
+
+    name = None
+    header = None
+
+    def __init__(self, *, level=-1):
+        self.level = level
+
+    def compress(self, data):  # pragma: no cover
+        """Compress a bytestring.
+
+        Parameters:
+          data(bytes): The data to compress.
+
+        Returns:
+          bytes: The compressed data, without a header.
+        """
+        raise NotImplementedError
+
+    def compressor(self, size):
+        """Create a streaming compressor.  Codecs that don't support
+        streaming fall back to compressing values in one shot.
+
+        Parameters:
+          size(int): The total size of the data that's going to be
+            fed to the compressor.
+
+        Returns:
+          object: An object with ``compress(chunk)`` and ``flush()``
+          methods, like the ones returned by :func:`zlib.compressobj`.
+        """
+        return _OneShotCompressor(self)
+
+    def decompress(self, data):  # pragma: no cover
+        """Decompress a bytestring.
+
+        Parameters:
+          data(bytes or memoryview): The data to decompress, without
+            a header.
+
+        Returns:
+          bytes: The decompressed data.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(level={self.level!r})"
+
+
+def register_codec(codec_class):
+    """Register a codec so that it may be referred to by name and so
+    that values compressed with it can be decompressed by any property.
+
+    Parameters:
+      codec_class(type): A subclass of :class:`Codec`.
+
+    Raises:
+      ValueError: If the codec's name or header conflicts with that of
+        an existing codec or if its header byte is invalid.
+
+    Returns:
+      type: The input codec class.
+    """
+    name, header = codec_class.name, codec_class.header
+    if name in _codecs_by_name:
+        raise ValueError(f"A codec named {name!r} is already registered.")
+
+    if header is not None:
+        if len(header) != 1 or header[0] & 0x0F == 8:
+            raise ValueError(f"Invalid codec header {header!r}.")
+
+        if header in _codecs_by_header:
+            raise ValueError(f"A codec with header {header!r} is already registered.")
+
+        _codecs_by_header[header] = codec_class
+
+    _codecs_by_name[name] = codec_class
+    return codec_class
+
+
+def get_codec(name, **options):
+    """Instantiate a registered codec by name.
+
+    Parameters:
+      name(str): The name of the codec.
+      \**options(dict): Parameters to pass to the codec's constructor.
+
+    Raises:
+      ValueError: If no codec with that name has been registered.
+
+    Returns:
+      Codec: The codec.
+    """
+    try:
+        return _codecs_by_name[name](**options)
+    except KeyError:
+        raise ValueError(f"Codec {name!r} is not registered.")
+
+
+def compress(data, codec, *, min_size=0):
+    """Compress a bytestring using the given codec, prefixing the
+    result with the codec's header.
+
+    Parameters:
+      data(bytes): The data to compress.
+      codec(Codec): The codec to use.
+      min_size(int, optional): Values smaller than this many bytes
+        are stored uncompressed, behind a header byte.
+
+    Returns:
+      bytes: The compressed data.
+    """
+    if len(data) < min_size:
+        return RawCodec.header + data
+
+    chunks = [] if codec.header is None else [codec.header]
+    compressor = codec.compressor(len(data))
+    view = memoryview(data)
+    for offset in range(0, len(view), _chunk_size):
+        chunks.append(compressor.compress(view[offset:offset + _chunk_size]))
+
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+
+def decompress(data, codec=None):
+    """Decompress a bytestring based on its header.
+
+    Parameters:
+      data(bytes): The data to decompress.
+      codec(Codec, optional): The codec to prefer when the data's
+        header matches its own.  This is how codecs that carry state,
+        such as dictionaries, get used on load.
+
+    Returns:
+      bytes: The decompressed data.
+    """
+    header = data[:1]
+    if codec is None or codec.header != header:
+        codec_class = _codecs_by_header.get(header)
+        if codec_class is None:
+            return _default_codec(ZlibCodec).decompress(data)
+
+        codec = _default_codec(codec_class)
+
+    return codec.decompress(memoryview(data)[1:])
+
+
+class _OneShotCompressor:
+    def __init__(self, codec):
+        self.codec = codec
+        self.chunks = []
+
+    def compress(self, chunk):
+        self.chunks.append(chunk)
+        return b""
+
+    def flush(self):
+        return self.codec.compress(b"".join(self.chunks))
+
+
+def _default_codec(codec_class):
+    codec = _default_codecs.get(codec_class)
+    if codec is None:
+        codec = _default_codecs[codec_class] = codec_class()
+    return codec
+
+
+@register_codec
+class RawCodec(Codec):
+    """A codec that doesn't compress values.  It's used to store
+    values that are too small to benefit from compression.
+    """
+
+    name = "raw"
+    header = b"\x00"
+
+    def compress(self, data):
+        return data
+
+    def decompress(self, data):
+        return bytes(data)
+
+
+@register_codec
+class ZlibCodec(Codec):
+    """A codec based on :mod:`zlib`.  This is the default codec.
+
+    Parameters:
+      level(int, optional): A value between ``-1`` and ``9``.  See
+        :func:`zlib.compress` for details.
+    """
+
+    name = "zlib"
+
+    def __init__(self, *, level=-1):
+        if not (-1 <= level <= 9):
+            raise ValueError("compression_level must be an integer between -1 and 9.")
+
+        super().__init__(level=level)
+
+    def compress(self, data):
+        return zlib.compress(data, level=self.level)
+
+    def compressor(self, size):
+        return zlib.compressobj(self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+@register_codec
+class Lz4Codec(Codec):
+    """A codec based on the lz4_ frame format.  lz4 trades off
+    compression ratio for speed.  Install anom with ``pip install
+    anom[lz4]`` in order to use it.
+
+    Parameters:
+      level(int, optional): A value between ``-1`` and ``16``.
+
+    .. _lz4: https://python-lz4.readthedocs.io
+    """
+
+    name = "lz4"
+    header = b"\x01"
+
+    def __init__(self, *, level=-1):
+        import lz4.frame
+
+        if not (-1 <= level <= 16):
+            raise ValueError("compression_level must be an integer between -1 and 16.")
+
+        super().__init__(level=level)
+        self._frame = lz4.frame
+
+    def compress(self, data):
+        return self._frame.compress(data, compression_level=max(self.level, 0))
+
+    def compressor(self, size):
+        return _Lz4Compressor(self._frame.LZ4FrameCompressor(compression_level=max(self.level, 0)), size)
+
+    def decompress(self, data):
+        return self._frame.decompress(data)
+
+
+class _Lz4Compressor:
+    def __init__(self, compressor, size):
+        self.compressor = compressor
+        self.header = compressor.begin(source_size=size)
+
+    def compress(self, chunk):
+        header, self.header = self.header, b""
+        return header + self.compressor.compress(chunk)
+
+    def flush(self):
+        return self.header + self.compressor.flush()
+
+
+@register_codec
+class ZstdCodec(Codec):
+    """A codec based on zstandard_.  Install anom with ``pip install
+    anom[zstd]`` in order to use it.
+
+    Small, repetitive values (eg. JSON blobs with the same set of
+    keys) compress much better when a dictionary that was trained on
+    a representative sample of them is used.  See :meth:`train`.
+
+    Note:
+      Values compressed with a dictionary can only be decompressed by
+      a codec that uses the same dictionary, so dictionaries must be
+      kept around for as long as any data compressed with them is.
+
+    Parameters:
+      level(int, optional): A value between ``-1`` and ``22``.
+      dictionary(bytes, optional): A trained compression dictionary.
+
+    .. _zstandard: https://python-zstandard.readthedocs.io
+    """
+
+    name = "zstd"
+    header = b"\x02"
+
+    def __init__(self, *, level=-1, dictionary=None):
+        import zstandard
+
+        if not (-1 <= level <= 22):
+            raise ValueError("compression_level must be an integer between -1 and 22.")
+
+        super().__init__(level=level)
+        self._zstd = zstandard
+        self._level = 3 if level == -1 else level
+        self._state = local()
+        self.dictionary = None
+        if dictionary is not None:
+            self.dictionary = zstandard.ZstdCompressionDict(dictionary)
+            self.dictionary.precompute_compress(level=self._level)
+
+    @classmethod
+    def train(cls, samples, *, size=16384, level=-1):
+        """Train a dictionary on a set of sample values and return a
+        codec that uses it.
+
+        Parameters:
+          samples(list[bytes]): Representative values.
+          size(int, optional): The maximum size of the dictionary in
+            bytes.
+          level(int, optional): The amount of compression to apply.
+
+        Returns:
+          ZstdCodec: A codec.  Its ``dictionary`` can be persisted
+          with ``codec.dictionary.as_bytes()``.
+        """
+        import zstandard
+
+        dictionary = zstandard.train_dictionary(size, samples)
+        return cls(level=level, dictionary=dictionary.as_bytes())
+
+    def compress(self, data):
+        # Compressor objects are expensive to create and they aren't
+        # thread-safe so each thread gets its own.
+        return self._compressor().compress(data)
+
+    def compressor(self, size):
+        return self._compressor().compressobj(size=size)
+
+    def _compressor(self):
+        compressor = getattr(self._state, "compressor", None)
+        if compressor is None:
+            compressor = self._state.compressor = self._zstd.ZstdCompressor(
+                level=self._level, dict_data=self.dictionary,
+            )
+
+        return compressor
+
+    def decompress(self, data):
+        decompressor = getattr(self._state, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._state.decompressor = self._zstd.ZstdDecompressor(dict_data=self.dictionary)
+
+        return decompressor.decompress(data)
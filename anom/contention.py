@@ -0,0 +1,200 @@
+import time
+
+from collections import namedtuple
+from threading import Lock
+
+
+class ContentionStats(namedtuple("ContentionStats", ("name", "attempts", "conflicts"))):
+    """The number of times transactions were attempted and the number
+    of times they failed to commit for a transactional function or an
+    entity group.
+
+    Parameters:
+      name(str or anom.Key): The qualified name of the function or the
+        root key of the entity group.
+      attempts(int): The number of times a transaction was attempted.
+      conflicts(int): The number of attempts that failed to commit.
+    """
+
+    @property
+    def conflict_rate(self):
+        "float: The fraction of attempts that failed to commit."
+        return self.conflicts / self.attempts if self.attempts else 0
+
+
+class ContentionReport(namedtuple("ContentionReport", ("functions", "entity_groups"))):
+    """The most contended transactional functions and entity groups,
+    ordered by their number of conflicts.
+
+    Parameters:
+      functions(list[ContentionStats]): The transactional functions.
+      entity_groups(list[ContentionStats]): The entity groups.
+    """
+
+
+class _Counters:
+    def __init__(self, now):
+        self.attempts = 0
+        self.conflicts = 0
+        self.recent_attempts = 0
+        self.recent_conflicts = 0
+        self.updated_at = now
+
+    def record(self, conflict, now, half_life):
+        decay = 0.5 ** ((now - self.updated_at) / half_life)
+        self.recent_attempts = self.recent_attempts * decay + 1
+        self.recent_conflicts = self.recent_conflicts * decay + conflict
+        self.updated_at = now
+        self.attempts += 1
+        self.conflicts += conflict
+
+    def recent_conflict_rate(self, now, half_life):
+        # Both counts decay at the same rate so their ratio doesn't
+        # change over time, but groups that haven't been contended in
+        # a while shouldn't be considered hot anymore.
+        if now - self.updated_at > half_life * 4:
+            return 0
+        return self.recent_conflicts / self.recent_attempts
+
+
+class ContentionTracker:
+    """Keeps count of the transactions that fail to commit, per
+    transactional function and per entity group, and determines how
+    much harder :func:`transactional<anom.transactional>` backs off
+    when retrying transactions that touch hot entity groups.
+
+    Since Datastore doesn't report which entity group caused a
+    transaction to fail, every group the transaction read from or
+    wrote to is counted.
+
+    Parameters:
+      half_life(float, optional): The number of seconds after which
+        past attempts count half as much towards an entity group's
+        recent conflict rate.
+      max_backoff_factor(float, optional): The factor by which delays
+        between retries are multiplied for transactions that touch an
+        entity group whose every recent attempt failed.  Delays for
+        less contended groups are scaled proportionally less.
+      max_entity_groups(int, optional): The maximum number of entity
+        groups to keep track of.  The least contended groups are
+        forgotten first.
+    """
+
+    def __init__(self, *, half_life=60, max_backoff_factor=8, max_entity_groups=10000):
+        if half_life <= 0:
+            raise ValueError("half_life must be greater than 0.")
+
+        self.half_life = half_life
+        self.max_backoff_factor = max_backoff_factor
+        self.max_entity_groups = max_entity_groups
+
+        self._lock = Lock()
+        self._functions = {}
+        self._entity_groups = {}
+
+    def record(self, function, keys, conflict):
+        """Record a transaction attempt.
+
+        Parameters:
+          function(str): The qualified name of the transactional
+            function.
+          keys(iter[anom.Key]): The keys the transaction read or wrote.
+          conflict(bool): Whether or not the transaction failed to
+            commit.
+        """
+        now, entity_groups = time.monotonic(), {_root(key) for key in keys}
+        with self._lock:
+            self._counters(self._functions, function, now).record(conflict, now, self.half_life)
+            for entity_group in entity_groups:
+                self._counters(self._entity_groups, entity_group, now).record(conflict, now, self.half_life)
+
+            if len(self._entity_groups) > self.max_entity_groups:
+                self._forget_entity_groups()
+
+    def backoff_factor(self, keys):
+        """Compute the factor by which to multiply the delay before
+        retrying a transaction that touched the given keys.
+
+        Parameters:
+          keys(iter[anom.Key]): The keys the transaction read or wrote.
+
+        Returns:
+          float: A number between 1 and ``max_backoff_factor``.
+        """
+        conflict_rate = max((self.conflict_rate(key) for key in keys), default=0)
+        return 1 + conflict_rate * (self.max_backoff_factor - 1)
+
+    def conflict_rate(self, key):
+        """Get the recent conflict rate of the entity group a key
+        belongs to.
+
+        Parameters:
+          key(anom.Key): The key.
+
+        Returns:
+          float: The fraction of recent attempts that failed to
+          commit, or 0 if the group hasn't been attempted recently.
+        """
+        now, entity_group = time.monotonic(), _root(key)
+        with self._lock:
+            counters = self._entity_groups.get(entity_group)
+            if counters is None:
+                return 0
+            return counters.recent_conflict_rate(now, self.half_life)
+
+    def report(self, limit=10):
+        """Get the most contended functions and entity groups.
+
+        Parameters:
+          limit(int, optional): The maximum number of functions and of
+            entity groups to report.
+
+        Returns:
+          ContentionReport: The report.
+        """
+        with self._lock:
+            return ContentionReport(
+                functions=self._top(self._functions, limit),
+                entity_groups=self._top(self._entity_groups, limit),
+            )
+
+    def reset(self):
+        """Forget all recorded attempts.
+        """
+        with self._lock:
+            self._functions.clear()
+            self._entity_groups.clear()
+
+    def _counters(self, counters_by_name, name, now):
+        counters = counters_by_name.get(name)
+        if counters is None:
+            counters = counters_by_name[name] = _Counters(now)
+        return counters
+
+    def _forget_entity_groups(self):
+        entity_groups = sorted(self._entity_groups.items(), key=lambda item: item[1].conflicts, reverse=True)
+        self._entity_groups = dict(entity_groups[:self.max_entity_groups // 2])
+
+    def _top(self, counters_by_name, limit):
+        top = sorted(counters_by_name.items(), key=lambda item: item[1].conflicts, reverse=True)[:limit]
+        return [ContentionStats(name, counters.attempts, counters.conflicts) for name, counters in top]
+
+
+#: The tracker that transactional functions record their attempts in
+#: by default.
+_contention_tracker = ContentionTracker()
+
+
+def get_contention_tracker():
+    """Get the global ContentionTracker instance.
+
+    Returns:
+      ContentionTracker: The global contention tracker.
+    """
+    return _contention_tracker
+
+
+def _root(key):
+    while key.parent is not None:
+        key = key.parent
+    return key
@@ -0,0 +1,224 @@
+import random
+
+from hashlib import md5
+
+from .adapter import get_adapter
+from .contention import get_contention_tracker
+from .model import Key, Model, get_multi
+from .properties import Integer
+from .retries import RetryPolicy
+from .transaction import RetriesExceeded, TransactionError, transactional
+
+#: Shard increments are attempted once per shard so that retries can
+#: pick a different shard.
+_single_attempt = RetryPolicy(max_attempts=1)
+
+#: Counters only grow when the recent conflict rate of their shards
+#: is at least this high, so that a single unlucky conflict doesn't
+#: make every read more expensive from then on.
+_grow_conflict_rate = 0.5
+
+#: The maximum number of shards a counter can have to be read inside
+#: a transaction.  Transactions may touch at most 25 entity groups and
+#: reading a counter touches every shard as well as its config.
+_max_transactional_shards = 24
+
+
+class CounterShard(Model):
+    """A Datastore entity holding part of a :class:`ShardedCounter`'s
+    total.  Every shard is its own entity group.
+    """
+
+    _kind = "anom.CounterShard"
+
+    count = Integer(default=0)
+
+
+class CounterConfig(Model):
+    """A Datastore entity holding the number of shards of a
+    :class:`ShardedCounter`.
+    """
+
+    _kind = "anom.CounterConfig"
+
+    shards = Integer()
+
+
+class ShardedCounter:
+    """A counter that can be incremented more often than Datastore's
+    limit of about one write per second per entity group allows.
+
+    Increments are spread across a number of shard entities chosen at
+    random and reading the counter sums up every shard.  Increments
+    that fail to commit are retried on a different shard.  When they
+    fail because of contention and at least half of the recent
+    increments of the counter's shards did too, the number of shards
+    is doubled, up to ``max_shards``, so counters that are contended
+    grow on their own.
+
+    Example:
+      >>> page_views = ShardedCounter("page_views")
+      >>> page_views.increment()
+      >>> page_views.get()
+      1
+
+    Parameters:
+      name(str): The name of the counter.  Counters are stored in
+        the current namespace.
+      shards(int, optional): The number of shards a new counter
+        starts out with.
+      max_shards(int, optional): The maximum number of shards a
+        counter can grow to.  Since transactions may touch at most
+        25 entity groups, counters with more than 24 shards can't be
+        read inside transactions.
+      retry_policy(RetryPolicy, optional): The policy used to retry
+        increments that fail to commit.
+      contention_tracker(ContentionTracker, optional): The tracker
+        increments are recorded in and that determines whether the
+        counter is contended.  Defaults to the global tracker.
+      cache_timeout(int, optional): The number of seconds to cache
+        totals for when the current adapter is a
+        :class:`MemcacheAdapter<anom.adapters.MemcacheAdapter>`.
+        Cached totals may lag behind increments by up to that long.
+        Totals aren't cached by default.
+    """
+
+    def __init__(
+            self, name, *, shards=8, max_shards=128, retry_policy=None, contention_tracker=None, cache_timeout=None,
+    ):
+        if not 1 <= shards <= max_shards:
+            raise ValueError("shards must be between 1 and max_shards.")
+
+        self.name = name
+        self.shards = shards
+        self.max_shards = max_shards
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.contention_tracker = contention_tracker
+        self.cache_timeout = cache_timeout
+
+        #: The number of shards this counter was last known to have.
+        self._shards = shards
+
+    def increment(self, delta=1):
+        """Add a number to this counter.  Increments made inside of a
+        transaction become part of that transaction.
+
+        Parameters:
+          delta(int, optional): The number to add.  May be negative.
+
+        Raises:
+          RetriesExceeded: When the increment fails to commit after
+            every attempt allowed by the retry policy.
+        """
+        tracker = self.contention_tracker or get_contention_tracker()
+        increment_shard = transactional(retry_policy=_single_attempt, contention_tracker=tracker)(self._increment_shard)
+
+        def attempt():
+            shards = self._shards
+            try:
+                increment_shard(random.randrange(shards), delta)
+            except RetriesExceeded as e:
+                if e.cause.conflict and self._is_contended(tracker, shards):
+                    self._grow(shards)
+                raise
+
+        self.retry_policy.call(attempt, default_retry_on=(RetriesExceeded,))
+
+    def get(self):
+        """Get this counter's total.  Every shard is looked up in a
+        single batch.
+
+        Raises:
+          TransactionError: When called inside a transaction on a
+            counter that has more than 24 shards.
+
+        Returns:
+          int: The total.
+        """
+        in_transaction = get_adapter().in_transaction
+        if in_transaction:
+            self._check_transactional_shards(self._shards)
+
+        cache, cache_key = self._cache(), None
+        if cache is not None:
+            cache_key = self._convert_to_memcache(cache)
+            data = cache.client.get_multi([cache_key]).get(cache_key)
+            if data is not None:
+                return int(data)
+
+        # The config is looked up alongside the shards this counter is
+        # known to have so that reads usually take a single round trip.
+        config, *shards = get_multi([self._config_key()] + self._shard_keys(0, self._shards))
+        shard_count = config.shards if config else self.shards
+        if in_transaction:
+            self._check_transactional_shards(shard_count)
+
+        if shard_count > len(shards):
+            shards.extend(get_multi(self._shard_keys(len(shards), shard_count)))
+
+        self._shards = max(self._shards, shard_count)
+        total = sum(shard.count for shard in shards[:shard_count] if shard is not None)
+        if cache_key is not None:
+            cache.client.set_multi({cache_key: str(total).encode("ascii")}, timeout=self.cache_timeout)
+        return total
+
+    def _check_transactional_shards(self, shards):
+        if shards > _max_transactional_shards:
+            raise TransactionError(
+                f"Counter {self.name!r} has {shards} shards and counters with more than "
+                f"{_max_transactional_shards} shards can't be read inside transactions."
+            )
+
+    def _increment_shard(self, index, delta):
+        key = self._shard_key(index)
+        shard = key.get() or CounterShard(key=key)
+        shard.count += delta
+        shard.put()
+
+    def _is_contended(self, tracker, shards):
+        conflict_rate = sum(tracker.conflict_rate(key) for key in self._shard_keys(0, shards)) / shards
+        return conflict_rate >= _grow_conflict_rate
+
+    def _grow(self, shards):
+        target = min(self.max_shards, shards * 2)
+        if target <= shards:
+            return
+
+        @transactional()
+        def grow():
+            config = self._config_key().get() or CounterConfig(key=self._config_key(), shards=self.shards)
+            if config.shards < target:
+                config.shards = target
+                config.put()
+            return config.shards
+
+        try:
+            self._shards = max(self._shards, grow())
+        except RetriesExceeded:
+            # Another process is growing the counter at the same time.
+            pass
+
+    def _cache(self):
+        if self.cache_timeout is None:
+            return None
+
+        from .adapters import MemcacheAdapter
+
+        adapter = get_adapter()
+        if isinstance(adapter, MemcacheAdapter) and not adapter.in_transaction:
+            return adapter
+        return None
+
+    def _convert_to_memcache(self, adapter):
+        key = self._config_key()
+        digest = md5(repr((key.namespace or "", self.name)).encode("utf-8")).hexdigest()
+        return f"{adapter.prefix}:counter:{digest}"
+
+    def _config_key(self):
+        return Key(CounterConfig, self.name)
+
+    def _shard_key(self, index):
+        return Key(CounterShard, f"{self.name}:{index}")
+
+    def _shard_keys(self, start, stop):
+        return [self._shard_key(index) for index in range(start, stop)]
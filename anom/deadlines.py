@@ -0,0 +1,81 @@
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_deadline = ContextVar("anom.deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation doesn't complete before the current
+    deadline.  Requests that are in flight when the deadline passes
+    are abandoned.
+    """
+
+
+def get_deadline():
+    """float: The time, according to :func:`time.monotonic`, at which
+    the current context's deadline passes or ``None`` if there is no
+    deadline.
+    """
+    return _deadline.get()
+
+
+def remaining_time():
+    """float: The number of seconds left until the current context's
+    deadline passes or ``None`` if there is no deadline.  Never
+    negative.
+    """
+    deadline = get_deadline()
+    if deadline is None:
+        return None
+    return max(0, deadline - time.monotonic())
+
+
+def deadline_exceeded():
+    """bool: Whether or not the current context's deadline has passed.
+    """
+    deadline = get_deadline()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def check_deadline():
+    """Raise an error if the current context's deadline has passed.
+
+    Raises:
+      DeadlineExceeded: If the deadline has passed.
+    """
+    if deadline_exceeded():
+        raise DeadlineExceeded("Deadline exceeded.")
+
+
+@contextmanager
+def deadline(timeout):
+    """Context manager that bounds the amount of time that adapter
+    operations inside of it may take.  Deadlines nest: an inner
+    deadline can only ever shorten the outer one.
+
+    Example:
+      >>> with deadline(0.5):
+      ...   user = User.get(user_id)
+      ...   posts = list(Post.query().where(Post.author == user.key).run(limit=10))
+
+    Parameters:
+      timeout(float): The number of seconds that operations inside
+        the context may take in total.  ``None`` doesn't impose any
+        additional limit.
+
+    Raises:
+      DeadlineExceeded: From operations that don't complete before
+        the deadline passes.
+    """
+    previous_deadline = get_deadline()
+    if timeout is not None:
+        new_deadline = time.monotonic() + timeout
+        if previous_deadline is None or new_deadline < previous_deadline:
+            _deadline.set(new_deadline)
+
+    try:
+        yield
+    finally:
+        _deadline.set(previous_deadline)
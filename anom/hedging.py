@@ -0,0 +1,187 @@
+import logging
+import time
+
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from threading import Lock
+
+_logger = logging.getLogger(__name__)
+
+
+class HedgeStats(namedtuple("HedgeStats", ("calls", "hedges", "hedge_wins"))):
+    """A snapshot of the hedged requests sent by a :class:`HedgePolicy`.
+
+    Parameters:
+      calls(int): The number of operations that were run through the
+        policy.
+      hedges(int): The number of operations for which a duplicate
+        request was sent.
+      hedge_wins(int): The number of operations whose duplicate
+        request completed before the original.
+    """
+
+
+class _LatencyWindow:
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.since_update = 0
+        self.delay = None
+
+
+class HedgePolicy:
+    """Determines when read-only operations send a duplicate, "hedged",
+    request to cut down on tail latency.
+
+    If an operation hasn't completed after the given percentile of
+    its recently-observed latencies, a second request is sent and
+    whichever one completes first wins.  The other one is abandoned.
+    Operations run on a pool of worker threads owned by the policy.
+
+    Parameters:
+      percentile(float, optional): The percentile of recent latencies
+        after which a hedged request is sent.  Higher percentiles send
+        fewer duplicate requests.
+      initial_delay(float, optional): The number of seconds to wait
+        before sending a hedged request while too few latencies have
+        been observed to compute the percentile.
+      min_delay(float, optional): The minimum number of seconds to
+        wait before sending a hedged request.
+      window(int, optional): The number of recent latencies per
+        operation to compute the percentile over.
+      max_workers(int, optional): The maximum number of requests the
+        policy can have in flight at once.  This should be at least
+        twice the number of threads that use the policy.
+    """
+
+    #: The number of latencies that have to be observed for an
+    #: operation before the percentile is used.
+    min_samples = 20
+
+    def __init__(self, *, percentile=95, initial_delay=0.05, min_delay=0.001, window=1000, max_workers=32):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100.")
+
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.window = window
+        self.max_workers = max_workers
+
+        self._lock = Lock()
+        self._latencies = {}
+        self._executor = None
+        self._stats = HedgeStats(calls=0, hedges=0, hedge_wins=0)
+
+    def call(self, fn, *args, operation=None, **kwargs):
+        """Call a function, calling it a second time if the first call
+        takes longer than usual.
+
+        Parameters:
+          fn(callable): The function to call.  It must be safe to call
+            concurrently and from other threads.
+          operation(str, optional): The name latencies are tracked
+            under.  Defaults to the function's qualified name.
+          \*args(tuple): Positional arguments to pass to the function.
+          \**kwargs(dict): Keyword arguments to pass to the function.
+
+        Raises:
+          Exception: The error raised by the first call if every call
+            fails.
+
+        Returns:
+          object: The return value of the call that completed first.
+        """
+        operation = operation or getattr(fn, "__qualname__", type(fn).__qualname__)
+        self._record(calls=1)
+
+        delay = self.delay(operation)
+        primary = self._submit(operation, fn, args, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        _logger.debug("Hedging %r after it took longer than %.3f seconds.", fn, delay)
+        self._record(hedges=1)
+        hedge = self._submit(operation, fn, args, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._record(hedge_wins=1)
+                    return future.result()
+
+        return primary.result()
+
+    def delay(self, operation):
+        """Compute the number of seconds to wait before hedging an
+        operation.
+
+        Parameters:
+          operation(str): The name of the operation.
+
+        Returns:
+          float: The delay.
+        """
+        with self._lock:
+            latencies = self._latencies.get(operation)
+            if latencies is None or latencies.delay is None:
+                return self.initial_delay
+            return latencies.delay
+
+    def stats(self):
+        """Get a snapshot of the hedged requests this policy has sent
+        so far.
+
+        Returns:
+          HedgeStats: The stats.
+        """
+        with self._lock:
+            return self._stats
+
+    def reset_stats(self):
+        """Reset this policy's stats.
+        """
+        with self._lock:
+            self._stats = HedgeStats(calls=0, hedges=0, hedge_wins=0)
+
+    def _submit(self, operation, fn, args, kwargs):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="anom-hedge")
+
+        # Each request runs in a copy of the caller's context so that
+        # it shares the caller's deadline and namespace.
+        return self._executor.submit(copy_context().run, self._timed_call, operation, fn, args, kwargs)
+
+    def _timed_call(self, operation, fn, args, kwargs):
+        start = time.monotonic()
+        result = fn(*args, **kwargs)
+        self._record_latency(operation, time.monotonic() - start)
+        return result
+
+    def _record_latency(self, operation, latency):
+        with self._lock:
+            latencies = self._latencies.get(operation)
+            if latencies is None:
+                latencies = self._latencies[operation] = _LatencyWindow(self.window)
+
+            latencies.samples.append(latency)
+            latencies.since_update += 1
+            # Sorting the samples is relatively expensive so the delay
+            # is only recomputed once a tenth of them have changed.
+            if len(latencies.samples) >= self.min_samples and \
+               (latencies.delay is None or latencies.since_update >= len(latencies.samples) // 10):
+                samples = sorted(latencies.samples)
+                index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+                latencies.delay = max(self.min_delay, samples[index])
+                latencies.since_update = 0
+
+    def _record(self, **deltas):
+        with self._lock:
+            self._stats = self._stats._replace(**{
+                name: getattr(self._stats, name) + delta for name, delta in deltas.items()
+            })
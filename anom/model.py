@@ -2,7 +2,8 @@ from collections import namedtuple
 from threading import RLock
 from weakref import WeakValueDictionary
 
-from .adapter import PutRequest, get_adapter
+from .adapter import PutRequest, _read_options, get_adapter
+from .deadlines import deadline
 from .namespaces import get_namespace
 from .query import PropertyFilter, Query
 
@@ -134,13 +135,16 @@ class Key(KeyLike, namedtuple("Key", ("kind", "id_or_name", "parent", "namespace
         """
         return delete_multi([self])
 
-    def get(self):
+    def get(self, **options):
         """Get the entity represented by this Key from Datastore.
 
+        Parameters:
+          \**options(dict): Options for the lookup.  See :func:`get_multi`.
+
         Returns:
           Model: The entity or ``None`` if it does not exist.
         """
-        return get_multi([self])[0]
+        return get_multi([self], **options)[0]
 
     def __repr__(self):
         return f"Key({self.kind!r}, {self.id_or_name!r}, parent={self.parent!r}, namespace={self.namespace!r})"
@@ -176,6 +180,9 @@ class Property:
       property on a model instance.
     * :meth:`prepare_to_load` is called before a property is assigned
       to a model instance that is being loaded from Datastore.
+    * :meth:`prepare_batch_to_load` is called once all the model
+      instances that were loaded from Datastore together have been
+      assigned their properties.
     * :meth:`prepare_to_store` is called before a property is
       persisted from a model instance to Datastore.
 
@@ -265,6 +272,16 @@ class Property:
         """
         return value
 
+    def prepare_batch_to_load(self, entities):
+        """Prepare the values of this Property on a list of entities
+        that were loaded from an adapter together.  Called by the
+        model after :meth:`prepare_to_load` has been called for each
+        of them.  Does nothing by default.
+
+        Parameters:
+          entities(list[Model]): The entities that were loaded.
+        """
+
     def prepare_to_store(self, entity, value):
         """Prepare `value` for storage.  Called by the Model for each
         Property, value pair it contains before handing the data off
@@ -312,6 +329,11 @@ class Property:
     def __delete__(self, ob):
         del ob._data[self.name_on_model]
 
+    def _get_value_to_store(self, entity):
+        # The value that gets passed to prepare_to_store.  Properties
+        # may override this in order to avoid doing work in __get__.
+        return self.__get__(entity, type(entity))
+
     def _build_filter(self, op, value):
         if not self.indexed:
             raise TypeError(f"{self.name_on_model} is not indexed.")
@@ -412,6 +434,13 @@ class model(type):
                 if name not in properties:
                     properties[name] = prop
 
+        # Only properties that override prepare_batch_to_load need to
+        # be told about batches of loaded entities.
+        attrs["_batch_properties"] = [
+            prop for prop in properties.values()
+            if type(prop).prepare_batch_to_load is not Property.prepare_batch_to_load
+        ]
+
         clazz = type.__new__(cls, classname, bases, attrs)
 
         # Ensure that a single model maps to a single kind at runtime.
@@ -453,8 +482,8 @@ class Model(metaclass=model):
             setattr(self, name, value)
 
     def __iter__(self):
-        for name, prop in self._properties.items():
-            value = getattr(self, name)
+        for prop in self._properties.values():
+            value = prop._get_value_to_store(self)
             if isinstance(prop, EmbedLike):
                 yield from prop.prepare_to_store(self, value)
             else:
@@ -516,19 +545,20 @@ class Model(metaclass=model):
         """
 
     @classmethod
-    def get(cls, id_or_name, *, parent=None, namespace=None):
+    def get(cls, id_or_name, *, parent=None, namespace=None, **options):
         """Get an entity by id.
 
         Parameters:
           id_or_name(int or str): The entity's id.
           parent(anom.Key, optional): The entity's parent Key.
           namespace(str, optional): The entity's namespace.
+          \**options(dict): Options for the lookup.  See :func:`get_multi`.
 
         Returns:
           Model: An entity or ``None`` if the entity doesn't exist in
           Datastore.
         """
-        return Key(cls, id_or_name, parent=parent, namespace=namespace).get()
+        return Key(cls, id_or_name, parent=parent, namespace=namespace).get(**options)
 
     @classmethod
     def pre_delete_hook(cls, key):
@@ -628,7 +658,7 @@ def lookup_model_by_kind(kind):
     return model
 
 
-def delete_multi(keys):
+def delete_multi(keys, *, timeout=None):
     """Delete a set of entitites from Datastore by their
     respective keys.
 
@@ -644,11 +674,14 @@ def delete_multi(keys):
 
     Parameters:
       keys(list[anom.Key]): The list of keys whose entities to delete.
+      timeout(float, optional): The maximum number of seconds the
+        operation may take.  Defaults to the current :func:`anom.deadline`.
 
     Raises:
       RuntimeError: If the given set of keys have models that use
         a disparate set of adapters or if any of the keys are
         partial.
+      anom.DeadlineExceeded: If the operation times out.
     """
     if not keys:
         return
@@ -664,7 +697,9 @@ def delete_multi(keys):
 
         model.pre_delete_hook(key)
 
-    adapter.delete_multi(keys)
+    with deadline(timeout):
+        adapter.delete_multi(keys)
+
     for key in keys:
         # Micro-optimization to avoid calling get_model.  This is OK
         # to do here because we've already proved that a model for
@@ -673,7 +708,7 @@ def delete_multi(keys):
         model.post_delete_hook(key)
 
 
-def get_multi(keys):
+def get_multi(keys, *, timeout=None, read_consistency=None, read_time=None):
     """Get a set of entities from Datastore by their respective keys.
 
     Note:
@@ -688,11 +723,20 @@ def get_multi(keys):
 
     Parameters:
       keys(list[anom.Key]): The list of keys whose entities to get.
+      timeout(float, optional): The maximum number of seconds the
+        operation may take.  Defaults to the current :func:`anom.deadline`.
+      read_consistency(str, optional): Either ``"strong"`` or
+        ``"eventual"``.  Eventually-consistent lookups are cheaper and
+        faster but may not reflect recent writes.  Defaults to strong
+        consistency.
+      read_time(datetime, optional): The time at which to read a
+        snapshot of the entities.
 
     Raises:
       RuntimeError: If the given set of keys have models that use
         a disparate set of adapters or if any of the keys are
         partial.
+      anom.DeadlineExceeded: If the operation times out.
 
     Returns:
       list[Model]: Entities that do not exist are going to be None
@@ -713,7 +757,10 @@ def get_multi(keys):
 
         model.pre_get_hook(key)
 
-    entities_data, entities = adapter.get_multi(keys), []
+    with deadline(timeout):
+        entities_data = adapter.get_multi(keys, **_read_options(read_consistency, read_time))
+
+    entities = []
     for key, entity_data in zip(keys, entities_data):
         if entity_data is None:
             entities.append(None)
@@ -723,14 +770,17 @@ def get_multi(keys):
         # to do here because we've already proved that a model for
         # that kind exists in the previous block.
         model = _known_models[key.kind]
-        entity = model._load(key, entity_data)
-        entities.append(entity)
-        entity.post_get_hook()
+        entities.append(model._load(key, entity_data))
+
+    _prepare_batch_to_load(entities)
+    for entity in entities:
+        if entity is not None:
+            entity.post_get_hook()
 
     return entities
 
 
-def put_multi(entities):
+def put_multi(entities, *, timeout=None):
     """Persist a set of entities to Datastore.
 
     Note:
@@ -745,10 +795,13 @@ def put_multi(entities):
 
     Parameters:
       entities(list[Model]): The list of entities to persist.
+      timeout(float, optional): The maximum number of seconds the
+        operation may take.  Defaults to the current :func:`anom.deadline`.
 
     Raises:
       RuntimeError: If the given set of models use a disparate set of
         adapters.
+      anom.DeadlineExceeded: If the operation times out.
 
     Returns:
       list[Model]: The list of persisted entitites.
@@ -764,9 +817,25 @@ def put_multi(entities):
         entity.pre_put_hook()
         requests.append(PutRequest(entity.key, entity.unindexed_properties, entity))
 
-    keys = adapter.put_multi(requests)
+    with deadline(timeout):
+        keys = adapter.put_multi(requests)
+
     for key, entity in zip(keys, entities):
         entity.key = key
         entity.post_put_hook()
 
     return entities
+
+
+def _prepare_batch_to_load(entities):
+    """Let the properties of a list of entities that were loaded
+    together prepare them as a batch.  ``None`` entries are ignored.
+    """
+    entities_by_model = {}
+    for entity in entities:
+        if entity is not None and entity._batch_properties:
+            entities_by_model.setdefault(type(entity), []).append(entity)
+
+    for model, model_entities in entities_by_model.items():
+        for prop in model._batch_properties:
+            prop.prepare_batch_to_load(model_entities)
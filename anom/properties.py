@@ -1,8 +1,9 @@
 import base64
+import hashlib
+import io
 import json
 import msgpack
 import operator
-import zlib
 
 from collections import defaultdict
 from copy import copy
@@ -12,7 +13,7 @@ from enum import IntEnum
 from functools import reduce
 from itertools import chain
 
-from . import model
+from . import blobs, compression, model
 from .model import EmbedLike, Property, NotFound, Skip, classname
 
 
@@ -27,6 +28,9 @@ def _seconds_since_epoch(dt):
 #: The maximum length of indexed properties.
 _max_indexed_length = 1500
 
+#: The maximum size of an entity, in bytes.
+_max_entity_size = 1048572
+
 
 class Blob:
     """Mixin for Properties whose values cannot be indexed.
@@ -40,34 +44,59 @@ class Blob:
 
 
 class Compressable(Blob):
-    """Mixin for Properties whose values can be gzipped before being
-    persisted.
+    """Mixin for Properties whose values can be compressed before
+    being persisted.
 
     Parameters:
       compressed(bool): Whether or not values belonging to this
-        Property should be stored gzipped in Datastore.
+        Property should be stored compressed in Datastore.
       compression_level(int): The amount of compression to apply.
         See :func:`zlib.compress` for details.
+      codec(str or Codec): The compression codec to use.  Either
+        the name of a registered codec or a :class:`Codec<anom.compression.Codec>`
+        instance.  Implies ``compressed``.  Defaults to zlib.
+      min_size(int): Values smaller than this many bytes are stored
+        uncompressed.  Defaults to ``0``.
     """
 
-    def __init__(self, *, compressed=False, compression_level=-1, **options):
-        if not (-1 <= compression_level <= 9):
-            raise ValueError("compression_level must be an integer between -1 and 9.")
+    def __init__(self, *, compressed=False, compression_level=-1, codec=None, min_size=0, **options):
+        if codec is None:
+            codec = compression.ZlibCodec(level=compression_level)
+
+        else:
+            compressed = True
+            if isinstance(codec, str):
+                codec = compression.get_codec(codec, level=compression_level)
 
         super().__init__(**options)
 
         self.compressed = compressed
         self.compression_level = compression_level
+        self.codec = codec
+        self.min_size = min_size
 
     def prepare_to_load(self, entity, value):
         if value is not None and self.compressed:
-            value = zlib.decompress(value)
+            value = compression.decompress(value, self.codec)
 
         return super().prepare_to_load(entity, value)
 
     def prepare_to_store(self, entity, value):
         if value is not None and self.compressed:
-            value = zlib.compress(value, level=self.compression_level)
+            # Json properties serialize their values to strings.
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+
+            value = compression.compress(value, self.codec, min_size=self.min_size)
+
+        # Values that are larger than the maximum entity size can
+        # never be stored so it's better to fail here, where we know
+        # which property is to blame, rather than in Datastore.
+        if value is not None and not self.repeated and len(value) > _max_entity_size:
+            raise ValueError(
+                f"Property {self.name_on_model} is {len(value)} bytes long, which is larger than "
+                f"the maximum entity size ({_max_entity_size} bytes)."
+            )
 
         return super().prepare_to_store(entity, value)
 
@@ -146,10 +175,12 @@ class Serializer(Compressable, Property):
         return instance
 
     def prepare_to_load(self, entity, value):
+        # Values have to be decompressed before they're deserialized.
+        value = super().prepare_to_load(entity, value)
         if value is not None:
             value = self._loads(value)
 
-        return super().prepare_to_load(entity, value)
+        return value
 
     def prepare_to_store(self, entity, value):
         if value is not None:
@@ -158,6 +189,202 @@ class Serializer(Compressable, Property):
         return super().prepare_to_store(entity, value)
 
 
+class _LazyBlob:
+    """Placeholder for BlobRef values that haven't been fetched from
+    their blob store yet.
+    """
+
+    __slots__ = ["blob_id", "value", "batch"]
+
+    def __init__(self, blob_id, value=NotFound):
+        self.blob_id = blob_id
+        self.value = value
+
+        #: The placeholders of the entities that were loaded together
+        #: with this one.  They're all fetched at the same time.
+        self.batch = None
+
+    @property
+    def is_resolved(self):
+        return self.value is not NotFound
+
+
+class BlobRef(Blob, Property):
+    """A Property for bytestring values that may be too large to
+    store inside their entities.  Values larger than ``threshold``
+    bytes are written to a :class:`BlobStore<anom.blobs.BlobStore>`
+    and only a reference to them is stored in Datastore.  Referenced
+    values are fetched the first time they are accessed.  Accessing
+    the value of an entity that was loaded by :func:`get_multi<anom.get_multi>`
+    or by a query fetches the values of every entity that was loaded
+    in the same batch in a single round trip.
+
+    Use :meth:`prefetch` to fetch the values of any list of entities
+    at once and :meth:`open` to stream values without loading them
+    into memory.
+
+    Note:
+      Putting an entity doesn't fetch referenced values that haven't
+      been fetched yet, it stores their references again.  Blobs are
+      never deleted when the entities that refer to them change or get
+      deleted.
+
+    Parameters:
+      name(str, optional): The name of this property on the Datastore
+        entity.  Defaults to the name of this property on the model.
+      default(object, optional): The property's default value.
+      optional(bool, optional): Whether or not this property is
+        optional.  Defaults to ``False``.  Required but empty values
+        cause models to raise an exception before data is persisted.
+      threshold(int, optional): Values larger than this many bytes are
+        stored in the blob store.  Defaults to 64KiB.
+      store(BlobStore, optional): The blob store to use.  Defaults to
+        the global blob store.
+    """
+
+    _types = (bytes,)
+
+    #: The header of values that are stored inline.
+    _inline_header = b"\x00"
+
+    #: The header of values that are stored in the blob store.
+    _ref_header = b"\x01"
+
+    def __init__(self, *, threshold=65536, store=None, **options):
+        if options.get("repeated"):
+            raise TypeError(f"{classname(self)} properties cannot be repeated.")
+
+        super().__init__(**options)
+
+        self.threshold = threshold
+        self._store = store
+
+    @property
+    def store(self):
+        "BlobStore: The blob store this property's values are stored in."
+        return self._store or blobs.get_blob_store()
+
+    def prefetch(self, entities):
+        """Fetch the referenced values of this property for a list of
+        entities in a single batch.
+
+        Parameters:
+          entities(list[Model]): The entities whose values to fetch.
+            ``None`` entries are ignored.
+        """
+        self._fetch(self._lazy_blobs(entities))
+
+    def open(self, entity):
+        """Open the value of this property on an entity for streaming.
+
+        Parameters:
+          entity(Model): The entity whose value to open.
+
+        Returns:
+          io.BufferedIOBase: A binary file-like object or ``None`` if
+          the entity doesn't have a value.
+        """
+        value = entity._data.get(self.name_on_model)
+        if isinstance(value, _LazyBlob):
+            if not value.is_resolved:
+                return self.store.open(value.blob_id)
+
+            value = value.value
+
+        if value is None:
+            return None
+
+        return io.BytesIO(value)
+
+    def prepare_to_load(self, entity, value):
+        if value is None:
+            return super().prepare_to_load(entity, value)
+
+        header, data = value[:1], value[1:]
+        if header == self._ref_header:
+            return _LazyBlob(data.decode("ascii"))
+
+        elif header == self._inline_header:
+            return data
+
+        raise ValueError(f"Invalid {classname(self)} header {header!r}.")
+
+    def prepare_batch_to_load(self, entities):
+        lazy_blobs = self._lazy_blobs(entities)
+        if len(lazy_blobs) > 1:
+            for lazy_blob in lazy_blobs:
+                lazy_blob.batch = lazy_blobs
+
+    def prepare_to_store(self, entity, value):
+        # Values that haven't been fetched yet can't have changed so
+        # only their references have to be stored again.
+        if isinstance(value, _LazyBlob):
+            return self._ref_header + value.blob_id.encode("ascii")
+
+        value = super().prepare_to_store(entity, value)
+        if value is None:
+            return None
+
+        if len(value) <= self.threshold:
+            return self._inline_header + value
+
+        # Values that were loaded from the store and haven't been
+        # changed since don't have to be hashed and written again.
+        current_value = entity._data.get(self.name_on_model) if entity is not None else None
+        if isinstance(current_value, _LazyBlob) and current_value.value is value:
+            return self._ref_header + current_value.blob_id.encode("ascii")
+
+        blob_id = hashlib.sha256(value).hexdigest()
+        self.store.put(blob_id, value)
+        return self._ref_header + blob_id.encode("ascii")
+
+    def __get__(self, ob, obtype):
+        if ob is None:
+            return self
+
+        value = super().__get__(ob, obtype)
+        if isinstance(value, _LazyBlob):
+            if not value.is_resolved:
+                self._fetch(value.batch or [value])
+
+            return value.value
+
+        return value
+
+    def _get_value_to_store(self, entity):
+        value = entity._data.get(self.name_on_model)
+        if isinstance(value, _LazyBlob) and not value.is_resolved:
+            return value
+        return super()._get_value_to_store(entity)
+
+    def _lazy_blobs(self, entities):
+        lazy_blobs = []
+        for entity in entities:
+            if entity is None:
+                continue
+
+            value = entity._data.get(self.name_on_model)
+            if isinstance(value, _LazyBlob) and not value.is_resolved:
+                lazy_blobs.append(value)
+
+        return lazy_blobs
+
+    def _fetch(self, lazy_blobs):
+        lazy_blobs = [lazy_blob for lazy_blob in lazy_blobs if not lazy_blob.is_resolved]
+        if not lazy_blobs:
+            return
+
+        datas = self.store.get_multi([lazy_blob.blob_id for lazy_blob in lazy_blobs])
+        for lazy_blob, data in zip(lazy_blobs, datas):
+            lazy_blob.value = self._check_blob(lazy_blob.blob_id, data)
+            lazy_blob.batch = None
+
+    def _check_blob(self, blob_id, data):
+        if data is None:
+            raise RuntimeError(f"Blob {blob_id!r} referenced by property {self.name_on_model} does not exist.")
+        return data
+
+
 class Bool(Property):
     """A Property for boolean values.
 
@@ -208,6 +435,10 @@ class Bytes(Compressable, Property):
         be compressed before being persisted.
       compression_level(int, optional): The amount of compression to
         apply when compressing values.
+      codec(str or Codec, optional): The codec to compress values
+        with.  Defaults to zlib.
+      min_size(int, optional): Values smaller than this many bytes
+        are stored uncompressed.
     """
 
     _types = (bytes,)
@@ -383,9 +614,81 @@ class Integer(Property):
     _types = (int,)
 
 
+class _StdlibJsonBackend:
+    name = "json"
+
+    def loads(self, data, object_hook=None):
+        return json.loads(data, object_hook=object_hook)
+
+
+class _FastJsonBackend:
+    def __init__(self, module):
+        self.module = module
+
+    def loads(self, data, object_hook=None):
+        value = self._loads(data)
+        if object_hook is not None:
+            value = self._apply_hook(value, object_hook)
+        return value
+
+    def _loads(self, data):
+        try:
+            return self.module.loads(data)
+
+        # Neither backend produces the same errors as the stdlib and
+        # some of them reject data that the stdlib accepts (eg. NaN),
+        # so we defer to it when a backend fails.
+        except ValueError:
+            return json.loads(data)
+
+    def _apply_hook(self, value, object_hook):
+        # Apply the hook bottom-up, the same way the stdlib does.
+        if isinstance(value, dict):
+            for name, item in value.items():
+                if isinstance(item, (dict, list)):
+                    value[name] = self._apply_hook(item, object_hook)
+
+            return object_hook(value)
+
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, (dict, list)):
+                    value[i] = self._apply_hook(item, object_hook)
+
+        return value
+
+
+class _OrjsonBackend(_FastJsonBackend):
+    name = "orjson"
+
+
+class _UjsonBackend(_FastJsonBackend):
+    name = "ujson"
+
+
+def _load_json_backends():
+    backends = {"json": _StdlibJsonBackend()}
+    for name, backend_class in (("orjson", _OrjsonBackend), ("ujson", _UjsonBackend)):
+        try:
+            backends[name] = backend_class(__import__(name))
+        except ImportError:
+            pass
+
+    return backends
+
+
+#: The available JSON backends, keyed by name.
+_json_backends = _load_json_backends()
+
+
 class Json(Serializer):
     """A Property for values that should be stored as JSON.
 
+    Values are always encoded with the standard library's :mod:`json`
+    module so that the stored data doesn't depend on which libraries
+    are installed.  They are decoded with ujson_ if it's installed and
+    with :mod:`json` otherwise.  See :meth:`use_backend`.
+
     Parameters:
       name(str, optional): The name of this property on the Datastore
         entity.  Defaults to the name of this property on the model.
@@ -397,11 +700,42 @@ class Json(Serializer):
         be compressed before being persisted.
       compression_level(int, optional): The amount of compression to
         apply when compressing values.
+      codec(str or Codec, optional): The codec to compress values
+        with.  Defaults to zlib.
+      min_size(int, optional): Values smaller than this many bytes
+        are stored uncompressed.
+
+    .. _orjson: https://github.com/ijl/orjson
+    .. _ujson: https://github.com/ultrajson/ultrajson
     """
 
     #: The name of the field that is used to store type information
     #: about non-standard JSON values.
     _type_field = "__anom_type"
+    _type_field_bytes = _type_field.encode("ascii")
+
+    #: The backend that is used to decode JSON data.
+    _backend = _json_backends.get("ujson") or _json_backends["json"]
+
+    @classmethod
+    def use_backend(cls, name):
+        """Change the backend that Json properties decode data with.
+
+        Warning:
+          orjson_ decodes integers that don't fit in 64 bits as
+          floats, which is why it's never picked by default.  Only use
+          it if your data is guaranteed not to contain such integers.
+
+        Parameters:
+          name(str): One of ``"orjson"``, ``"ujson"`` or ``"json"``.
+
+        Raises:
+          ValueError: If the backend isn't installed.
+        """
+        try:
+            Json._backend = _json_backends[name]
+        except KeyError:
+            raise ValueError(f"JSON backend {name!r} is not available.")
 
     @classmethod
     def _serialize(cls, value):
@@ -444,7 +778,12 @@ class Json(Serializer):
 
     @classmethod
     def _loads(cls, data):
-        return json.loads(data, object_hook=Json._deserialize)
+        # Data that doesn't contain any serialized non-standard values
+        # doesn't need to go through the (slow) hook.
+        type_field = cls._type_field if isinstance(data, str) else cls._type_field_bytes
+        if type_field not in data:
+            return Json._backend.loads(data)
+        return Json._backend.loads(data, object_hook=Json._deserialize)
 
 
 class Key(Property):
@@ -517,6 +856,10 @@ class Msgpack(Serializer):
         be compressed before being persisted.
       compression_level(int, optional): The amount of compression to
         apply when compressing values.
+      codec(str or Codec, optional): The codec to compress values
+        with.  Defaults to zlib.
+      min_size(int, optional): Values smaller than this many bytes
+        are stored uncompressed.
     """
 
     class Extensions(IntEnum):
@@ -620,6 +963,10 @@ class Text(Encodable, Compressable, Property):
         be compressed before being persisted.
       compression_level(int, optional): The amount of compression to
         apply when compressing values.
+      codec(str or Codec, optional): The codec to compress values
+        with.  Defaults to zlib.
+      min_size(int, optional): Values smaller than this many bytes
+        are stored uncompressed.
       encoding(str): The encoding to use when persisting this Property
         to Datastore.  Defaults to ``utf-8``.
     """
@@ -778,8 +1125,8 @@ class Embed(EmbedLike):
             yield name, values
 
     def _prepare_to_store_properties(self, entity):
-        for name, prop in entity._properties.items():
-            value = getattr(entity, name)
+        for prop in entity._properties.values():
+            value = prop._get_value_to_store(entity)
             if isinstance(prop, EmbedLike):
                 for name, value in prop.prepare_to_store(entity, value):
                     yield f"{self.name_on_entity}.{name}", value
@@ -1,5 +1,6 @@
 from collections import namedtuple
 
+from .deadlines import deadline
 from .namespaces import get_namespace
 
 
@@ -23,6 +24,16 @@ class QueryOptions(dict):
       offset(int, optional): The number of results to skip.
       cursor(str, optional): A url-safe cursor representing where in
         the result set the query should start.
+      cache(bool, optional): Whether or not the results of this query
+        may be served from a cache.  Only caching adapters honor this.
+      timeout(float, optional): The maximum number of seconds that
+        fetching each batch of results may take.
+      read_consistency(str, optional): Either ``"strong"`` or
+        ``"eventual"``.  Eventually-consistent queries are cheaper and
+        faster but may not reflect recent writes.
+      read_time(datetime, optional): The time at which to read a
+        snapshot of the results.  Every batch of results is read from
+        the same snapshot.
     """
 
     def __init__(self, query, **options):
@@ -77,6 +88,26 @@ class QueryOptions(dict):
     def cursor(self, value):
         self["cursor"] = value
 
+    @property
+    def cache(self):
+        "bool: Whether or not the results may be served from a cache."
+        return self.get("cache", False)
+
+    @property
+    def timeout(self):
+        "float: The maximum number of seconds each batch may take to fetch."
+        return self.get("timeout")
+
+    @property
+    def read_consistency(self):
+        "str: Either strong or eventual."
+        return self.get("read_consistency")
+
+    @property
+    def read_time(self):
+        "datetime: The time at which to read a snapshot of the results."
+        return self.get("read_time")
+
 
 class Resultset:
     """An iterator for datastore query results.
@@ -111,11 +142,14 @@ class Resultset:
 
     def _get_batches(self):
         from .adapter import get_adapter
+        from .model import _prepare_batch_to_load
 
         remaining = self._options.limit
         while True:
             adapter = self._query.model._adapter if self._query.model else get_adapter()
-            entities, self._options.cursor = adapter.query(self._query, self._options)
+            with deadline(self._options.timeout):
+                entities, self._options.cursor = adapter.query(self._query, self._options)
+
             if remaining is not None:
                 remaining -= len(entities)
                 if remaining < 0:
@@ -134,7 +168,9 @@ class Resultset:
             if self._options.keys_only:
                 yield (key for key, _ in entities)
             else:
-                yield (key.get_model()._load(key, data) for key, data in entities)
+                loaded_entities = [key.get_model()._load(key, data) for key, data in entities]
+                _prepare_batch_to_load(loaded_entities)
+                yield iter(loaded_entities)
 
             # Datastore now returns None as the next cursor if there
             # are no more values.  The emulator, though, behaves the
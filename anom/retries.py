@@ -0,0 +1,177 @@
+import logging
+import random
+import time
+
+from collections import namedtuple
+from threading import Lock
+
+from .deadlines import remaining_time
+
+_logger = logging.getLogger(__name__)
+
+
+class RetryStats(namedtuple("RetryStats", ("calls", "retries", "exhausted", "backoff_time"))):
+    """A snapshot of the retries taken by a :class:`RetryPolicy`.
+
+    Parameters:
+      calls(int): The number of operations that were run through the
+        policy.
+      retries(int): The number of times an operation was retried.
+      exhausted(int): The number of operations that failed after the
+        policy ran out of attempts or its deadline was exceeded.
+      backoff_time(float): The total number of seconds spent sleeping
+        between attempts.
+    """
+
+
+class RetryPolicy:
+    """Determines whether and how operations that fail with transient
+    errors are retried.
+
+    Retries are spaced out using exponential backoff with "full
+    jitter": the delay before the nth retry is a random number of
+    seconds between 0 and ``min(max_backoff, initial_backoff *
+    multiplier ** (n - 1))``.  Randomizing the delays keeps clients
+    that failed at the same time from retrying in lockstep.
+
+    Parameters:
+      retry_on(tuple[type] or callable, optional): The exception types
+        that should be retried or a function that takes an exception
+        and returns whether or not it should be retried.  Defaults to
+        the errors that the code running the operation considers
+        transient.
+      max_attempts(int, optional): The maximum number of times an
+        operation is attempted, including the first attempt.
+      initial_backoff(float, optional): The upper bound, in seconds,
+        of the delay before the first retry.
+      max_backoff(float, optional): The maximum upper bound, in
+        seconds, of the delay between any two attempts.
+      multiplier(float, optional): The factor by which the upper bound
+        of the delay grows after each retry.
+      deadline(float, optional): The maximum number of seconds to
+        spend on an operation across all of its attempts.  Operations
+        aren't retried if the delay before the next attempt would
+        exceed this budget.  Operations are never retried past the
+        current :func:`anom.deadline` either.
+    """
+
+    def __init__(
+            self, *, retry_on=None, max_attempts=4, initial_backoff=0.05,
+            max_backoff=1, multiplier=2, deadline=None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+
+        self.retry_on = retry_on
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.deadline = deadline
+
+        self._lock = Lock()
+        self._stats = RetryStats(calls=0, retries=0, exhausted=0, backoff_time=0)
+
+    def call(self, fn, *args, default_retry_on=(), backoff_factor=None, **kwargs):
+        """Call a function, retrying it when it fails with a transient
+        error.
+
+        Parameters:
+          fn(callable): The function to call.
+          default_retry_on(tuple[type] or callable, optional): The
+            exception types to retry, or a function that decides which
+            exceptions to retry, when this policy doesn't specify
+            ``retry_on``.
+          backoff_factor(callable, optional): A function that takes
+            the error that caused a retry and returns a number to
+            multiply the delay before that retry by.
+          \*args(tuple): Positional arguments to pass to the function.
+          \**kwargs(dict): Keyword arguments to pass to the function.
+
+        Raises:
+          Exception: The last error raised by the function once this
+            policy decides not to retry it anymore.
+
+        Returns:
+          object: The function's return value.
+        """
+        self._record(calls=1)
+        started_at, attempt = time.monotonic(), 0
+        while True:
+            attempt += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(e, default_retry_on):
+                    raise
+
+                delay = self.backoff(attempt)
+                if backoff_factor is not None:
+                    delay *= backoff_factor(e)
+
+                elapsed = time.monotonic() - started_at
+                remaining = remaining_time()
+                out_of_time = (
+                    (self.deadline is not None and elapsed + delay > self.deadline) or
+                    (remaining is not None and delay >= remaining)
+                )
+                if attempt >= self.max_attempts or out_of_time:
+                    self._record(exhausted=1)
+                    raise
+
+                _logger.debug("Retrying %r in %.3f seconds after error: %s", fn, delay, e)
+                self._record(retries=1, backoff_time=delay)
+                time.sleep(delay)
+
+    def should_retry(self, error, default_retry_on=()):
+        """Determine whether or not an error should be retried.
+
+        Parameters:
+          error(Exception): The error.
+          default_retry_on(tuple[type] or callable, optional): The
+            exception types to retry, or a function that decides which
+            exceptions to retry, when this policy doesn't specify
+            ``retry_on``.
+
+        Returns:
+          bool
+        """
+        retry_on = default_retry_on if self.retry_on is None else self.retry_on
+        if isinstance(retry_on, tuple):
+            return isinstance(error, retry_on)
+        return retry_on(error)
+
+    def backoff(self, attempt):
+        """Compute the delay before the attempt following the given
+        one.
+
+        Parameters:
+          attempt(int): The number of the attempt that failed,
+            starting from 1.
+
+        Returns:
+          float: The number of seconds to wait.
+        """
+        upper_bound = min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1))
+        return random.uniform(0, upper_bound)
+
+    def stats(self):
+        """Get a snapshot of the retries this policy has taken so far.
+
+        Returns:
+          RetryStats: The stats.
+        """
+        with self._lock:
+            return self._stats
+
+    def reset_stats(self):
+        """Reset this policy's stats.
+        """
+        with self._lock:
+            self._stats = RetryStats(calls=0, retries=0, exhausted=0, backoff_time=0)
+
+    def _record(self, **deltas):
+        with self._lock:
+            self._stats = self._stats._replace(**{
+                name: getattr(self._stats, name) + delta for name, delta in deltas.items()
+            })
@@ -1,9 +1,12 @@
+import inspect
 import logging
 
 from enum import Enum, auto
 from functools import wraps
 
 from .adapter import get_adapter
+from .contention import get_contention_tracker
+from .retries import RetryPolicy
 
 _logger = logging.getLogger(__name__)
 
@@ -40,6 +43,14 @@ class Transaction:  # pragma: no cover
         "Clean up this Transaction object."
         raise NotImplementedError
 
+    @property
+    def keys(self):
+        """set[anom.Key]: The keys of the entities that were read or
+        written inside of this Transaction.  Empty for nested
+        transactions and for adapters that don't keep track of them.
+        """
+        return frozenset()
+
 
 class TransactionError(Exception):
     """Base class for Transaction errors.
@@ -53,11 +64,16 @@ class TransactionFailed(TransactionError):
       message(str): A message.
       cause(Exception or None): The exception that caused this
         Transaction to fail.
+      conflict(bool, optional): Whether or not the Transaction failed
+        because it conflicted with another one.  Only conflicts count
+        towards the contention of the entity groups it touched.
+        Defaults to ``True``.
     """
 
-    def __init__(self, message, cause=None):
+    def __init__(self, message, cause=None, conflict=True):
         self.message = message
         self.cause = cause
+        self.conflict = conflict
 
     def __str__(self):  # pragma: no cover
         return self.message
@@ -79,7 +95,10 @@ class RetriesExceeded(TransactionError):
         return str(self.cause)
 
 
-def transactional(*, adapter=None, retries=3, propagation=Transaction.Propagation.Nested):
+def transactional(
+        *, adapter=None, retries=3, retry_policy=None, propagation=Transaction.Propagation.Nested, read_only=False,
+        contention_tracker=None,
+):
     """Decorates functions so that all of their operations (except for
     queries) run inside a Datastore transaction.
 
@@ -87,10 +106,26 @@ def transactional(*, adapter=None, retries=3, propagation=Transaction.Propagatio
       adapter(Adapter, optional): The Adapter to use when running the
         transaction.  Defaults to the current adapter.
       retries(int, optional): The number of times to retry the
-        transaction if it couldn't be committed.
+        transaction if it couldn't be committed.  Ignored when
+        ``retry_policy`` is given.
+      retry_policy(RetryPolicy, optional): Determines how many times
+        and how far apart the transaction is retried.  Defaults to a
+        policy that retries failed commits ``retries`` times, using
+        exponential backoff with jitter.
       propagation(Transaction.Propagation, optional): The propagation
         strategy to use. By default, transactions are nested, but you
         can force certain transactions to always run independently.
+      read_only(bool, optional): Whether or not the transaction only
+        reads data.  Read-only transactions don't contend with other
+        transactions but putting or deleting entities inside of them
+        raises a :class:`TransactionError`.  Read-write transactions
+        can't be nested inside read-only transactions.  Adapters
+        whose ``transaction`` method doesn't take a ``read_only``
+        argument raise a :class:`TransactionError`.
+      contention_tracker(ContentionTracker, optional): The tracker to
+        record conflicts in.  Retries of transactions that touch hot
+        entity groups back off harder, according to the tracker.
+        Defaults to the global tracker.
 
     Raises:
       anom.RetriesExceeded: When the decorator runbs out of retries
@@ -99,25 +134,38 @@ def transactional(*, adapter=None, retries=3, propagation=Transaction.Propagatio
     Returns:
       callable: The decorated function.
     """
+    retry_policy = retry_policy or RetryPolicy(max_attempts=retries + 1)
+
     def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
         @wraps(fn)
         def inner(*args, **kwargs):
             nonlocal adapter
             adapter = adapter or get_adapter()
-            attempts, cause = 0, None
-            while attempts <= retries:
-                attempts += 1
-                transaction = adapter.transaction(propagation)
+            tracker = contention_tracker or get_contention_tracker()
+            keys = frozenset()
+
+            def attempt():
+                nonlocal keys
+                keys = frozenset()
+                transaction = _new_transaction(adapter, propagation, read_only)
 
                 try:
                     transaction.begin()
                     res = fn(*args, **kwargs)
+                    # Nested transactions don't have any keys of their
+                    # own so only outer transactions are recorded.
+                    keys = transaction.keys
                     transaction.commit()
+                    if keys:
+                        tracker.record(name, keys, conflict=False)
                     return res
 
                 except TransactionFailed as e:
-                    cause = e
-                    continue
+                    if keys:
+                        tracker.record(name, keys, conflict=e.conflict)
+                    raise
 
                 except Exception as e:
                     transaction.rollback()
@@ -126,6 +174,25 @@ def transactional(*, adapter=None, retries=3, propagation=Transaction.Propagatio
                 finally:
                     transaction.end()
 
-            raise RetriesExceeded(cause)
+            try:
+                return retry_policy.call(
+                    attempt,
+                    default_retry_on=(TransactionFailed,),
+                    backoff_factor=lambda error: tracker.backoff_factor(keys),
+                )
+            except TransactionFailed as e:
+                raise RetriesExceeded(e)
         return inner
     return decorator
+
+
+def _new_transaction(adapter, propagation, read_only=False):
+    # read_only is only passed when it's set so that adapters written
+    # before read-only transactions existed keep working.
+    if not read_only:
+        return adapter.transaction(propagation)
+
+    parameters = inspect.signature(adapter.transaction).parameters.values()
+    if not any(parameter.name == "read_only" or parameter.kind == parameter.VAR_KEYWORD for parameter in parameters):
+        raise TransactionError(f"{type(adapter).__name__} doesn't support read-only transactions.")
+    return adapter.transaction(propagation, read_only=True)
@@ -0,0 +1,96 @@
+"""Compares the compression ratio and throughput of anom's codecs.
+
+Usage:
+
+  python benchmarks/compression.py [--rounds N] [SAMPLE_FILE ...]
+
+Each sample file is treated as a single value.  When no files are
+given, a set of synthetic JSON entities is used instead.  Codecs
+whose dependencies aren't installed are skipped.
+"""
+import argparse
+import json
+import random
+import time
+
+from anom import compression
+
+
+def synthetic_samples(count=1000):
+    rng = random.Random(42)
+    tags = ["python", "datastore", "cloud", "orm", "cache", "memcache", "zstd"]
+    for i in range(count):
+        yield json.dumps({
+            "id": i,
+            "title": f"Post number {i}",
+            "author": {"id": rng.randint(1, 100), "name": f"user-{rng.randint(1, 100)}"},
+            "tags": rng.sample(tags, 3),
+            "score": rng.random(),
+            "published": rng.random() > 0.5,
+        }, separators=(",", ":")).encode("utf-8")
+
+
+def make_codecs(samples):
+    for name, options in [
+        ("zlib", {}),
+        ("zlib", {"level": 9}),
+        ("lz4", {}),
+        ("zstd", {}),
+    ]:
+        try:
+            yield f"{name}{options or ''}", compression.get_codec(name, **options)
+        except ImportError:
+            print(f"Skipping {name}: dependency not installed.")
+
+    try:
+        training_set = samples[:len(samples) // 2] or samples
+        yield "zstd+dict", compression.ZstdCodec.train(training_set, size=4096)
+    except ImportError:
+        pass
+    except Exception as e:  # Training fails when there are too few samples.
+        print(f"Skipping zstd+dict: {e}")
+
+
+def run(codec, samples, rounds):
+    raw_size = sum(len(sample) for sample in samples)
+    compressed = [compression.compress(sample, codec) for sample in samples]
+    compressed_size = sum(len(value) for value in compressed)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            compression.compress(sample, codec)
+    compress_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for value in compressed:
+            compression.decompress(value, codec)
+    decompress_time = time.perf_counter() - start
+
+    megabytes = raw_size * rounds / 1024 / 1024
+    return raw_size / compressed_size, megabytes / compress_time, megabytes / decompress_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="files to use as sample values")
+    parser.add_argument("--rounds", type=int, default=10, help="the number of passes over the samples")
+    args = parser.parse_args()
+
+    if args.files:
+        samples = []
+        for filename in args.files:
+            with open(filename, "rb") as f:
+                samples.append(f.read())
+    else:
+        samples = list(synthetic_samples())
+
+    print(f"{'codec':<20} {'ratio':>8} {'compress MB/s':>15} {'decompress MB/s':>17}")
+    for name, codec in make_codecs(samples):
+        ratio, compress_speed, decompress_speed = run(codec, samples, args.rounds)
+        print(f"{name:<20} {ratio:>8.2f} {compress_speed:>15.1f} {decompress_speed:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
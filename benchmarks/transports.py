@@ -0,0 +1,112 @@
+"""Compares the latency and CPU usage of DatastoreAdapter's transports.
+
+Usage:
+
+  python benchmarks/transports.py [--rounds N] [--sizes 1,100,1000]
+
+The benchmark runs against the Datastore emulator.  If the
+DATASTORE_EMULATOR_HOST env var is set, the emulator at that address
+is used, otherwise one is started (this requires the gcloud SDK).
+Transports whose dependencies aren't installed are skipped.  Puts are
+split into batches of 500 entities, the most Datastore accepts in a
+single commit.
+"""
+import argparse
+import os
+import time
+
+from anom import Model, Query, delete_multi, get_multi, props, put_multi, set_adapter
+from anom.adapters import DatastoreAdapter
+from anom.testing import Emulator
+
+
+class BenchmarkEntity(Model):
+    title = props.String(indexed=True)
+    body = props.Text()
+    score = props.Float()
+    tags = props.String(indexed=True, repeated=True)
+    created_at = props.DateTime(auto_now_add=True)
+
+
+def make_entities(count):
+    return [
+        BenchmarkEntity(
+            title=f"Entity number {i}",
+            body="Lorem ipsum dolor sit amet. " * 10,
+            score=i / count,
+            tags=["a", "b", "c"],
+        ) for i in range(count)
+    ]
+
+
+def put_in_batches(entities, batch_size=500):
+    keys = []
+    for offset in range(0, len(entities), batch_size):
+        keys.extend(entity.key for entity in put_multi(entities[offset:offset + batch_size]))
+    return keys
+
+
+def measure(fn, rounds):
+    timings, cpu_start = [], time.process_time()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    cpu_time = time.process_time() - cpu_start
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)], cpu_time / rounds
+
+
+def run(transport, sizes, rounds):
+    try:
+        adapter = DatastoreAdapter(project="anom-benchmarks", transport=transport)
+    except RuntimeError as e:
+        print(f"Skipping {transport}: {e}")
+        return
+
+    set_adapter(adapter)
+    for size in sizes:
+        entities = make_entities(size)
+        keys = put_in_batches(entities)
+        operations = [
+            ("put_multi", lambda: put_in_batches(entities)),
+            ("get_multi", lambda: get_multi(keys)),
+        ]
+        for name, operation in operations:
+            operation()  # Warm up connections and caches.
+            median, p95, cpu = measure(operation, rounds)
+            print(
+                f"{transport:<9} {name:<10} {size:>6} "
+                f"{median * 1000:>12.2f} {p95 * 1000:>12.2f} {cpu * 1000:>12.2f}"
+            )
+
+        for offset in range(0, len(keys), 500):
+            delete_multi(keys[offset:offset + 500])
+
+    Query().delete()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--sizes", default="1,100,1000")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    emulator = None
+    if "DATASTORE_EMULATOR_HOST" not in os.environ:
+        emulator = Emulator()
+        emulator.start(inject=True)
+
+    try:
+        print(f"{'Transport':<9} {'Operation':<10} {'Keys':>6} {'Median (ms)':>12} {'p95 (ms)':>12} {'CPU (ms)':>12}")
+        for transport in ("http", "grpc"):
+            run(transport, sizes, args.rounds)
+    finally:
+        if emulator is not None:
+            emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
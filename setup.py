@@ -18,7 +18,7 @@ with open("requirements.txt") as reqs:
 
 
 extra_dependencies = {}
-for group in ("memcache",):
+for group in ("grpc", "lz4", "memcache", "redis", "ujson", "zstd"):
     extra_dependencies[group] = extra_dep_list = []
     with open(f"requirements-{group}.txt") as reqs:
         for line in reqs:
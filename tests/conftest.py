@@ -50,6 +50,18 @@ def datastore_adapter_instance(emulator):
     return adapters.DatastoreAdapter(project="fake-project-name")
 
 
+@pytest.fixture(scope="session")
+def grpc_datastore_adapter_instance(emulator):
+    return adapters.DatastoreAdapter(project="fake-project-name", transport="grpc")
+
+
+@pytest.fixture
+def grpc_datastore_adapter(grpc_datastore_adapter_instance):
+    with push_adapter(grpc_datastore_adapter_instance) as adapter:
+        yield adapter
+        Query().delete()
+
+
 @pytest.fixture
 def datastore_adapter(datastore_adapter_instance):
     with push_adapter(datastore_adapter_instance) as adapter:
@@ -71,7 +83,7 @@ def default_namespace(request):
     set_namespace(None)
 
 
-@pytest.fixture(params=["datastore_adapter", "memcache_adapter"])
+@pytest.fixture(params=["datastore_adapter", "grpc_datastore_adapter", "memcache_adapter"])
 def adapter(request, default_namespace):
     return request.getfixturevalue(request.param)
 
@@ -1,4 +1,5 @@
 from anom import Model, props
+from anom.adapters import CachePolicy
 from contextlib import contextmanager
 
 
@@ -134,6 +135,15 @@ class ModelWithJsonProperty(Model):
     j = props.Json()
 
 
+class ModelWithBytesProperties(Model):
+    a = props.Bytes(optional=True)
+    b = props.Bytes(optional=True)
+
+
+class ModelWithBlobRefProperty(Model):
+    data = props.BlobRef(optional=True, threshold=16)
+
+
 class ModelWithUnicodeProperty(Model):
     u = props.Unicode()
 
@@ -152,6 +162,18 @@ class Subscriber(Model):
     tags = props.Key(repeated=True, kind=Tag)
 
 
+class ModelWithCachePolicy(Model):
+    _cache_policy = CachePolicy(compress_threshold=64, max_size=1024)
+
+    data = props.Text(optional=True)
+
+
+class UncachedModel(Model):
+    _cache_policy = CachePolicy(enabled=False)
+
+    name = props.String(optional=True)
+
+
 @contextmanager
 def temp_person(**options):
     person = Person(**options).put()
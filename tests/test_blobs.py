@@ -0,0 +1,45 @@
+import pytest
+
+from anom import blobs
+
+
+@pytest.fixture(params=["memory", "filesystem"])
+def blob_store(request, tmpdir):
+    if request.param == "memory":
+        return blobs.MemoryBlobStore()
+    return blobs.FilesystemBlobStore(str(tmpdir))
+
+
+def test_blob_stores_can_store_and_get_blobs(blob_store):
+    blob_store.put("a" * 64, b"a")
+    blob_store.put("b" * 64, b"b")
+    assert blob_store.get_multi(["a" * 64, "c" * 64, "b" * 64]) == [b"a", None, b"b"]
+
+
+def test_blob_stores_can_stream_blobs(blob_store):
+    blob_store.put("a" * 64, b"abc" * 1000)
+    with blob_store.open("a" * 64) as f:
+        assert f.read(3) == b"abc"
+        assert len(f.read()) == 2997
+
+
+def test_blob_stores_fail_to_open_missing_blobs(blob_store):
+    with pytest.raises(KeyError):
+        blob_store.open("a" * 64)
+
+
+def test_blob_stores_can_delete_blobs(blob_store):
+    blob_store.put("a" * 64, b"a")
+    blob_store.delete_multi(["a" * 64, "b" * 64])
+    assert blob_store.get_multi(["a" * 64]) == [None]
+
+
+def test_filesystem_blob_stores_reject_invalid_blob_ids(tmpdir):
+    blob_store = blobs.FilesystemBlobStore(str(tmpdir))
+    with pytest.raises(ValueError):
+        blob_store.put("../a", b"a")
+
+
+def test_get_blob_store_fails_if_no_blob_store_was_set():
+    with pytest.raises(RuntimeError):
+        blobs.get_blob_store()
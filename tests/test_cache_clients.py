@@ -0,0 +1,111 @@
+import pytest
+import time
+
+from contextlib import contextmanager
+
+from anom.adapters import LocalCacheClient, PylibmcCacheClient, TieredCacheClient
+
+
+@pytest.fixture(params=["local", "tiered", "pylibmc"])
+def cache_client(request):
+    if request.param == "local":
+        return LocalCacheClient()
+    elif request.param == "pylibmc":
+        memcache_client = request.getfixturevalue("memcache_client")
+        memcache_client.flush_all()
+        return PylibmcCacheClient(memcache_client)
+    return TieredCacheClient(LocalCacheClient(), LocalCacheClient())
+
+
+def test_cache_clients_can_get_set_and_delete_values(cache_client):
+    cache_client.set_multi({"a": b"1", "b": b"2"})
+    assert cache_client.get_multi(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+
+    cache_client.delete_multi(["a", "c"])
+    assert cache_client.get_multi(["a", "b", "c"]) == {"b": b"2"}
+
+
+def test_cache_clients_only_add_missing_values(cache_client):
+    cache_client.set_multi({"a": b"1"})
+    assert cache_client.add_multi({"a": b"2", "b": b"2"}) == ["a"]
+    assert cache_client.get_multi(["a", "b"]) == {"a": b"1", "b": b"2"}
+
+
+def test_cache_clients_compare_and_swap_values_by_value(cache_client):
+    cache_client.set_multi({"a": b"1", "b": b"1", "c": b"1"})
+    assert cache_client.cas_multi({"a": (b"1", b"2"), "b": (b"2", b"3"), "c": (b"1", None), "d": (b"1", b"2")}) \
+        == ["b", "d"]
+    assert cache_client.get_multi(["a", "b", "c", "d"]) == {"a": b"2", "b": b"1"}
+
+
+def test_cache_clients_can_add_values_again_after_they_are_swapped_out(cache_client):
+    assert cache_client.add_multi({"a": b"lock"}) == []
+    assert cache_client.cas_multi({"a": (b"lock", None)}) == []
+    assert cache_client.get_multi(["a"]) == {}
+    assert cache_client.add_multi({"a": b"lock"}) == []
+    assert cache_client.get_multi(["a"]) == {"a": b"lock"}
+
+
+def test_cache_clients_expire_values(cache_client):
+    if isinstance(cache_client, PylibmcCacheClient):
+        pytest.skip("memcached expires values with a granularity of one second")
+
+    cache_client.set_multi({"a": b"1"}, 0.01)
+    time.sleep(0.02)
+    assert cache_client.get_multi(["a"]) == {}
+
+
+def test_local_cache_clients_evict_least_recently_used_values():
+    cache_client = LocalCacheClient(max_items=2)
+    cache_client.set_multi({"a": b"1", "b": b"2"})
+    cache_client.get_multi(["a"])
+    cache_client.set_multi({"c": b"3"})
+    assert cache_client.get_multi(["a", "b", "c"]) == {"a": b"1", "c": b"3"}
+
+
+def test_tiered_cache_clients_serve_reads_from_l1():
+    l1, l2 = LocalCacheClient(), LocalCacheClient()
+    cache_client = TieredCacheClient(l1, l2)
+    l2.set_multi({"a": b"1"})
+    assert cache_client.get_multi(["a"]) == {"a": b"1"}
+
+    l2.delete_multi(["a"])
+    assert cache_client.get_multi(["a"]) == {"a": b"1"}
+
+    cache_client.delete_multi(["a"])
+    assert cache_client.get_multi(["a"]) == {}
+
+
+class RacingMemcacheClient:
+    """A memcached client whose values are always changed by another
+    client between each gets and the following cas.
+    """
+
+    def __init__(self):
+        self.values = {"a": (b"1", 1), "b": (b"1", 1), "c": (b"2", 1)}
+
+    @contextmanager
+    def reserve(self):
+        yield self
+
+    def get_multi(self, keys):
+        return {key: self.values[key][0] for key in keys if key in self.values}
+
+    def gets(self, key):
+        return self.values.get(key, (None, None))
+
+    def cas(self, key, value, cid, time=0):
+        current, current_cid = self.values[key]
+        self.values[key] = (b"2", current_cid + 1)
+        return False
+
+    def delete_multi(self, keys):
+        for key in keys:
+            del self.values[key]
+
+
+def test_pylibmc_cache_clients_swap_values_atomically():
+    cache_client = PylibmcCacheClient.__new__(PylibmcCacheClient)
+    cache_client.client_pool = RacingMemcacheClient()
+    assert cache_client.cas_multi({"a": (b"1", b"3"), "b": (b"1", None), "c": (b"1", None)}) == ["c", "a"]
+    assert cache_client.client_pool.values == {"a": (b"2", 2), "c": (b"2", 1)}
@@ -0,0 +1,152 @@
+import time
+
+from anom import Adapter, ContentionTracker, Key, RetryPolicy, Transaction, transactional
+from anom.transaction import TransactionFailed
+
+
+class ConflictingTransaction(Transaction):
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.adapter.commits += 1
+        if self.adapter.commits <= self.adapter.failures:
+            raise TransactionFailed("Conflict.", conflict=self.adapter.conflict)
+
+    def rollback(self):
+        pass
+
+    def end(self):
+        pass
+
+    @property
+    def keys(self):
+        return frozenset(self.adapter.keys)
+
+
+class ConflictingAdapter(Adapter):
+    def __init__(self, keys, failures, conflict=True):
+        self.keys = keys
+        self.failures = failures
+        self.conflict = conflict
+        self.commits = 0
+
+    def transaction(self, propagation, *, read_only=False):
+        return ConflictingTransaction(self)
+
+
+def test_contention_trackers_report_the_most_contended_functions_and_entity_groups():
+    tracker = ContentionTracker()
+    hot, cold = Key("Account", "hot"), Key("Account", "cold")
+    for _ in range(3):
+        tracker.record("transfer", [hot], conflict=True)
+    tracker.record("transfer", [hot, cold], conflict=False)
+    tracker.record("deposit", [cold], conflict=False)
+
+    report = tracker.report()
+    assert [(stats.name, stats.attempts, stats.conflicts) for stats in report.functions] == [
+        ("transfer", 4, 3),
+        ("deposit", 1, 0),
+    ]
+    assert [stats.name for stats in report.entity_groups] == [hot, cold]
+    assert report.functions[0].conflict_rate == 0.75
+    assert tracker.report(limit=1).entity_groups == report.entity_groups[:1]
+
+    tracker.reset()
+    assert tracker.report() == ([], [])
+
+
+def test_contention_trackers_group_keys_by_their_root():
+    tracker = ContentionTracker()
+    account = Key("Account", "a")
+    tracker.record("transfer", [Key("Entry", 1, parent=account), Key("Entry", 2, parent=account)], conflict=True)
+
+    (entity_group,) = tracker.report().entity_groups
+    assert entity_group.name == account
+    assert entity_group.attempts == 1
+
+
+def test_contention_trackers_back_off_harder_on_hot_entity_groups():
+    tracker = ContentionTracker(max_backoff_factor=5)
+    hot, cold = Key("Account", "hot"), Key("Account", "cold")
+    for _ in range(4):
+        tracker.record("transfer", [hot], conflict=True)
+        tracker.record("deposit", [cold], conflict=False)
+
+    assert tracker.backoff_factor([hot]) == 5
+    assert tracker.backoff_factor([hot, cold]) == 5
+    assert tracker.backoff_factor([cold]) == 1
+    assert tracker.backoff_factor([Key("Account", "unknown")]) == 1
+
+
+def test_contention_trackers_forget_old_conflicts(monkeypatch):
+    tracker = ContentionTracker(half_life=1)
+    hot = Key("Account", "hot")
+    monkeypatch.setattr(time, "monotonic", lambda: 100)
+    tracker.record("transfer", [hot], conflict=True)
+    assert tracker.backoff_factor([hot]) == tracker.max_backoff_factor
+
+    monkeypatch.setattr(time, "monotonic", lambda: 105)
+    assert tracker.backoff_factor([hot]) == 1
+    assert tracker.report().entity_groups[0].conflicts == 1
+
+
+def test_contention_trackers_forget_the_least_contended_entity_groups():
+    tracker = ContentionTracker(max_entity_groups=4)
+    for i in range(5):
+        tracker.record("transfer", [Key("Account", i)], conflict=i == 0)
+
+    entity_groups = tracker.report().entity_groups
+    assert len(entity_groups) == 2
+    assert entity_groups[0].name == Key("Account", 0)
+
+
+def test_transactional_records_conflicts_and_backs_off_on_hot_entity_groups():
+    hot = Key("Account", "hot")
+    adapter = ConflictingAdapter(keys=[hot], failures=2)
+    tracker, policy = ContentionTracker(max_backoff_factor=3), RetryPolicy(initial_backoff=0.001)
+    factors = []
+    backoff_factor = tracker.backoff_factor
+    tracker.backoff_factor = lambda keys: factors.append(backoff_factor(keys)) or factors[-1]
+
+    @transactional(adapter=adapter, retry_policy=policy, contention_tracker=tracker)
+    def transfer():
+        return 42
+
+    assert transfer() == 42
+
+    report = tracker.report()
+    (function,) = report.functions
+    assert function.name.endswith("transfer")
+    assert (function.attempts, function.conflicts) == (3, 2)
+    assert report.entity_groups[0] == (hot, 3, 2)
+    assert factors == [3, 3]
+
+
+def test_transactional_does_not_record_transactions_without_keys():
+    adapter = ConflictingAdapter(keys=[], failures=1)
+    tracker = ContentionTracker()
+
+    @transactional(adapter=adapter, retry_policy=RetryPolicy(initial_backoff=0.001), contention_tracker=tracker)
+    def noop():
+        pass
+
+    noop()
+    assert tracker.report() == ([], [])
+
+
+def test_transactional_only_records_failures_caused_by_conflicts_as_conflicts():
+    hot = Key("Account", "hot")
+    adapter = ConflictingAdapter(keys=[hot], failures=2, conflict=False)
+    tracker = ContentionTracker()
+
+    @transactional(adapter=adapter, retry_policy=RetryPolicy(initial_backoff=0.001), contention_tracker=tracker)
+    def transfer():
+        pass
+
+    transfer()
+    assert tracker.report().entity_groups == [(hot, 3, 0)]
+    assert tracker.conflict_rate(hot) == 0
@@ -0,0 +1,119 @@
+import pytest
+
+from anom import ContentionTracker, CounterConfig, ShardedCounter, transactional
+from anom.transaction import TransactionError, TransactionFailed
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+
+def test_sharded_counters_start_at_zero(adapter):
+    assert ShardedCounter("empty").get() == 0
+
+
+def test_sharded_counters_can_be_incremented(adapter):
+    counter = ShardedCounter("views", shards=4)
+    for _ in range(10):
+        counter.increment()
+
+    counter.increment(-3)
+    assert counter.get() == 7
+
+
+def test_sharded_counters_can_be_incremented_concurrently(adapter):
+    counter = ShardedCounter("concurrent", shards=4)
+    with ThreadPoolExecutor(max_workers=8) as e:
+        for future in [e.submit(counter.increment) for _ in range(32)]:
+            future.result()
+
+    assert counter.get() == 32
+
+
+def increment_with_failures(counter, failures):
+    increment_shard = counter._increment_shard
+
+    def failing_increment_shard(index, delta):
+        increment_shard(index, delta)
+        if failures:
+            raise failures.pop()
+
+    with patch.object(counter, "_increment_shard", failing_increment_shard):
+        counter.increment()
+
+
+def test_sharded_counters_grow_when_increments_conflict(adapter):
+    tracker = ContentionTracker()
+    counter = ShardedCounter("hot", shards=2, max_shards=4, contention_tracker=tracker)
+    tracker.record("test", counter._shard_keys(0, 2), conflict=True)
+    increment_with_failures(counter, [TransactionFailed("Conflict.")] * 3)
+
+    config = CounterConfig.get(counter.name)
+    assert config.shards == 4
+    assert counter.get() == 1
+
+
+def test_sharded_counters_dont_grow_on_occasional_conflicts(adapter):
+    tracker = ContentionTracker()
+    counter = ShardedCounter("warm", shards=2, max_shards=4, contention_tracker=tracker)
+    for _ in range(4):
+        tracker.record("test", counter._shard_keys(0, 2), conflict=False)
+
+    increment_with_failures(counter, [TransactionFailed("Conflict.")])
+    assert CounterConfig.get(counter.name) is None
+    assert counter.get() == 1
+
+
+def test_sharded_counters_dont_grow_on_other_failures(adapter):
+    tracker = ContentionTracker()
+    counter = ShardedCounter("failing", shards=2, max_shards=4, contention_tracker=tracker)
+    tracker.record("test", counter._shard_keys(0, 2), conflict=True)
+    increment_with_failures(counter, [TransactionFailed("Unavailable.", conflict=False)] * 3)
+
+    assert CounterConfig.get(counter.name) is None
+    assert counter.get() == 1
+
+
+def test_sharded_counters_read_shards_added_by_other_processes(adapter):
+    counter = ShardedCounter("grown", shards=2)
+    counter.increment()
+    CounterConfig(key=counter._config_key(), shards=4).put()
+    other_counter = ShardedCounter("grown", shards=4)
+    for index in range(4):
+        other_counter._increment_shard(index, 1)
+
+    assert counter.get() == 5
+    assert counter._shards == 4
+
+
+def test_sharded_counters_can_cache_totals(memcache_adapter):
+    counter = ShardedCounter("cached", cache_timeout=60)
+    counter.increment()
+    assert counter.get() == 1
+
+    counter.increment()
+    with patch("anom.counters.get_multi") as get_multi_mock:
+        assert counter.get() == 1
+
+    get_multi_mock.assert_not_called()
+    assert ShardedCounter("cached").get() == 2
+
+
+def test_sharded_counters_can_be_read_inside_transactions(adapter):
+    counter = ShardedCounter("transactional", shards=24)
+    counter.increment()
+    assert transactional()(counter.get)() == 1
+
+
+def test_sharded_counters_with_too_many_shards_cant_be_read_inside_transactions(adapter):
+    counter = ShardedCounter("large", shards=32)
+    with pytest.raises(TransactionError):
+        transactional()(counter.get)()
+
+    counter = ShardedCounter("grown-large", shards=2)
+    CounterConfig(key=counter._config_key(), shards=32).put()
+    with pytest.raises(TransactionError):
+        transactional()(counter.get)()
+
+
+def test_sharded_counters_require_a_valid_number_of_shards():
+    with pytest.raises(ValueError):
+        ShardedCounter("invalid", shards=16, max_shards=8)
@@ -0,0 +1,127 @@
+import pytest
+
+from anom import HedgePolicy, Key, RetriesExceeded, RetryPolicy, set_adapter, transactional
+from anom.adapters import DatastoreAdapter
+from google.api_core import exceptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.proto import datastore_pb2
+from google.rpc import status_pb2
+from unittest.mock import patch
+
+
+def test_datastore_adapters_fail_to_initialize_given_invalid_transports():
+    with pytest.raises(ValueError):
+        DatastoreAdapter(project="fake-project-name", transport="carrier-pigeon")
+
+
+def test_datastore_adapters_can_use_the_grpc_transport(grpc_datastore_adapter):
+    assert grpc_datastore_adapter.transport == "grpc"
+    assert grpc_datastore_adapter.client._use_grpc
+
+
+def test_datastore_adapters_retry_contention_and_bad_gateways():
+    adapter = DatastoreAdapter(
+        project="fake-project-name",
+        credentials=AnonymousCredentials(),
+        retry_policy=RetryPolicy(initial_backoff=0.001),
+    )
+    errors = [
+        exceptions.from_http_status(409, "Too much contention.", errors=[status_pb2.Status(code=10)]),
+        exceptions.from_http_status(502, "Bad gateway."),
+    ]
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert adapter._call(flaky) == "ok"
+    assert adapter.retry_policy.stats().retries == 2
+
+
+def test_datastore_adapters_dont_retry_other_conflicts():
+    adapter = DatastoreAdapter(
+        project="fake-project-name",
+        credentials=AnonymousCredentials(),
+        retry_policy=RetryPolicy(initial_backoff=0.001),
+    )
+    calls = []
+
+    def conflicting():
+        calls.append(1)
+        raise exceptions.from_http_status(409, "Entity already exists.", errors=[status_pb2.Status(code=6)])
+
+    with pytest.raises(exceptions.Conflict):
+        adapter._call(conflicting)
+
+    assert len(calls) == 1
+
+
+def test_datastore_adapters_hedge_lookups_of_different_sizes_separately():
+    policy = HedgePolicy()
+    adapter = DatastoreAdapter(project="fake-project-name", credentials=AnonymousCredentials(), hedge_policy=policy)
+    small_keys, large_keys = [Key("Person", 1)], [Key("Person", i) for i in range(1, 101)]
+    with patch.object(adapter, "_get_multi", lambda keys, *options: [None] * len(keys)):
+        for _ in range(3):
+            assert adapter.get_multi(small_keys) == [None]
+            assert adapter.get_multi(large_keys) == [None] * 100
+
+    assert {operation: len(latencies.samples) for operation, latencies in policy._latencies.items()} == {
+        "get_multi:1": 3,
+        "get_multi:256": 3,
+    }
+
+
+class FakeResponse:
+    def __init__(self, response_pb, status_code=200):
+        self.status_code = status_code
+        self.content = response_pb.SerializeToString()
+
+
+def test_datastore_adapters_begin_read_only_transactions_as_read_only():
+    adapter = DatastoreAdapter(project="fake-project-name", credentials=AnonymousCredentials())
+    set_adapter(adapter)
+
+    requests = {}
+    responses = {
+        "beginTransaction": datastore_pb2.BeginTransactionResponse(transaction=b"transaction-id"),
+        "commit": datastore_pb2.CommitResponse(),
+        "rollback": datastore_pb2.RollbackResponse(),
+    }
+
+    def request(method, url, data=None, **kwargs):
+        rpc = url.rsplit(":", 1)[1]
+        requests[rpc] = data
+        return FakeResponse(responses[rpc])
+
+    @transactional(read_only=True)
+    def read():
+        pass
+
+    with patch.object(adapter.proxy, "request", request):
+        read()
+
+    request_pb = datastore_pb2.BeginTransactionRequest.FromString(requests["beginTransaction"])
+    assert request_pb.transaction_options.HasField("read_only")
+
+
+@pytest.mark.parametrize("code,conflict", [(10, True), (6, False)])
+def test_datastore_adapters_tell_transactions_that_conflict_apart(code, conflict):
+    adapter = DatastoreAdapter(project="fake-project-name", credentials=AnonymousCredentials())
+    set_adapter(adapter)
+
+    responses = {
+        "beginTransaction": FakeResponse(datastore_pb2.BeginTransactionResponse(transaction=b"transaction-id")),
+        "commit": FakeResponse(status_pb2.Status(code=code, message="Conflict."), status_code=409),
+        "rollback": FakeResponse(datastore_pb2.RollbackResponse()),
+    }
+
+    @transactional(retry_policy=RetryPolicy(max_attempts=1))
+    def write():
+        pass
+
+    with patch.object(adapter.proxy, "request", lambda method, url, **kwargs: responses[url.rsplit(":", 1)[1]]):
+        with pytest.raises(RetriesExceeded) as e:
+            write()
+
+    assert e.value.cause.conflict is conflict
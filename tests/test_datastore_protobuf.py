@@ -0,0 +1,101 @@
+import pytest
+
+from datetime import datetime, timezone
+from google.cloud import datastore
+from google.cloud._helpers import _datetime_to_pb_timestamp
+from google.cloud.datastore import helpers
+from google.cloud.datastore_v1.proto import datastore_pb2, entity_pb2
+
+from anom import Key
+from anom.adapters.datastore_protobuf import (
+    entity_from_protobuf, entity_to_protobuf, key_from_protobuf, key_to_protobuf, keys_from_protobuf,
+    read_options_to_protobuf,
+)
+
+
+def to_datastore(value):
+    if isinstance(value, Key):
+        return datastore.Key(*value.path, namespace=value.namespace or None, project="fake-project-name")
+
+    elif isinstance(value, list):
+        return [to_datastore(item) for item in value]
+
+    return value
+
+
+def test_entity_protobufs_match_those_built_by_the_client_library():
+    parent = Key("Parent", "a", namespace="ns")
+    key = Key("Child", 1, parent=parent)
+    unindexed = ["blob", "tags", "empty"]
+    data = [
+        ("string", "hello"),
+        ("blob", b"\x00\x01"),
+        ("integer", 42),
+        ("float", 1.5),
+        ("bool", True),
+        ("none", None),
+        ("tags", ["a", "b"]),
+        ("empty", []),
+        ("timestamp", datetime(2018, 1, 1, 12, 30, tzinfo=timezone.utc)),
+        ("key", Key("Other", "b", parent=parent)),
+        ("keys", [parent, key]),
+    ]
+
+    entity = datastore.Entity(to_datastore(key), unindexed)
+    entity.update({name: to_datastore(value) for name, value in data})
+
+    entity_pb = entity_to_protobuf(entity_pb2.Entity(), "fake-project-name", key, unindexed, data)
+    assert entity_pb == helpers.entity_to_protobuf(entity)
+    assert key_from_protobuf(entity_pb.key) == key
+    assert entity_from_protobuf(entity_pb) == dict(data)
+
+
+def test_partial_keys_can_be_converted_to_protobufs():
+    key = Key("Child", parent=Key("Parent", 1))
+    entity_pb = entity_to_protobuf(entity_pb2.Entity(), "fake-project-name", key, [], [])
+    assert [element.kind for element in entity_pb.key.path] == ["Parent", "Child"]
+    assert key_from_protobuf(entity_pb.key) == key
+
+
+def test_keys_that_share_ancestors_share_parent_keys():
+    parent = Key("Parent", 1)
+    key_pbs = [
+        key_to_protobuf(entity_pb2.Key(), "fake-project-name", Key("Child", i, parent=parent))
+        for i in range(1, 3)
+    ]
+
+    first, second = keys_from_protobuf(key_pbs)
+    assert first.parent == second.parent == parent
+    assert first.parent is second.parent
+
+
+def test_key_properties_are_converted_straight_into_keys():
+    keys = [Key("Other", 1), Key("Other", 2)]
+    data = [("one", keys[0]), ("many", keys), ("none", None), ("other", [1, 2])]
+    entity_pb = entity_to_protobuf(entity_pb2.Entity(), "fake-project-name", Key("Entity", 1), [], data)
+    assert entity_from_protobuf(entity_pb, frozenset(["one", "many", "none"])) == dict(data)
+
+
+def test_read_options_match_those_built_by_the_client_library():
+    assert read_options_to_protobuf() == helpers.get_read_options(False, None)
+    assert read_options_to_protobuf("strong") == helpers.get_read_options(False, None)
+    assert read_options_to_protobuf("eventual") == helpers.get_read_options(True, None)
+    assert read_options_to_protobuf(transaction_id=b"txn") == helpers.get_read_options(False, b"txn")
+
+
+def test_read_options_can_read_snapshots():
+    read_time = datetime(2018, 1, 1, 12, 30, tzinfo=timezone.utc)
+    read_options = datastore_pb2.LookupRequest(read_options=read_options_to_protobuf(read_time=read_time)).read_options
+    timestamp = _datetime_to_pb_timestamp(read_time).SerializeToString()
+    assert read_options.SerializeToString() == b"\x22" + bytes([len(timestamp)]) + timestamp
+
+
+@pytest.mark.parametrize("options", [
+    {"read_consistency": "weak"},
+    {"read_consistency": "eventual", "read_time": datetime(2018, 1, 1, tzinfo=timezone.utc)},
+    {"read_consistency": "eventual", "transaction_id": b"txn"},
+    {"read_time": datetime(2018, 1, 1, tzinfo=timezone.utc), "transaction_id": b"txn"},
+])
+def test_read_options_reject_invalid_combinations(options):
+    with pytest.raises(ValueError):
+        read_options_to_protobuf(**options)
@@ -0,0 +1,75 @@
+import pytest
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from google.auth.credentials import AnonymousCredentials
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from anom import DeadlineExceeded, deadline
+from anom.adapters import PoolStats
+from anom.adapters.datastore_proxy import ConfigurableDatastoreRequestsProxy
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(1)
+
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_proxies_reuse_connections_within_a_thread(server_url):
+    proxy = ConfigurableDatastoreRequestsProxy(AnonymousCredentials())
+    for _ in range(3):
+        assert proxy.request("GET", server_url).content == b"ok"
+
+    stats = proxy.pool_stats()
+    assert isinstance(stats, PoolStats)
+    assert stats.connections == 1
+    assert stats.in_use == 0
+    assert stats.idle == 1
+    assert stats.requests == 3
+
+
+def test_proxies_can_share_a_single_pool_between_threads(server_url):
+    proxy = ConfigurableDatastoreRequestsProxy(AnonymousCredentials(), pool_size=2, pool_block=True, share_session=True)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: proxy.request("GET", server_url), range(16)))
+
+    assert all(response.content == b"ok" for response in responses)
+
+    stats = proxy.pool_stats()
+    assert stats.connections <= 2
+    assert stats.requests == 16
+
+
+def test_proxies_abandon_requests_that_outlast_the_deadline(server_url):
+    proxy = ConfigurableDatastoreRequestsProxy(AnonymousCredentials())
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded), deadline(0.1):
+        proxy.request("GET", server_url + "slow")
+
+    assert time.monotonic() - start < 0.5
+
+
+def test_proxies_dont_send_requests_once_the_deadline_has_passed(server_url):
+    proxy = ConfigurableDatastoreRequestsProxy(AnonymousCredentials())
+    with pytest.raises(DeadlineExceeded), deadline(0):
+        proxy.request("GET", server_url)
+
+    assert proxy.pool_stats().requests == 0
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import time
+
+from anom import DeadlineExceeded, RetryPolicy, deadline, get_deadline, remaining_time
+from anom.deadlines import check_deadline
+
+
+def test_deadlines_are_unset_by_default():
+    assert get_deadline() is None
+    assert remaining_time() is None
+    check_deadline()
+
+
+def test_deadlines_bound_the_remaining_time():
+    with deadline(10):
+        assert 9 < remaining_time() <= 10
+
+    assert remaining_time() is None
+
+
+def test_inner_deadlines_can_only_shorten_outer_deadlines():
+    with deadline(1):
+        outer_deadline = get_deadline()
+        with deadline(10):
+            assert get_deadline() == outer_deadline
+
+        with deadline(0.5):
+            assert get_deadline() < outer_deadline
+
+        with deadline(None):
+            assert get_deadline() == outer_deadline
+
+        assert get_deadline() == outer_deadline
+
+
+def test_deadlines_can_be_checked():
+    with pytest.raises(DeadlineExceeded), deadline(0):
+        check_deadline()
+
+
+def test_retry_policies_dont_retry_past_the_deadline():
+    policy = RetryPolicy(max_attempts=100, initial_backoff=1, max_backoff=1)
+    policy.backoff = lambda attempt: 1
+    calls = 0
+
+    def fail():
+        nonlocal calls
+        calls += 1
+        raise ConnectionError()
+
+    start = time.monotonic()
+    with pytest.raises(ConnectionError), deadline(0.5):
+        policy.call(fail, default_retry_on=(ConnectionError,))
+
+    assert calls == 1
+    assert time.monotonic() - start < 0.5
+    assert policy.stats().exhausted == 1
+
+
+def test_deadlines_are_isolated_between_asyncio_tasks():
+    async def get_deadline_in(timeout):
+        with deadline(timeout):
+            await asyncio.sleep(0)
+            return get_deadline()
+
+    async def main():
+        return await asyncio.gather(get_deadline_in(None), get_deadline_in(10))
+
+    without_deadline, with_deadline = asyncio.run(main())
+    assert without_deadline is None
+    assert with_deadline is not None
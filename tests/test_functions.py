@@ -1,6 +1,6 @@
 import pytest
 
-from anom import delete_multi, get_multi, put_multi, lookup_model_by_kind
+from anom import Adapter, Key, delete_multi, get_multi, put_multi, lookup_model_by_kind, set_adapter
 
 from .models import Person
 
@@ -21,3 +21,17 @@ def test_delete_multi_can_be_called_with_empty_list(adapter):
 def test_get_and_multi_can_be_called_with_empty_list(adapter):
     for fn in (get_multi, put_multi):
         assert fn([]) == []
+
+
+class LegacyAdapter(Adapter):
+    def get_multi(self, keys):
+        return [None for _ in keys]
+
+
+def test_get_multi_supports_adapters_without_read_options():
+    set_adapter(LegacyAdapter())
+    assert get_multi([Key(Person, 1)]) == [None]
+    assert Person.get(1) is None
+
+    with pytest.raises(TypeError):
+        get_multi([Key(Person, 1)], read_consistency="eventual")
@@ -0,0 +1,87 @@
+import pytest
+import time
+
+from anom import HedgePolicy, deadline, remaining_time
+
+
+class Straggler:
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        delay = self.delays[self.calls - 1]
+        time.sleep(delay)
+        return delay
+
+
+def test_hedge_policies_dont_hedge_fast_calls():
+    policy = HedgePolicy(initial_delay=1)
+    fn = Straggler([0])
+    assert policy.call(fn) == 0
+    assert fn.calls == 1
+    assert policy.stats().hedges == 0
+
+
+def test_hedge_policies_hedge_slow_calls():
+    policy = HedgePolicy(initial_delay=0.05)
+    fn = Straggler([1, 0])
+
+    start = time.monotonic()
+    assert policy.call(fn) == 0
+    assert time.monotonic() - start < 0.5
+    assert fn.calls == 2
+    assert policy.stats().hedges == 1
+    assert policy.stats().hedge_wins == 1
+
+
+def test_hedge_policies_use_the_first_successful_response():
+    policy = HedgePolicy(initial_delay=0.01)
+    calls = 0
+
+    def fn():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            time.sleep(0.05)
+            raise ConnectionError()
+
+        time.sleep(0.1)
+        return "ok"
+
+    assert policy.call(fn) == "ok"
+
+
+def test_hedge_policies_raise_the_first_error_if_every_call_fails():
+    policy = HedgePolicy(initial_delay=0.01)
+    calls = 0
+
+    def fn():
+        nonlocal calls
+        calls += 1
+        call = calls
+        time.sleep(0.05)
+        raise ValueError(call)
+
+    with pytest.raises(ValueError) as e:
+        policy.call(fn)
+
+    assert e.value.args == (1,)
+
+
+def test_hedge_policies_hedge_after_a_percentile_of_recent_latencies():
+    policy = HedgePolicy(percentile=90, initial_delay=1, min_delay=0)
+    for latency in range(100):
+        policy._record_latency("get_multi", latency / 1000)
+
+    assert 0.08 <= policy.delay("get_multi") <= 0.09
+    assert policy.delay("query") == 1
+
+
+def test_hedge_policies_carry_deadlines_over_to_their_workers():
+    policy = HedgePolicy()
+    with deadline(10):
+        assert 9 < policy.call(remaining_time) <= 10
+
+    assert policy.call(remaining_time) is None
@@ -92,6 +92,10 @@ def test_keys_can_get_single_entities(person):
     assert person.key.get() == person
 
 
+def test_keys_can_get_single_entities_with_eventual_consistency(person):
+    assert person.key.get(read_consistency="eventual") == person
+
+
 def test_keys_can_fail_to_get_single_entities(adapter):
     assert Key(models.Person, "nonexistent").get() is None
 
@@ -1,6 +1,9 @@
+import os
 import pytest
 
-from anom import get_multi
+from anom import Adapter, Key, get_multi, set_adapter, transactional
+from anom.adapters import LocalCacheClient, MemcacheAdapter
+from anom.properties import Msgpack
 from concurrent.futures import ThreadPoolExecutor
 
 from . import models
@@ -15,6 +18,175 @@ def test_get_multi_retrieves_cached_and_non_cached_entities(memcache_adapter):
         assert get_multi([person_1.key, person_2.key]) == [person_1, person_2]
 
 
+def test_get_multi_handles_duplicate_and_missing_keys(memcache_adapter):
+    person = models.Person(email="someone@example.com", first_name="Person").put()
+    missing_key = Key(models.Person, 123456789)
+
+    for _ in range(2):
+        assert get_multi([person.key, missing_key, person.key]) == [person, None, person]
+
+
+def test_cached_queries_are_invalidated_by_writes(memcache_adapter):
+    memcache_adapter.cache_queries = True
+    person_1 = models.Person(email="someone@example.com", first_name="Person 1").put()
+    person_2 = models.Person(email="someone.else@example.com", first_name="Person 2").put()
+
+    query = models.Person.query().where(models.Person.email == "someone@example.com")
+    for _ in range(2):
+        assert list(query.run(cache=True)) == [person_1]
+
+    person_2.email = "someone@example.com"
+    person_2.put()
+    assert sorted(query.run(cache=True), key=lambda p: p.first_name) == [person_1, person_2]
+
+    person_1.delete()
+    assert list(query.run(cache=True)) == [person_2]
+    assert list(query.run(cache=True, keys_only=True)) == [person_2.key]
+
+
+def test_transactional_reads_are_cached_after_commit(memcache_adapter):
+    memcache_adapter.cache_in_transactions = True
+    person_1 = models.Person(email="someone@example.com", first_name="Person 1").put()
+    person_2 = models.Person(email="someone.else@example.com", first_name="Person 2").put()
+
+    @transactional()
+    def update():
+        assert person_1.key.get() == person_1
+
+        person_2.first_name = "Updated"
+        person_2.put()
+        assert person_2.key.get().first_name == "Updated"
+
+    update()
+
+    person_1_key = memcache_adapter._convert_key_to_memcache(person_1.key)
+    person_2_key = memcache_adapter._convert_key_to_memcache(person_2.key)
+    assert memcache_adapter.client.get_multi([person_1_key, person_2_key]).keys() == {person_1_key}
+
+    assert get_multi([person_1.key, person_2.key]) == [person_1, person_2]
+
+
+def test_reads_inside_read_only_transactions_are_not_cached(memcache_adapter):
+    memcache_adapter.cache_in_transactions = True
+    person = models.Person(email="someone@example.com", first_name="Person").put()
+
+    @transactional(read_only=True)
+    def read():
+        assert person.key.get() == person
+
+    read()
+
+    memcache_key = memcache_adapter._convert_key_to_memcache(person.key)
+    assert memcache_adapter.client.get_multi([memcache_key]) == {}
+
+
+def test_missing_entities_can_be_cached_until_they_are_put(memcache_adapter):
+    memcache_adapter.missing_timeout = 60
+    key = Key(models.Person, 123456789)
+    memcache_key = memcache_adapter._convert_key_to_memcache(key)
+
+    assert key.get() is None
+    assert memcache_adapter.client.get_multi([memcache_key]) == {memcache_key: memcache_adapter._tombstone}
+    assert key.get() is None
+
+    person = models.Person(key=key, email="someone@example.com", first_name="Person").put()
+    assert key.get() == person
+
+
+def test_models_can_declare_cache_policies(memcache_adapter):
+    small = models.ModelWithCachePolicy(data="a" * 32).put()
+    compressible = models.ModelWithCachePolicy(data="a" * 512).put()
+    too_large = models.ModelWithCachePolicy(data=os.urandom(2048).hex()).put()
+    uncached = models.UncachedModel(name="Uncached").put()
+
+    keys = [small.key, compressible.key, too_large.key, uncached.key]
+    for _ in range(2):
+        assert get_multi(keys) == [small, compressible, too_large, uncached]
+
+    memcache_keys = [memcache_adapter._convert_key_to_memcache(key) for key in keys]
+    mapping = memcache_adapter.client.get_multi(memcache_keys)
+    assert mapping.keys() == set(memcache_keys[:2])
+    assert len(mapping[memcache_keys[1]]) < 512
+
+
+class RecordingCacheClient(LocalCacheClient):
+    def __init__(self):
+        super().__init__()
+        self.written_keys = set()
+
+    def set_multi(self, mapping, timeout=0):
+        self.written_keys.update(mapping)
+        return super().set_multi(mapping, timeout)
+
+    def delete_multi(self, keys):
+        self.written_keys.update(keys)
+        return super().delete_multi(keys)
+
+
+class WritingAdapter(Adapter):
+    def put_multi(self, requests):
+        return [request.key for request in requests]
+
+    def delete_multi(self, keys):
+        pass
+
+
+def test_writes_of_uncached_models_skip_memcache():
+    client = RecordingCacheClient()
+    set_adapter(MemcacheAdapter(client, WritingAdapter()))
+
+    entity = models.UncachedModel(key=Key(models.UncachedModel, 1), name="Uncached").put()
+    entity.delete()
+    assert client.written_keys == set()
+
+    models.Person(key=Key(models.Person, 1), email="someone@example.com", first_name="Person").put()
+    assert len(client.written_keys) == 1
+
+
+def test_released_leases_can_be_read_and_leased_again(memcache_adapter):
+    too_large = models.ModelWithCachePolicy(data=os.urandom(2048).hex()).put()
+    missing_key = Key(models.ModelWithCachePolicy, "missing")
+    memcache_keys = [memcache_adapter._convert_key_to_memcache(key) for key in (too_large.key, missing_key)]
+
+    for _ in range(2):
+        assert get_multi([too_large.key, missing_key]) == [too_large, None]
+        assert memcache_adapter.client.get_multi(memcache_keys) == {}
+
+    small = models.ModelWithCachePolicy(key=missing_key, data="a" * 32).put()
+    assert missing_key.get() == small
+    assert memcache_keys[1] in memcache_adapter.client.get_multi(memcache_keys)
+
+
+def test_entities_cached_in_a_different_format_are_replaced(memcache_adapter):
+    person = models.Person(email="someone@example.com", first_name="Person").put()
+    memcache_key = memcache_adapter._convert_key_to_memcache(person.key)
+    memcache_adapter.client.set_multi({memcache_key: Msgpack._dumps({"email": "stale@example.com"})})
+
+    assert person.key.get() == person
+
+    data = memcache_adapter.client.get_multi([memcache_key])[memcache_key]
+    assert memcache_adapter._loads(data, person.key.kind) is not None
+
+
+def test_concurrent_misses_can_be_coalesced(memcache_adapter):
+    memcache_adapter.coalesce_misses = True
+    person = models.Person(email="someone@example.com", first_name="Person").put()
+
+    with ThreadPoolExecutor(max_workers=16) as e:
+        futures = [e.submit(person.key.get) for _ in range(32)]
+
+    assert all(future.result() == person for future in futures)
+
+
+def test_entities_are_refreshed_early_as_they_approach_expiration():
+    adapter = MemcacheAdapter(LocalCacheClient(), Adapter())
+    assert not adapter._should_refresh(100, 200, 0.1)
+    assert adapter._should_refresh(100, 100, 0.1)
+
+    adapter.early_refresh_beta = 0
+    assert not adapter._should_refresh(100, 100, 0.1)
+
+
 @pytest.mark.skip(reason="Flaky.")
 def test_delete_wins_under_contention(memcache_adapter):
     person = models.Person(email="someone@example.com", first_name="Person").put()
@@ -2,7 +2,7 @@ import pytest
 
 from anom import Key, Model
 
-from .models import Person, Mutant, MutantUser, ModelWithCustomKind
+from .models import Person, Mutant, MutantUser, ModelWithBytesProperties, ModelWithCustomKind
 
 
 def test_constructor_params_must_be_valid_properties():
@@ -36,6 +36,11 @@ def test_model_put_requires_fields_that_are_not_optional_to_be_set(adapter):
         person.put()
 
 
+def test_model_put_fails_early_if_the_entity_is_too_large(adapter):
+    with pytest.raises(ValueError):
+        ModelWithBytesProperties(a=b"a" * 600000, b=b"b" * 600000).put()
+
+
 def test_model_instances_can_be_equal():
     person = Person()
     assert person == person
@@ -1,4 +1,5 @@
 import anom
+import asyncio
 
 from . import models  # noqa
 
@@ -160,3 +161,19 @@ def test_datastore_client_uses_the_default_namespace(adapter):
 
     # Then I shuold get nothing back
     assert users == [None, None]
+
+
+def test_namespaces_are_isolated_between_asyncio_tasks():
+    # Given that I have two tasks that each set a namespace and then
+    # yield to one another while inside of it
+    async def get_namespace_in(namespace):
+        with anom.namespace(namespace):
+            await asyncio.sleep(0)
+            return anom.get_namespace()
+
+    async def main():
+        return await asyncio.gather(get_namespace_in("foo"), get_namespace_in("bar"))
+
+    # When I run them concurrently on the same thread
+    # I expect each of them to only ever see its own namespace
+    assert asyncio.run(main()) == ["foo", "bar"]
@@ -3,7 +3,8 @@ import json
 import msgpack
 import pytest
 
-from anom import Key, Model, Property, props
+from anom import Adapter, Key, Model, Property, blobs, compression, get_multi, props, set_adapter
+from anom.adapter import QueryResponse
 from datetime import datetime
 from dateutil.tz import tzlocal, tzutc
 
@@ -38,6 +39,180 @@ def test_compressables_compression_level_needs_to_be_in_a_specific_range():
         props.Text(compressed=True, compression_level=20)
 
 
+@pytest.mark.parametrize("codec", ["zlib", "lz4", "zstd"])
+def test_compressables_can_use_different_codecs(codec):
+    data = b"a" * 1000
+    prop = props.Bytes(codec=codec)
+    compressed_bytes = prop.prepare_to_store(None, data)
+    assert len(compressed_bytes) < len(data)
+    assert prop.prepare_to_load(None, compressed_bytes) == data
+
+
+def test_compressables_can_load_data_compressed_with_other_codecs():
+    data = b"a" * 1000
+    zlib_bytes = props.Bytes(compressed=True).prepare_to_store(None, data)
+    lz4_bytes = props.Bytes(codec="lz4").prepare_to_store(None, data)
+
+    prop = props.Bytes(codec="zstd")
+    assert prop.prepare_to_load(None, zlib_bytes) == data
+    assert prop.prepare_to_load(None, lz4_bytes) == data
+
+
+def test_compressables_can_use_zstd_dictionaries():
+    samples = [json.dumps({"id": i, "name": f"Person {i}", "email": f"{i}@example.com"}).encode() for i in range(1000)]
+    codec = compression.ZstdCodec.train(samples, size=1024)
+    prop = props.Json(codec=codec)
+    data = {"id": 1001, "name": "Person 1001", "email": "1001@example.com"}
+    compressed_bytes = prop.prepare_to_store(None, data)
+    assert len(compressed_bytes) < len(props.Json(codec="zstd").prepare_to_store(None, data))
+    assert prop.prepare_to_load(None, compressed_bytes) == data
+
+
+def test_compressables_store_values_smaller_than_min_size_uncompressed():
+    prop = props.Text(compressed=True, min_size=100)
+    small_bytes = prop.prepare_to_store(None, "a" * 10)
+    assert small_bytes == b"\x00" + b"a" * 10
+    assert prop.prepare_to_load(None, small_bytes) == "a" * 10
+
+    large_bytes = prop.prepare_to_store(None, "a" * 1000)
+    assert len(large_bytes) < 1000
+    assert prop.prepare_to_load(None, large_bytes) == "a" * 1000
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lz4", "zstd"])
+def test_compressables_can_compress_values_larger_than_a_chunk(codec):
+    data = bytes(range(256)) * 4096
+    prop = props.Bytes(codec=codec)
+    assert prop.prepare_to_load(None, prop.prepare_to_store(None, data)) == data
+
+
+def test_compressables_fail_to_store_values_larger_than_the_max_entity_size():
+    with pytest.raises(ValueError):
+        props.Bytes().prepare_to_store(None, b"a" * 1048573)
+
+
+def test_compressables_fail_to_use_unknown_codecs():
+    with pytest.raises(ValueError):
+        props.Bytes(codec="unknown")
+
+
+def test_blob_refs_store_small_values_inline():
+    store = blobs.MemoryBlobStore()
+    prop = props.BlobRef(threshold=16, store=store)
+    assert prop.prepare_to_store(None, b"small") == b"\x00small"
+    assert prop.prepare_to_load(None, b"\x00small") == b"small"
+    assert store.blobs == {}
+
+
+def test_blob_refs_store_large_values_in_their_blob_store():
+    store = blobs.set_blob_store(blobs.MemoryBlobStore())
+    try:
+        entity = models.ModelWithBlobRefProperty(data=b"a" * 1000)
+        data = dict(entity)["data"]
+        assert len(data) < 100
+        assert list(store.blobs.values()) == [b"a" * 1000]
+
+        loaded_entity = models.ModelWithBlobRefProperty._load(entity.key, {"data": data})
+        assert loaded_entity.data == b"a" * 1000
+        assert models.ModelWithBlobRefProperty.data.open(loaded_entity).read(10) == b"a" * 10
+    finally:
+        blobs.set_blob_store(None)
+
+
+class CountingBlobStore(blobs.MemoryBlobStore):
+    calls = 0
+
+    def get_multi(self, blob_ids):
+        self.calls += 1
+        return super().get_multi(blob_ids)
+
+
+def test_blob_refs_load_values_lazily_and_can_be_prefetched():
+    store = CountingBlobStore()
+    prop = props.BlobRef(threshold=16, store=store)
+    values = [bytes([i]) * 1000 for i in range(10)]
+    datas = [prop.prepare_to_store(None, value) for value in values]
+
+    entities = []
+    for data in datas:
+        entity = models.ModelWithBlobRefProperty._load(Key("ModelWithBlobRefProperty", 1), {})
+        entity._data["data"] = prop.prepare_to_load(entity, data)
+        entities.append(entity)
+
+    assert store.calls == 0
+    models.ModelWithBlobRefProperty.data._store = store
+    try:
+        models.ModelWithBlobRefProperty.data.prefetch(entities + [None])
+        assert store.calls == 1
+        assert [entity.data for entity in entities] == values
+        assert store.calls == 1
+    finally:
+        models.ModelWithBlobRefProperty.data._store = None
+
+
+class BlobRefAdapter(Adapter):
+    def __init__(self, datas):
+        self.datas = datas
+
+    def get_multi(self, keys):
+        return [{"data": self.datas[key.int_id]} if key.int_id < len(self.datas) else None for key in keys]
+
+    def query(self, query, options):
+        return QueryResponse([(Key(query.kind, i), {"data": data}) for i, data in enumerate(self.datas)], None)
+
+
+def test_blob_refs_fetch_the_values_of_entities_loaded_together_in_one_batch():
+    store = CountingBlobStore()
+    prop = props.BlobRef(threshold=16, store=store)
+    values = [bytes([i]) * 1000 for i in range(10)]
+    datas = [prop.prepare_to_store(None, value) for value in values]
+
+    models.ModelWithBlobRefProperty.data._store = store
+    set_adapter(BlobRefAdapter(datas))
+    try:
+        keys = [Key(models.ModelWithBlobRefProperty, i) for i in range(1, 11)]
+        entities = get_multi(keys)
+        assert store.calls == 0
+        assert [entity and entity.data for entity in entities] == values[1:] + [None]
+        assert store.calls == 1
+
+        entities = list(models.ModelWithBlobRefProperty.query().run(batch_size=100))
+        assert [entity.data for entity in entities] == values
+        assert store.calls == 2
+    finally:
+        models.ModelWithBlobRefProperty.data._store = None
+
+
+def test_blob_refs_store_values_that_werent_fetched_without_fetching_them():
+    store = CountingBlobStore()
+    models.ModelWithBlobRefProperty.data._store = store
+    try:
+        data = dict(models.ModelWithBlobRefProperty(data=b"a" * 1000))["data"]
+        entity = models.ModelWithBlobRefProperty._load(Key("ModelWithBlobRefProperty", 1), {"data": data})
+        assert dict(entity)["data"] == data
+        assert store.calls == 0
+
+        entity.data = b"b" * 1000
+        assert dict(entity)["data"] != data
+        assert store.calls == 0
+    finally:
+        models.ModelWithBlobRefProperty.data._store = None
+
+
+def test_blob_refs_fail_to_load_missing_blobs():
+    prop = props.BlobRef(threshold=16, store=blobs.MemoryBlobStore())
+    prop._name_on_model = "data"
+    entity = models.ModelWithBlobRefProperty()
+    entity._data["data"] = prop.prepare_to_load(entity, b"\x01" + b"0" * 64)
+    with pytest.raises(RuntimeError):
+        prop.__get__(entity, type(entity))
+
+
+def test_blob_refs_cannot_be_repeated():
+    with pytest.raises(TypeError):
+        props.BlobRef(repeated=True)
+
+
 def test_encodables_respect_their_encodings():
     string = "こんにちは"
     encoded_string = string.encode("utf-8")
@@ -100,6 +275,32 @@ def test_jsons_fail_to_load_invalid_data():
         props.Json().prepare_to_load(None, json.dumps({"__anom_type": "unknown"}))
 
 
+@pytest.mark.parametrize("backend", ["json", "ujson", "orjson"])
+def test_jsons_load_the_same_data_regardless_of_backend(backend):
+    pytest.importorskip(backend)
+    data = {
+        "string": "こんにちは",
+        "numbers": [1, -1, 2 ** 63, 0.1, 1e100],
+        "nested": [{"blob": b"hello"}, {"at": datetime(2017, 1, 1, tzinfo=tzutc())}],
+    }
+    if backend == "orjson":
+        data["numbers"].remove(2 ** 63)
+
+    json_data = props.Json._dumps(data)
+    try:
+        props.Json.use_backend(backend)
+        assert props.Json._loads(json_data) == data
+        assert props.Json._loads(json_data.encode("utf-8")) == data
+        assert props.Json._loads(json.dumps({"x": float("nan")}))["x"] != 0
+    finally:
+        props.Json.use_backend("json")
+
+
+def test_jsons_fail_to_use_unknown_backends():
+    with pytest.raises(ValueError):
+        props.Json.use_backend("unknown")
+
+
 def test_msgpacks_dump_data_to_msgpack_on_store():
     data = {"foo": {"bar": 42}}
     assert props.Msgpack().prepare_to_store(None, data) == msgpack.packb(data)
@@ -20,6 +20,11 @@ def test_queries_can_fetch_entire_datasets(people):
     assert list(all_people) == people
 
 
+def test_queries_can_be_eventually_consistent(people):
+    people_found = list(Person.query().run(read_consistency="eventual"))
+    assert len(people_found) == len(people)
+
+
 def test_keys_only_queries_can_fetch_entire_datasets(people):
     all_people = Person.query().run(keys_only=True)
     assert list(all_people) == [person.key for person in people]
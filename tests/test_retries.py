@@ -0,0 +1,145 @@
+import pytest
+
+from anom import Adapter, RetriesExceeded, RetryPolicy, Transaction, transactional
+from anom.transaction import TransactionError, TransactionFailed
+
+
+class Flaky:
+    def __init__(self, failures, error=ConnectionError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        return "ok"
+
+
+class FlakyTransaction(Transaction):
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.adapter.commits += 1
+        if self.adapter.commits <= self.adapter.failures:
+            raise TransactionFailed("Conflict.")
+
+    def rollback(self):
+        pass
+
+    def end(self):
+        pass
+
+
+class FlakyAdapter(Adapter):
+    def __init__(self, failures):
+        self.failures = failures
+        self.commits = 0
+
+    def transaction(self, propagation, *, read_only=False):
+        return FlakyTransaction(self)
+
+
+def test_retry_policies_retry_transient_errors():
+    policy = RetryPolicy(max_attempts=3, initial_backoff=0.001)
+    fn = Flaky(2)
+    assert policy.call(fn, default_retry_on=(ConnectionError,)) == "ok"
+    assert fn.calls == 3
+    assert policy.stats().calls == 1
+    assert policy.stats().retries == 2
+    assert policy.stats().exhausted == 0
+
+
+def test_retry_policies_give_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3, initial_backoff=0.001)
+    fn = Flaky(5)
+    with pytest.raises(ConnectionError):
+        policy.call(fn, default_retry_on=(ConnectionError,))
+
+    assert fn.calls == 3
+    assert policy.stats().exhausted == 1
+
+
+def test_retry_policies_do_not_retry_other_errors():
+    policy = RetryPolicy(retry_on=(TimeoutError,))
+    fn = Flaky(1)
+    with pytest.raises(ConnectionError):
+        policy.call(fn, default_retry_on=(ConnectionError,))
+
+    assert fn.calls == 1
+
+
+def test_retry_policies_can_decide_what_to_retry_using_a_function():
+    policy = RetryPolicy(retry_on=lambda e: isinstance(e, ConnectionError), initial_backoff=0.001)
+    fn = Flaky(1)
+    assert policy.call(fn) == "ok"
+
+
+def test_retry_policies_respect_their_deadline():
+    policy = RetryPolicy(max_attempts=100, initial_backoff=1, max_backoff=1, deadline=0.001)
+    policy.backoff = lambda attempt: 1
+    fn = Flaky(5)
+    with pytest.raises(ConnectionError):
+        policy.call(fn, default_retry_on=(ConnectionError,))
+
+    assert fn.calls == 1
+    assert policy.stats().exhausted == 1
+
+
+def test_retry_policies_back_off_exponentially():
+    policy = RetryPolicy(initial_backoff=0.1, max_backoff=0.3, multiplier=2)
+    for _ in range(100):
+        assert 0 <= policy.backoff(1) <= 0.1
+        assert 0 <= policy.backoff(2) <= 0.2
+        assert 0 <= policy.backoff(5) <= 0.3
+
+
+def test_transactional_retries_failed_commits_using_its_policy():
+    adapter, policy = FlakyAdapter(failures=2), RetryPolicy(initial_backoff=0.001)
+
+    @transactional(adapter=adapter, retry_policy=policy)
+    def successful():
+        return 42
+
+    assert successful() == 42
+    assert adapter.commits == 3
+    assert policy.stats().retries == 2
+
+
+def test_transactional_raises_retries_exceeded_once_its_policy_gives_up():
+    adapter = FlakyAdapter(failures=10)
+
+    @transactional(adapter=adapter, retry_policy=RetryPolicy(max_attempts=2, initial_backoff=0.001))
+    def failing():
+        pass
+
+    with pytest.raises(RetriesExceeded):
+        failing()
+
+    assert adapter.commits == 2
+
+
+class LegacyFlakyAdapter(FlakyAdapter):
+    def transaction(self, propagation):
+        return FlakyTransaction(self)
+
+
+def test_transactional_supports_adapters_without_read_only_transactions():
+    adapter = LegacyFlakyAdapter(failures=0)
+
+    @transactional(adapter=adapter)
+    def read_write():
+        return 42
+
+    @transactional(adapter=adapter, read_only=True)
+    def read_only():
+        pass
+
+    assert read_write() == 42
+    with pytest.raises(TransactionError):
+        read_only()
@@ -1,6 +1,7 @@
+import asyncio
 import pytest
 
-from anom import Transaction, RetriesExceeded, get_multi, put_multi, transactional
+from anom import Transaction, TransactionError, RetriesExceeded, get_multi, put_multi, transactional
 from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
@@ -151,3 +152,76 @@ def test_deferred_keys_behave_like_normal_keys(adapter):
     assert person_1.key == person_2.key
     assert person_1.key.path == person_2.key.path
     assert str(person_1.key) == str(person_2.key)
+
+
+def test_transactions_can_read_their_own_writes(person):
+    @transactional()
+    def update(person):
+        for first_name in ("Johan", "Jane"):
+            person.first_name = first_name
+            person.put()
+
+        assert person.key.get().first_name == "Jane"
+        person.key.delete()
+        assert person.key.get() is None
+        person.put()
+        return person.key.get()
+
+    assert update(person) == person
+    assert person.key.get().first_name == "Jane"
+
+
+def test_read_only_transactions_can_read_data(person):
+    @transactional(read_only=True)
+    def read(person_key):
+        return person_key.get()
+
+    assert read(person.key) == person
+
+
+def test_read_only_transactions_cannot_write_data(person):
+    @transactional(read_only=True)
+    def write(person):
+        person.first_name = "Johan"
+        person.put()
+
+    with pytest.raises(TransactionError):
+        write(person)
+
+    with pytest.raises(TransactionError):
+        transactional(read_only=True)(person.key.delete)()
+
+    assert person.key.get() == person
+
+
+def test_read_write_transactions_cannot_be_nested_inside_read_only_transactions(person):
+    @transactional()
+    def inner():
+        pass
+
+    @transactional(read_only=True)
+    def outer():
+        inner()
+
+    with pytest.raises(TransactionError):
+        outer()
+
+
+def test_transactions_are_isolated_between_asyncio_tasks(adapter):
+    async def in_transaction():
+        transaction = adapter.transaction(Transaction.Propagation.Independent)
+        try:
+            await asyncio.sleep(0)
+            return adapter.current_transaction is transaction
+        finally:
+            transaction.end()
+
+    async def outside_transaction():
+        await asyncio.sleep(0)
+        return adapter.in_transaction
+
+    async def main():
+        return await asyncio.gather(in_transaction(), outside_transaction())
+
+    assert asyncio.run(main()) == [True, False]
+    assert not adapter.in_transaction